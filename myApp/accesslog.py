@@ -0,0 +1,238 @@
+"""Structured JSONL access log written off the request path.
+
+``AccessLogMiddleware`` turns each request into one small dict: URL name,
+query parameters, status, latency, DB time and response bytes. It hands the
+dict to ``AccessLog.record``, which only does a ``put_nowait`` on a bounded
+in-memory queue. A daemon thread per process drains that queue, encodes a
+batch of records and appends it with a single ``write()``.
+
+Rotation is by size: once the file would grow past ``max_bytes``, it
+becomes ``<path>.1.gz`` and older generations shift up to
+``backups``. Every worker appends to the same file, so writers take an
+``flock`` on ``<path>.lock`` around each batch. Only the writer threads ever
+wait on that lock, never a request.
+
+When the disk or the lock cannot keep up, the queue fills and new records are
+dropped and counted, because a request must never block on logging. The
+next batch that gets through carries a ``{"event": "dropped"}`` line with the
+count, so ``analyze_access_log`` can say how much traffic it did not see.
+"""
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+QUEUE_SIZE = 10_000
+BATCH_SIZE = 500
+FLUSH_SECONDS = 1.0
+MAX_BYTES = 20 * 2**20
+BACKUPS = 5
+# Query values are kept so traffic can be replayed, but capped in size.
+MAX_PARAM_LENGTH = 100
+MAX_PARAMS = 20
+IGNORED_PARAMS = {"csrfmiddlewaretoken"}
+# Parameters that page through results rather than filter them.
+PAGING_PARAMS = {"page", "per"}
+
+
+def request_params(query) -> dict[str, str]:
+    """The non-empty query parameters of a request, first value each, truncated."""
+    params = {}
+    for name, value in query.items():
+        value = value.strip()
+        if value and name not in IGNORED_PARAMS:
+            params[name[:MAX_PARAM_LENGTH]] = value[:MAX_PARAM_LENGTH]
+            if len(params) == MAX_PARAMS:
+                break
+    return params
+
+
+def filter_combination(params: dict[str, str]) -> str:
+    """``city+price_max`` style key for the filters a request used."""
+    return "+".join(sorted(name for name in params if name not in PAGING_PARAMS)) or "-"
+
+
+class _Flush:
+    """Queue marker: set once every record queued before it is on disk."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class AccessLog:
+    """One process's queue and writer thread for a JSONL file."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = MAX_BYTES,
+        backups: int = BACKUPS,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_seconds: float = FLUSH_SECONDS,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self.written = 0
+        self._unreported = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+
+    def record(self, entry: dict) -> bool:
+        """Queue ``entry`` for writing; ``False`` if it was dropped because the queue is full."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            return False
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written (tests, shutdown)."""
+        self._ensure_thread()
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+                    self._thread.start()
+
+    # -- writer thread ---------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [item for item in batch if not isinstance(item, _Flush)]
+            try:
+                self._write(entries)
+            except OSError:
+                # A full or missing disk must not kill the thread; the batch is lost.
+                self.dropped += len(entries)
+                self._unreported += len(entries)
+            for item in batch:
+                if isinstance(item, _Flush):
+                    item.done.set()
+
+    def _write(self, entries: list[dict]) -> None:
+        reported = self._unreported
+        lines = entries + [{"ts": time.time(), "event": "dropped", "count": reported}] if reported else entries
+        if not lines:
+            return
+        data = "".join(json.dumps(line, separators=(",", ":"), default=str) + "\n" for line in lines).encode()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                size = self.path.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if size and size + len(data) > self.max_bytes:
+                self._rotate()
+            # Reopened per batch: another worker may have rotated the file since.
+            with open(self.path, "ab") as log:
+                log.write(data)
+        self._unreported -= reported
+        self.written += len(entries)
+
+    def _rotate(self) -> None:
+        if self.backups < 1:
+            self.path.unlink()
+            return
+        oldest = rotated_path(self.path, self.backups)
+        if oldest.exists():
+            oldest.unlink()
+        for generation in range(self.backups - 1, 0, -1):
+            source = rotated_path(self.path, generation)
+            if source.exists():
+                source.rename(rotated_path(self.path, generation + 1))
+        with open(self.path, "rb") as source, gzip.open(rotated_path(self.path, 1), "wb") as target:
+            shutil.copyfileobj(source, target)
+        self.path.unlink()
+
+
+def rotated_path(path: Path, generation: int) -> Path:
+    return path.with_name(f"{path.name}.{generation}.gz")
+
+
+def read_records(path: str | Path, rotated: bool = True) -> Iterator[dict]:
+    """Records from ``path`` and, if ``rotated``, its gzipped generations, oldest first."""
+    path = Path(path)
+    files = []
+    if rotated:
+        generation = 1
+        while rotated_path(path, generation).exists():
+            files.append(rotated_path(path, generation))
+            generation += 1
+        files.reverse()
+    if path.exists():
+        files.append(path)
+    for file in files:
+        opener = gzip.open if file.suffix == ".gz" else open
+        with opener(file, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A worker killed mid-write can leave a torn last line.
+                    continue
+
+
+_logs: dict[tuple[str, int], AccessLog] = {}
+_logs_lock = threading.Lock()
+
+
+def access_log(path: str | Path, **options) -> AccessLog:
+    """Per-process log for ``path`` (a fresh queue and thread after fork)."""
+    key = (str(path), os.getpid())
+    log = _logs.get(key)
+    if log is None:
+        with _logs_lock:
+            log = _logs.get(key)
+            if log is None:
+                log = _logs[key] = AccessLog(path, **options)
+    return log
+
+
+@atexit.register
+def _flush_all() -> None:
+    pid = os.getpid()
+    for (_, owner), log in list(_logs.items()):
+        if owner == pid and log._thread is not None:
+            log.flush(timeout=2.0)
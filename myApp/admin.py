@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Property, Lead
+from django.utils import timezone
+from .bookings import cancel
+from .models import Agent, Area, Booking, Property, Lead, SavedSearch, SearchAlert
 
 
 @admin.register(Property)
@@ -11,6 +13,7 @@ class PropertyAdmin(admin.ModelAdmin):
         "beds",
         "baths",
         "commissionable",
+        "lead_count",
         "created_at",
     )
     search_fields = ("title", "city", "area", "badges", "affiliate_source")
@@ -26,8 +29,64 @@ class LeadAdmin(admin.ModelAdmin):
         "budget_max",
         "beds",
         "utm_source",
+        "score",
+        "converted",
         "created_at",
     )
+    list_filter = ("converted", "buy_or_rent")
+    ordering = ("converted", "-score", "-created_at")
+    actions = ["mark_converted"]
     search_fields = ("name", "phone", "email", "areas", "interest_ids", "utm_source")
+    raw_id_fields = ("interests",)
+    filter_horizontal = ("preferred_areas",)
 
+    @admin.action(description="Mark selected leads as converted")
+    def mark_converted(self, request, queryset):
+        queryset.update(converted=True, updated_at=timezone.now())
 
+
+@admin.register(Area)
+class AreaAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug")
+    search_fields = ("name", "slug")
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ("email", "q", "city", "beds", "price_max", "active", "created_at")
+    list_filter = ("active",)
+    search_fields = ("email", "q", "city")
+
+
+@admin.register(SearchAlert)
+class SearchAlertAdmin(admin.ModelAdmin):
+    list_display = ("saved_search", "property", "created_at", "sent_at")
+    list_select_related = ("saved_search", "property")
+
+
+@admin.register(Agent)
+class AgentAdmin(admin.ModelAdmin):
+    list_display = ("name", "phone", "email", "active")
+    list_filter = ("active",)
+    search_fields = ("name", "phone", "email")
+    raw_id_fields = ("properties",)
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ("name", "phone", "property", "agent", "start", "end", "status")
+    list_filter = ("status", "agent")
+    list_select_related = ("property", "agent")
+    search_fields = ("name", "phone")
+    raw_id_fields = ("property", "agent", "lead")
+    readonly_fields = ("start", "end", "status")
+    actions = ["cancel_bookings"]
+
+    def has_add_permission(self, request):
+        # Slots are only taken through bookings.reserve().
+        return False
+
+    @admin.action(description="Cancel selected bookings and free their slots")
+    def cancel_bookings(self, request, queryset):
+        for booking in queryset.filter(status=Booking.CONFIRMED):
+            cancel(booking)
@@ -0,0 +1,388 @@
+"""Index advice for the listing querysets behind ``results`` and ``dashboard``.
+
+Request parameters, either replayed from the access log or synthetic, go
+through the same ``*_filters``/``*_queryset`` functions the views use. The
+advisor then runs the two statements each page load issues: the
+paginator's ``COUNT(*)`` and the first page. It captures the SQL Django
+generates and groups it into query shapes, i.e. the same SQL apart from
+parameter values and ``LIMIT``/``OFFSET``.
+
+For every shape it reads the plan (``EXPLAIN QUERY PLAN`` on SQLite,
+``EXPLAIN (FORMAT JSON)`` on PostgreSQL) and flags full table scans and
+temporary sorts. A candidate index comes from the queryset itself, ordered
+equality, then sort, then range, so an index can both filter and hand rows
+back in order:
+
+* a page query wants its equality columns followed by its ``ORDER BY``;
+* a count wants its equality columns followed by its range columns, which
+  makes it an index-only count.
+
+Case-insensitive and substring lookups (``iexact``, ``icontains``) and
+``OR`` branches cannot use a B-tree index on the column. They are reported,
+not indexed.
+
+Each candidate that an existing index does not already cover is created
+inside a transaction that is rolled back, and the shapes are timed again.
+Candidates that remove a full scan or sort and make a shape at least
+``MIN_GAIN`` faster are recommended, unless they slow another shape down.
+That happens: without ``ANALYZE`` statistics, SQLite will happily walk an
+index on ``beds >= 2`` that matches most of the table.
+"""
+from __future__ import annotations
+
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from django.db import connections, models, transaction
+from django.db.models.lookups import Lookup
+from django.db.models.sql.where import AND, WhereNode
+
+from .accesslog import filter_combination, read_records
+from .models import Property
+from .queries import DASHBOARD_SORTS, dashboard_filters, dashboard_queryset, results_filters, results_queryset
+from .views import RESULTS_PER_PAGE
+
+# view name -> (filters from params, queryset from filters, page size from filters)
+VIEWS: dict[str, tuple[Callable, Callable, Callable]] = {
+    "results": (results_filters, results_queryset, lambda filters: RESULTS_PER_PAGE),
+    "dashboard": (dashboard_filters, dashboard_queryset, lambda filters: filters["per"]),
+}
+EQUALITY_LOOKUPS = {"exact", "in", "isnull"}
+RANGE_LOOKUPS = {"gt", "gte", "lt", "lte", "range"}
+MIN_GAIN = 0.3
+# A shape regressed if it got this much slower, and by more than MIN_LOSS_MS.
+MAX_LOSS = 0.5
+MIN_LOSS_MS = 1.0
+SAMPLES_PER_SHAPE = 5
+_limit_re = re.compile(r"\bLIMIT \d+(?: OFFSET \d+)?")
+
+
+@dataclass
+class Terms:
+    """What an index could do for one statement, as ``Property`` field names."""
+
+    equality: list[str] = field(default_factory=list)
+    ranges: list[str] = field(default_factory=list)
+    order: list[str] = field(default_factory=list)
+    unindexable: list[str] = field(default_factory=list)
+
+    def candidate(self, kind: str) -> tuple[str, ...]:
+        tail = self.order if kind == "page" and self.order else self.ranges
+        fields = [name for name in self.equality if name not in tail] + tail
+        # A B-tree walks both ways, so an all-descending key is stored ascending.
+        if fields and all(name.startswith("-") for name in fields):
+            fields = [name[1:] for name in fields]
+        return tuple(fields)
+
+
+@dataclass
+class Plan:
+    full_scans: list[str]
+    temp_sorts: int
+    detail: list[str]
+    cost: float | None = None
+
+    @property
+    def issues(self) -> str:
+        found = [f"full scan of {table}" for table in self.full_scans]
+        if self.temp_sorts:
+            found.append("temp sort")
+        return ", ".join(found) or "-"
+
+
+@dataclass
+class Shape:
+    view: str
+    kind: str
+    label: str
+    sql: str
+    terms: Terms
+    statements: list[tuple[str, tuple]] = field(default_factory=list)
+    hits: int = 0
+    plan: Plan | None = None
+    ms: float = 0.0
+
+    @property
+    def name(self) -> str:
+        order = f" by {','.join(self.terms.order)}" if self.terms.order else ""
+        return f"{self.view} {self.kind} [{self.label}]{order}"
+
+
+@dataclass
+class Candidate:
+    fields: tuple[str, ...]
+    name: str
+    shapes: list[tuple[Shape, Plan, float]] = field(default_factory=list)
+
+    @property
+    def gains(self) -> list[tuple[Shape, float]]:
+        return [
+            (shape, ms)
+            for shape, plan, ms in self.shapes
+            if ms <= shape.ms * (1 - MIN_GAIN) and plan.issues != shape.plan.issues
+        ]
+
+    @property
+    def regressions(self) -> list[tuple[Shape, float]]:
+        # With the same plan, a slower time is noise.
+        return [
+            (shape, ms)
+            for shape, plan, ms in self.shapes
+            if ms > shape.ms * (1 + MAX_LOSS) and ms - shape.ms > MIN_LOSS_MS and plan.detail != shape.plan.detail
+        ]
+
+    @property
+    def recommended(self) -> bool:
+        return bool(self.gains) and not self.regressions
+
+    def index(self) -> models.Index:
+        return models.Index(fields=list(self.fields), name=self.name)
+
+
+def index_terms(query, kind: str) -> Terms:
+    terms = Terms()
+
+    def walk(node: WhereNode) -> None:
+        for child in node.children:
+            if isinstance(child, WhereNode):
+                if child.connector == AND and not child.negated:
+                    walk(child)
+                else:
+                    terms.unindexable.append(f"({_describe(child)})")
+            elif isinstance(child, Lookup) and hasattr(child.lhs, "target"):
+                name = child.lhs.target.name
+                if child.lookup_name in EQUALITY_LOOKUPS:
+                    terms.equality.append(name)
+                elif child.lookup_name in RANGE_LOOKUPS:
+                    terms.ranges.append(name)
+                else:
+                    terms.unindexable.append(f"{name}__{child.lookup_name}")
+            else:
+                terms.unindexable.append(_describe(child))
+
+    walk(query.where)
+    if kind == "page":
+        terms.order = list(query.order_by or query.get_meta().ordering)
+    return terms
+
+
+def _describe(node) -> str:
+    if isinstance(node, WhereNode):
+        return f" {node.connector} ".join(_describe(child) for child in node.children)
+    if isinstance(node, Lookup) and hasattr(node.lhs, "target"):
+        return f"{node.lhs.target.name}__{node.lookup_name}"
+    return type(node).__name__
+
+
+class _Capture:
+    """``execute_wrapper`` that keeps each statement's SQL and params."""
+
+    def __init__(self):
+        self.statements: list[tuple[str, tuple]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+
+def collect_shapes(requests: Iterable[tuple[str, dict]], using: str = "default") -> list[Shape]:
+    """Run each ``(view, params)`` through the view's queryset and group the SQL it issues."""
+    connection = connections[using]
+    shapes: dict[tuple[str, str, str], Shape] = {}
+    for view, params in requests:
+        make_filters, make_queryset, page_size = VIEWS[view]
+        filters = make_filters(params)
+        qs = make_queryset(filters).using(using)
+        page = params.get("page", "1")
+        offset = (int(page) - 1) * page_size(filters) if page.isdigit() and int(page) > 0 else 0
+        page_qs = qs[offset : offset + page_size(filters)]
+        for kind, run in (("count", qs.count), ("page", lambda: list(page_qs))):
+            capture = _Capture()
+            with connection.execute_wrapper(capture):
+                run()
+            for sql, sql_params in capture.statements:
+                key = (view, kind, _limit_re.sub("LIMIT ?", sql))
+                shape = shapes.get(key)
+                if shape is None:
+                    shape = shapes[key] = Shape(
+                        view, kind, filter_combination(params), key[2], index_terms(qs.query, kind)
+                    )
+                shape.hits += 1
+                if len(shape.statements) < SAMPLES_PER_SHAPE:
+                    shape.statements.append((sql, sql_params))
+    return list(shapes.values())
+
+
+def explain(sql: str, params: tuple, using: str = "default") -> Plan:
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            raw = cursor.fetchone()[0]
+            root = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            return _postgres_plan(root)
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        detail = [row[-1] for row in cursor.fetchall()]
+    full_scans = [
+        match.group(1)
+        for line in detail
+        if (match := re.fullmatch(r"SCAN (?:TABLE )?(\S+)(?: AS \S+)?", line))
+    ]
+    return Plan(full_scans, sum("USE TEMP B-TREE" in line for line in detail), detail)
+
+
+def _postgres_plan(root: dict) -> Plan:
+    full_scans, sorts, detail = [], 0, []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        detail.append(node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else ""))
+        if node["Node Type"] == "Seq Scan":
+            full_scans.append(node["Relation Name"])
+        elif node["Node Type"] in ("Sort", "Incremental Sort"):
+            sorts += 1
+        stack.extend(node.get("Plans", ()))
+    return Plan(full_scans, sorts, detail, root["Total Cost"])
+
+
+def measure(shapes: list[Shape], using: str = "default", repeat: int = 5) -> list[tuple[Plan, float]]:
+    """Plan and best-of-``repeat`` milliseconds per execution for each of ``shapes``."""
+    results = []
+    with connections[using].cursor() as cursor:
+        for shape in shapes:
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for sql, params in shape.statements:
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                runs.append((time.perf_counter() - started) / len(shape.statements))
+            results.append((explain(*shape.statements[0], using=using), 1000 * min(runs)))
+    return results
+
+
+def existing_indexes(using: str = "default") -> list[tuple[tuple[str, str], ...]]:
+    """Each index on ``Property`` as ``((column, "ASC"|"DESC"), ...)``."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, Property._meta.db_table)
+    return [
+        tuple(zip(info["columns"], info.get("orders") or ["ASC"] * len(info["columns"])))
+        for info in constraints.values()
+        if info["index"] or info["unique"] or info["primary_key"]
+    ]
+
+
+def _key(fields: Iterable[str]) -> tuple[tuple[str, str], ...]:
+    return tuple(
+        (Property._meta.get_field(name.lstrip("-")).column, "DESC" if name.startswith("-") else "ASC")
+        for name in fields
+    )
+
+
+def covered(fields: tuple[str, ...], indexes: list[tuple[tuple[str, str], ...]]) -> bool:
+    """Whether an index already starts with ``fields``, read forwards or backwards."""
+    key = _key(fields)
+    flipped = tuple((column, "ASC" if order == "DESC" else "DESC") for column, order in key)
+    return any(index[: len(key)] in (key, flipped) for index in indexes)
+
+
+def index_name(fields: tuple[str, ...], taken: set[str]) -> str:
+    stem = "property_" + "_".join(name.lstrip("-").split("_")[0] for name in fields)
+    name, n = f"{stem[:26]}_idx", 2
+    while name in taken:
+        name, n = f"{stem[:24]}_{n}_idx", n + 1
+    return name
+
+
+@dataclass
+class Advice:
+    shapes: list[Shape]
+    recommended: list[Candidate]
+    rejected: list[Candidate]
+    # Plan and milliseconds per shape with every recommended index in place.
+    after: list[tuple[Plan, float]]
+
+
+def _with_indexes(candidates: list[Candidate], shapes: list[Shape], using: str, repeat: int):
+    """``measure`` with ``candidates`` created in a transaction that is then rolled back."""
+    connection = connections[using]
+    editor = connection.schema_editor()
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            for candidate in candidates:
+                cursor.execute(str(candidate.index().create_sql(Property, editor)))
+        results = measure(shapes, using, repeat)
+        transaction.set_rollback(True, using=using)
+    return results
+
+
+def advise(shapes: list[Shape], using: str = "default", repeat: int = 5) -> Advice:
+    for shape, (plan, ms) in zip(shapes, measure(shapes, using, repeat)):
+        shape.plan, shape.ms = plan, ms
+
+    indexes = existing_indexes(using)
+    taken = _constraint_names(using)
+    candidates: dict[tuple[str, ...], Candidate] = {}
+    for shape in shapes:
+        fields = shape.terms.candidate(shape.kind)
+        if fields and fields not in candidates and not covered(fields, indexes):
+            name = index_name(fields, taken)
+            taken.add(name)
+            candidates[fields] = Candidate(fields, name)
+
+    for candidate in candidates.values():
+        results = _with_indexes([candidate], shapes, using, repeat)
+        candidate.shapes = [(shape, plan, ms) for shape, (plan, ms) in zip(shapes, results)]
+
+    recommended = [candidate for candidate in candidates.values() if candidate.recommended]
+    # A recommended index that is a prefix of another recommended one is redundant.
+    recommended = [
+        candidate
+        for candidate in recommended
+        if not any(other is not candidate and covered(candidate.fields, [_key(other.fields)]) for other in recommended)
+    ]
+    rejected = [candidate for candidate in candidates.values() if candidate not in recommended]
+    after = _with_indexes(recommended, shapes, using, repeat) if recommended else measure(shapes, using, repeat)
+    return Advice(shapes, recommended, rejected, after)
+
+
+def _constraint_names(using: str) -> set[str]:
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, Property._meta.db_table))
+
+
+# -- request parameters -------------------------------------------------------
+
+CITIES = ["Makati", "Taguig", "Pasig", "Quezon City", "Manila", "Mandaluyong"]
+
+
+def synthetic_params(per_combination: int = 3, seed: int = 7) -> list[tuple[str, dict]]:
+    """Every filter and sort combination the two views accept, a few values each."""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(per_combination):
+        city, beds, price = rng.choice(CITIES), str(rng.randint(1, 3)), str(rng.randrange(40_000, 200_000, 10_000))
+        for combination in ({}, {"city": city}, {"beds": beds}, {"price_max": price}, {"city": city, "beds": beds},
+                            {"beds": beds, "price_max": price}, {"city": city, "beds": beds, "price_max": price},
+                            {"q": "condo"}):
+            requests.append(("results", combination))
+        for sort in DASHBOARD_SORTS:
+            requests.append(("dashboard", {"sort": sort}))
+            requests.append(("dashboard", {"sort": sort, "city": city}))
+        requests.append(("dashboard", {"q": "loft"}))
+    return requests
+
+
+def logged_params(path) -> list[tuple[str, dict]]:
+    """``(view, params)`` for the GET requests to the advised views in an access log."""
+    return [
+        (record["view"], record.get("params") or {})
+        for record in read_records(path)
+        if record.get("view") in VIEWS and record.get("method") == "GET"
+    ]
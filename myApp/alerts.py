@@ -0,0 +1,341 @@
+"""Saved-search alerts: a reverse (predicate) index over saved searches.
+
+Instead of testing every saved search against a new listing, searches are
+bucketed by ``(city, beds, q)`` and each bucket keeps its ``price_max``
+values sorted. A listing with price ``p`` and ``b`` beds matches, in every
+bucket with ``beds <= b``, exactly the suffix of searches whose
+``price_max >= p``; one binary search per bucket finds it. Free-text terms
+and cities are found through a trigram index: each term is filed under one
+of its trigrams, so a listing costs one lookup per trigram of its text
+rather than one substring test per distinct term.
+
+City semantics mirror the ``results`` view: a search's city matches the
+listing's city exactly or appears inside its area (both case-insensitive).
+
+Saves in this process update the matcher in place after commit. Saves in
+other workers move the shared generation, and the matcher is then rebuilt
+on a background thread while the old one keeps serving.
+"""
+from __future__ import annotations
+
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable
+
+import numpy as np
+from django.conf import settings
+from django.core import mail
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .cache import bump_generation, generation
+from .models import Property, SavedSearch, SearchAlert
+
+NO_LIMIT = np.iinfo(np.int64).max
+SEARCH_FIELDS = ("pk", "q", "city", "beds", "price_max")
+GENERATION = "saved_searches"
+GRAM = 3
+
+
+class _Bucket:
+    __slots__ = ("prices", "ids")
+
+    def __init__(self, rows: list[tuple[int, object]]):
+        rows.sort(key=lambda row: row[0])
+        self.prices = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        self.ids = np.array([row[1] for row in rows], dtype=object)
+
+    def with_row(self, price: int, pk) -> _Bucket:
+        bucket = _Bucket([])
+        at = int(np.searchsorted(self.prices, price, side="right"))
+        bucket.prices = np.insert(self.prices, at, price)
+        bucket.ids = np.insert(self.ids, at, pk)
+        return bucket
+
+    def without(self, pk) -> _Bucket:
+        bucket = _Bucket([])
+        keep = self.ids != pk
+        bucket.prices, bucket.ids = self.prices[keep], self.ids[keep]
+        return bucket
+
+
+class _SubstringIndex:
+    """Terms filed under their rarest trigram; ``find`` returns the terms inside a text."""
+
+    def __init__(self):
+        self._grams: dict[str, set[str]] = defaultdict(set)
+        self._short: set[str] = set()
+        self._filed: dict[str, str | None] = {}
+        self._uses: Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        return len(self._filed)
+
+    def add(self, term: str) -> None:
+        self._uses[term] += 1
+        if term in self._filed:
+            return
+        if len(term) < GRAM:
+            self._short.add(term)
+            self._filed[term] = None
+            return
+        gram = min(_grams(term), key=lambda gram: len(self._grams.get(gram, ())))
+        self._grams[gram].add(term)
+        self._filed[term] = gram
+
+    def discard(self, term: str) -> None:
+        self._uses[term] -= 1
+        if self._uses[term] > 0:
+            return
+        del self._uses[term]
+        gram = self._filed.pop(term, None)
+        if gram is None:
+            self._short.discard(term)
+        else:
+            self._grams[gram].discard(term)
+            if not self._grams[gram]:
+                del self._grams[gram]
+
+    def find(self, text: str) -> list[str]:
+        if len(self._filed) <= len(text):
+            # Fewer terms than trigrams in the text: testing each term is cheaper.
+            return [term for term in self._filed if term in text]
+        found = [term for term in self._short if term in text]
+        for gram in _grams(text):
+            for term in self._grams.get(gram, ()):
+                if term in text:
+                    found.append(term)
+        return list(dict.fromkeys(found))
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class SearchMatcher:
+    def __init__(self, rows: Iterable[tuple] = ()):
+        self._where: dict[object, tuple[str, int, str]] = {}
+        self.cities = _SubstringIndex()
+        self.queries = _SubstringIndex()
+        self._beds: Counter[int] = Counter()
+        staged: dict[tuple[str, int, str], list] = defaultdict(list)
+        for row in rows:
+            pk, key, price = self._parse(row)
+            staged[key].append((price, pk))
+            self._file(pk, key)
+        self.buckets: dict[tuple[str, int, str], _Bucket] = {key: _Bucket(value) for key, value in staged.items()}
+
+    @classmethod
+    def from_db(cls, chunk_size: int = 10000) -> "SearchMatcher":
+        rows = SavedSearch.objects.filter(active=True).order_by().values_list(*SEARCH_FIELDS)
+        return cls(rows.iterator(chunk_size=chunk_size))
+
+    @staticmethod
+    def _parse(row: tuple) -> tuple[object, tuple[str, int, str], int]:
+        pk, q, city, beds, price_max = row
+        key = ((city or "").strip().lower(), beds or 0, (q or "").strip().lower())
+        return pk, key, NO_LIMIT if price_max is None else price_max
+
+    def _file(self, pk, key: tuple[str, int, str]) -> None:
+        city, beds, q = key
+        self._where[pk] = key
+        if city:
+            self.cities.add(city)
+        if q:
+            self.queries.add(q)
+        self._beds[beds] += 1
+
+    @property
+    def size(self) -> int:
+        return len(self._where)
+
+    @property
+    def max_beds(self) -> int:
+        return max(self._beds, default=0)
+
+    def add(self, row: tuple) -> None:
+        """Insert or replace one search, given as a ``SEARCH_FIELDS`` row."""
+        pk, key, price = self._parse(row)
+        self.remove(pk)
+        bucket = self.buckets.get(key)
+        self.buckets[key] = bucket.with_row(price, pk) if bucket is not None else _Bucket([(price, pk)])
+        self._file(pk, key)
+
+    def remove(self, pk) -> None:
+        key = self._where.pop(pk, None)
+        if key is None:
+            return
+        bucket = self.buckets[key].without(pk)
+        if len(bucket.ids):
+            self.buckets[key] = bucket
+        else:
+            del self.buckets[key]
+        city, beds, q = key
+        if city:
+            self.cities.discard(city)
+        if q:
+            self.queries.discard(q)
+        self._beds[beds] -= 1
+        if not self._beds[beds]:
+            del self._beds[beds]
+
+    def _city_keys(self, city: str, area: str) -> list[str]:
+        city, area = city.strip().lower(), area.lower()
+        keys = [""]
+        if city:
+            keys.append(city)
+        if area and len(self.cities):
+            keys.extend(key for key in self.cities.find(area) if key != city)
+        return keys
+
+    def _query_keys(self, prop: Property) -> list[str]:
+        keys = [""]
+        if len(self.queries):
+            # Same fields the ``results`` view searches with ``q``, each on its own: a
+            # saved ``q`` never contains NUL, so no match can span two fields.
+            haystack = "\x00".join((prop.title, prop.description, prop.badges, prop.city)).lower()
+            keys.extend(self.queries.find(haystack))
+        return keys
+
+    def match(self, prop: Property) -> np.ndarray:
+        """Ids of saved searches matching ``prop``."""
+        query_keys = self._query_keys(prop)
+        parts = []
+        for city_key in self._city_keys(prop.city, prop.area):
+            for beds in range(0, min(prop.beds, self.max_beds) + 1):
+                for q in query_keys:
+                    bucket = self.buckets.get((city_key, beds, q))
+                    if bucket is not None:
+                        start = int(np.searchsorted(bucket.prices, prop.price_amount, side="left"))
+                        parts.append(bucket.ids[start:])
+        if not parts:
+            return np.empty(0, dtype=object)
+        return np.concatenate(parts)
+
+
+class _MatcherHolder:
+    """Per-process matcher; see the module docstring for how it stays current."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matcher: SearchMatcher | None = None
+        self._generation: int | None = None
+        self._rebuilding = False
+
+    def get(self) -> SearchMatcher:
+        """The matcher, built inline only on a process's first use."""
+        current = generation(GENERATION)
+        with self._lock:
+            if self._matcher is None:
+                self._matcher, self._generation = SearchMatcher.from_db(), current
+            elif self._generation != current and not self._rebuilding:
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild, args=(current,), name="search-matcher", daemon=True).start()
+            return self._matcher
+
+    def refresh(self) -> SearchMatcher:
+        """Rebuild now, for commands that must see every committed search."""
+        current = generation(GENERATION)
+        matcher = SearchMatcher.from_db()
+        with self._lock:
+            self._matcher, self._generation = matcher, current
+        return matcher
+
+    def _rebuild(self, current: int) -> None:
+        try:
+            matcher = SearchMatcher.from_db()
+            with self._lock:
+                self._matcher, self._generation = matcher, current
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            db_connection.close()
+
+    def apply(self, search: SavedSearch, deleted: bool = False) -> None:
+        """Apply a committed change from this process in place."""
+        with self._lock:
+            if self._matcher is not None:
+                if deleted or not search.active:
+                    self._matcher.remove(search.pk)
+                else:
+                    self._matcher.add(tuple(getattr(search, name) for name in SEARCH_FIELDS))
+        current = saved_searches_changed()
+        with self._lock:
+            # Adopt the new generation if our change is the only one since the last build.
+            if self._matcher is not None and self._generation == current - 1:
+                self._generation = current
+
+    def reset(self) -> None:
+        with self._lock:
+            self._matcher = self._generation = None
+
+
+search_matcher = _MatcherHolder()
+
+
+def saved_searches_changed() -> int:
+    """Make other workers rebuild; call it after bulk writes that skip signals."""
+    return bump_generation(GENERATION)
+
+
+def enqueue_matches(properties: Iterable[Property], batch_size: int = 5000) -> int:
+    """Write outbox rows for every (saved search, listing) match; returns rows queued."""
+    matcher = search_matcher.get()
+    if not matcher.size:
+        return 0
+    pending: list[SearchAlert] = []
+    queued = 0
+    for prop in properties:
+        pending.extend(SearchAlert(saved_search_id=search_id, property_id=prop.pk) for search_id in matcher.match(prop))
+        if len(pending) >= batch_size:
+            SearchAlert.objects.bulk_create(pending, batch_size=batch_size, ignore_conflicts=True)
+            queued += len(pending)
+            pending = []
+    if pending:
+        SearchAlert.objects.bulk_create(pending, batch_size=batch_size, ignore_conflicts=True)
+        queued += len(pending)
+    return queued
+
+
+def send_digests(max_per_digest: int = 20, connection=None) -> tuple[int, int]:
+    """Send one email per recipient covering all pending alerts; returns (emails, alerts).
+
+    Recipients are handled one at a time, each marked sent as soon as its
+    email goes out. A digest lists at most ``max_per_digest`` listings but
+    reports the full count. Pending alerts of deactivated searches are
+    dropped, not sent.
+    """
+    SearchAlert.objects.filter(sent_at__isnull=True, saved_search__active=False).delete()
+    pending = SearchAlert.objects.filter(sent_at__isnull=True, saved_search__active=True)
+    emails = list(pending.order_by("saved_search__email").values_list("saved_search__email", flat=True).distinct())
+    if not emails:
+        return 0, 0
+
+    site_url = getattr(settings, "SITE_URL", "").rstrip("/")
+    connection = connection or mail.get_connection()
+    sent = alerts = 0
+    with connection:
+        for email in emails:
+            rows = list(pending.filter(saved_search__email=email).order_by("created_at").values_list("pk", "property_id"))
+            if not rows:
+                continue
+            listing_ids = list(dict.fromkeys(property_id for _, property_id in rows))
+            shown = Property.objects.in_bulk(listing_ids[:max_per_digest])
+            lines = [f"{len(listing_ids)} new listing(s) match your saved searches:", ""]
+            for listing_id in listing_ids[:max_per_digest]:
+                prop = shown.get(listing_id)
+                if prop is not None:
+                    lines.append(f"- {prop.title} ({prop.city}) ₱{prop.price_amount:,}")
+                    lines.append(f"  {site_url}/property/{prop.slug}/")
+            if len(listing_ids) > max_per_digest:
+                lines.extend(["", f"...and {len(listing_ids) - max_per_digest} more: {site_url}/list"])
+            connection.send_messages(
+                [mail.EmailMessage(subject="New listings matching your search", body="\n".join(lines), to=[email])]
+            )
+            ids = [pk for pk, _ in rows]
+            with transaction.atomic():
+                for start in range(0, len(ids), 5000):
+                    SearchAlert.objects.filter(pk__in=ids[start:start + 5000]).update(sent_at=timezone.now())
+            sent += 1
+            alerts += len(ids)
+    return sent, alerts
@@ -0,0 +1,250 @@
+"""Read-only JSON API: listings for partners, leads for staff.
+
+Both endpoints walk a change feed in ``(version field, id)`` order with
+keyset cursors, so paging stays O(page) however deep a sync goes and rows
+edited mid-sync simply reappear later instead of shifting pages.
+
+* ``?fields=slug,price_amount`` selects only those columns (``id`` is always
+  included); rows come from ``values_list`` and are encoded straight to JSON
+  without serializers or model instances.
+* ``?limit=`` up to ``MAX_LIMIT`` rows per page; the body is streamed.
+* Every response carries ``next`` (a cursor, or null on the last page) and
+  ``version``; pass ``version`` back as ``?since=`` to get only what changed,
+  including ``{"id": ..., "deleted": true}`` entries from tombstones. Rows near
+  the version boundary may repeat, so clients should treat rows as upserts.
+* ``ETag`` is derived from the newest change and the query string, so an
+  unchanged page costs two index lookups and a 304.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.views import APIView
+
+from .models import Lead, LeadTombstone, Property, PropertyTombstone
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 10_000
+# Transactions that commit after a page was served can carry an older version.
+CHANGE_SKEW = timedelta(minutes=1)
+_ZERO_ID = uuid.UUID(int=0)
+
+
+def _encode_cursor(mode: str, version: datetime, pk: uuid.UUID) -> str:
+    raw = f"{mode}|{version.isoformat()}|{pk.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str) -> tuple[str, datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        mode, version, pk = raw.split("|")
+        parsed = datetime.fromisoformat(version)
+        if mode not in ("c", "s") or timezone.is_naive(parsed):
+            raise ValueError(mode)
+        return mode, parsed, uuid.UUID(hex=pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ParseError("Invalid cursor or since token.")
+
+
+class ChangeFeedView(APIView):
+    """Keyset-paginated, field-selectable listing of ``model`` in change order."""
+
+    model = None
+    fields: tuple[str, ...] = ()
+    version_field = ""
+    tombstone_model = None
+    tombstone_field = ""
+    cache_control = "private, no-cache"
+
+    def get(self, request):
+        fields = self.requested_fields(request.query_params.get("fields", ""))
+        limit = self.requested_limit(request.query_params.get("limit", ""))
+        mode, position = "c", None
+        if request.query_params.get("cursor"):
+            mode, version, pk = _decode_cursor(request.query_params["cursor"])
+            position = (version, pk)
+        elif request.query_params.get("since"):
+            _, version, pk = _decode_cursor(request.query_params["since"])
+            mode, position = "s", (version, pk)
+
+        etag = self.etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(
+                self.stream(fields, limit, mode, position), content_type="application/json"
+            )
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = self.cache_control
+        patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
+
+    # -- request parsing -------------------------------------------------------------
+
+    def requested_fields(self, value: str) -> list[str]:
+        if not value:
+            return list(self.fields)
+        requested = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = sorted(set(requested) - set(self.fields))
+        if unknown:
+            raise ParseError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(self.fields)}.")
+        return ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+
+    def requested_limit(self, value: str) -> int:
+        if not value:
+            return DEFAULT_LIMIT
+        if not value.isdigit() or not 0 < int(value) <= MAX_LIMIT:
+            raise ParseError(f"limit must be between 1 and {MAX_LIMIT}.")
+        return int(value)
+
+    def etag(self, request) -> str:
+        # Max() over an indexed column is an index lookup; COUNT covers deletes
+        # on models without tombstones.
+        aggregates = {"newest": Max(self.version_field)}
+        if self.tombstone_model is None:
+            aggregates["count"] = Count("pk")
+        state = self.model.objects.order_by().aggregate(**aggregates)
+        if self.tombstone_model is not None:
+            state["deleted"] = self.tombstone_model.objects.order_by().aggregate(Max(self.tombstone_field))
+        digest = hashlib.blake2b(
+            f"{state}|{request.get_full_path()}|{request.user.pk}".encode(), digest_size=12
+        ).hexdigest()
+        return f'"{digest}"'
+
+    # -- rows ------------------------------------------------------------------------
+
+    def _after(self, queryset, field: str, position):
+        if position is None:
+            return queryset
+        version, pk = position
+        return queryset.filter(**{f"{field}__gte": version}).exclude(**{field: version, "pk__lte": pk})
+
+    def changes(self, fields: list[str], limit: int, mode: str, position) -> Iterator[tuple]:
+        """``(version, id, values)`` in change order; ``values`` is None for a deletion."""
+        columns = list(dict.fromkeys([self.version_field, "id", *fields]))
+        picks = [columns.index(name) for name in fields]
+        rows = (
+            self._after(self.model.objects.all(), self.version_field, position)
+            .order_by(self.version_field, "id")
+            .values_list(*columns)[: limit + 1]
+        )
+        live = ((row[0], row[1], [row[i] for i in picks]) for row in rows.iterator(chunk_size=2000))
+        if mode != "s" or self.tombstone_model is None:
+            return live
+        deleted = (
+            self._after(self.tombstone_model.objects.all(), self.tombstone_field, position)
+            .order_by(self.tombstone_field, "id")
+            .values_list(self.tombstone_field, "id")[: limit + 1]
+        )
+        dead = ((version, pk, None) for version, pk in deleted.iterator(chunk_size=2000))
+        return heapq.merge(live, dead, key=lambda change: (change[0], change[1]))
+
+    def stream(self, fields: list[str], limit: int, mode: str, position) -> Iterator[bytes]:
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        prefixes = [f",{json.dumps(name)}:" for name in fields[1:]]
+        yield b'{"results":['
+        emitted, last, buffer, has_more = 0, position, [], False
+        for version, pk, values in self.changes(fields, limit, mode, position):
+            if emitted == limit:
+                has_more = True
+                break
+            if values is None:
+                buffer.append(f'{{"id":"{pk}","deleted":true}}')
+            else:
+                parts = ['{"id":"', str(pk), '"']
+                for prefix, value in zip(prefixes, values[1:]):
+                    parts.append(prefix)
+                    parts.append(_json_value(value, encode))
+                parts.append("}")
+                buffer.append("".join(parts))
+            emitted += 1
+            last = (version, pk)
+            if len(buffer) == 500:
+                yield (",".join(buffer) + ",").encode()
+                buffer = []
+        # Chunks end with a comma so they can be concatenated; close with a
+        # final chunk that does not.
+        tail = ",".join(buffer)
+
+        next_cursor = _encode_cursor(mode, *last) if has_more else None
+        horizon = timezone.now() - CHANGE_SKEW
+        if last is None:
+            version = _encode_cursor("s", *position) if position is not None else _encode_cursor("s", horizon, _ZERO_ID)
+        elif last[0] > horizon:
+            version = _encode_cursor("s", horizon, _ZERO_ID)
+        else:
+            version = _encode_cursor("s", *last)
+        yield f'{tail}],"next":{json.dumps(next_cursor)},"version":{json.dumps(version)}}}'.encode()
+
+
+def _json_value(value, encode) -> str:
+    if isinstance(value, datetime):
+        return f'"{value.isoformat()}"'
+    if isinstance(value, uuid.UUID):
+        return f'"{value}"'
+    return encode(value)
+
+
+class PropertyFeedView(ChangeFeedView):
+    permission_classes = [AllowAny]
+    model = Property
+    fields = (
+        "id",
+        "slug",
+        "title",
+        "description",
+        "price_amount",
+        "city",
+        "area",
+        "beds",
+        "baths",
+        "floor_area_sqm",
+        "parking",
+        "hero_image",
+        "badges",
+        "created_at",
+        "updated_at",
+    )
+    version_field = "updated_at"
+    tombstone_model = PropertyTombstone
+    tombstone_field = "deleted_at"
+
+
+class LeadFeedView(ChangeFeedView):
+    permission_classes = [IsAdminUser]
+    model = Lead
+    fields = (
+        "id",
+        "name",
+        "phone",
+        "email",
+        "buy_or_rent",
+        "budget_max",
+        "beds",
+        "areas",
+        "interest_ids",
+        "utm_source",
+        "utm_campaign",
+        "referrer",
+        "consent_contact",
+        "converted",
+        "score",
+        "created_at",
+        "updated_at",
+    )
+    version_field = "updated_at"
+    tombstone_model = LeadTombstone
+    tombstone_field = "deleted_at"
@@ -5,4 +5,5 @@ class MyappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "myApp"
 
-
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
@@ -0,0 +1,268 @@
+"""Cold storage for old leads: monthly Parquet partitions plus a manifest.
+
+``LeadArchive.archive(before)`` moves leads created before ``before`` out of
+the ``Lead`` table into ``LEAD_ARCHIVE_ROOT``::
+
+    manifest.json
+    month=2025-01/part-0001.parquet
+    month=2025-01/part-0002.parquet   <- a later run appending to the month
+
+Each run writes at most one zstd-compressed part per month, streamed one
+row group per chunk so memory stays flat. The order is: write the part,
+record it in the manifest, then delete the rows. A run that dies before the
+delete is finished by the next one, which skips ids the month already holds.
+Join-table links are kept as the ``interests`` / ``preferred_areas``
+columns; ``Property.lead_count`` keeps counting archived leads.
+
+``LeadArchive.batches()`` reads back with column projection and predicate
+pushdown. The manifest's per-part ``created_at`` bounds prune whole files
+before anything is opened, and results arrive one DataFrame per row group.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .leads import keep_lead_counts
+from .live import publish
+from .models import Lead, LeadTombstone
+
+MANIFEST_VERSION = 1
+SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("name", pa.string()),
+        ("phone", pa.string()),
+        ("email", pa.string()),
+        ("buy_or_rent", pa.string()),
+        ("budget_max", pa.int64()),
+        ("beds", pa.int64()),
+        ("areas", pa.string()),
+        ("interest_ids", pa.string()),
+        ("utm_source", pa.string()),
+        ("utm_campaign", pa.string()),
+        ("referrer", pa.string()),
+        ("consent_contact", pa.bool_()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("converted", pa.bool_()),
+        ("score", pa.float64()),
+        ("interests", pa.string()),
+        ("preferred_areas", pa.string()),
+    ]
+)
+LEAD_FIELDS = [name for name in SCHEMA.names if name not in ("interests", "preferred_areas")]
+
+
+def archive_root() -> Path:
+    return Path(getattr(settings, "LEAD_ARCHIVE_ROOT", Path(settings.BASE_DIR) / "var" / "archive" / "leads"))
+
+
+def _month_bounds(value: datetime) -> tuple[str, datetime, datetime]:
+    """``("YYYY-MM", first instant, first instant of the next month)`` in local time."""
+    local = timezone.localtime(value)
+    start = datetime(local.year, local.month, 1)
+    following = datetime(local.year + local.month // 12, local.month % 12 + 1, 1)
+    return f"{local:%Y-%m}", timezone.make_aware(start), timezone.make_aware(following)
+
+
+@dataclass
+class ArchiveResult:
+    months: int
+    archived: int
+    deleted: int
+
+
+class LeadArchive:
+    def __init__(self, root: Path | str | None = None, using: str = "default", chunk_size: int = 5000):
+        self.root = Path(root) if root is not None else archive_root()
+        self.using = using
+        self.chunk_size = chunk_size
+
+    # -- manifest --------------------------------------------------------------------
+
+    def manifest(self) -> dict:
+        try:
+            return json.loads((self.root / "manifest.json").read_text())
+        except FileNotFoundError:
+            return {"version": MANIFEST_VERSION, "months": {}}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as handle:
+                json.dump(manifest, handle, indent=1, sort_keys=True)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp, self.root / "manifest.json")
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def months(self) -> list[str]:
+        return sorted(self.manifest()["months"])
+
+    # -- writing ---------------------------------------------------------------------
+
+    def archive(self, before: datetime) -> ArchiveResult:
+        """Move every lead created before ``before`` into its month's partition."""
+        result = ArchiveResult(0, 0, 0)
+        leads = Lead.objects.using(self.using).filter(created_at__lt=before).order_by("created_at", "id")
+        remaining = leads
+        while True:
+            oldest = remaining.values_list("created_at", flat=True).first()
+            if oldest is None:
+                if result.deleted:
+                    summary = {"op": "archived", "count": result.deleted, "before": before.isoformat()}
+                    transaction.on_commit(lambda: publish("lead", summary, self.using), using=self.using)
+                return result
+            month, start, end = _month_bounds(oldest)
+            archived, deleted = self._archive_month(month, leads.filter(created_at__gte=start, created_at__lt=end))
+            remaining = leads.filter(created_at__gte=end)
+            result.months += 1
+            result.archived += archived
+            result.deleted += deleted
+
+    def _archive_month(self, month: str, leads) -> tuple[int, int]:
+        manifest = self.manifest()
+        entry = manifest["months"].setdefault(month, {"parts": [], "rows": 0})
+        done = self._archived_ids(month, entry)
+        directory = self.root / f"month={month}"
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"part-{len(entry['parts']) + 1:04d}.parquet"
+
+        ids, rows, low, high = [], 0, None, None
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        os.close(fd)
+        try:
+            with pq.ParquetWriter(tmp, SCHEMA, compression="zstd") as writer:
+                for frame in self._frames(leads):
+                    ids.extend(frame["id"])
+                    frame = frame[~frame["id"].isin(done)]
+                    if frame.empty:
+                        continue
+                    writer.write_table(pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False))
+                    rows += len(frame)
+                    low = min(low, frame["created_at"].min()) if low is not None else frame["created_at"].min()
+                    high = max(high, frame["created_at"].max()) if high is not None else frame["created_at"].max()
+            if rows:
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, directory / name)
+                entry["parts"].append(
+                    {"name": name, "rows": rows, "min_created": low.isoformat(), "max_created": high.isoformat()}
+                )
+                entry["rows"] += rows
+                self._save_manifest(manifest)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+        with transaction.atomic(using=self.using), keep_lead_counts():
+            for start in range(0, len(ids), self.chunk_size):
+                chunk = ids[start:start + self.chunk_size]
+                Lead.objects.using(self.using).filter(pk__in=chunk).delete()
+                LeadTombstone.objects.using(self.using).bulk_create(
+                    [LeadTombstone(id=pk) for pk in chunk], ignore_conflicts=True
+                )
+        return rows, len(ids)
+
+    def _archived_ids(self, month: str, entry: dict) -> set[str]:
+        if not entry["parts"]:
+            return set()
+        files = [str(self.root / f"month={month}" / part["name"]) for part in entry["parts"]]
+        return set(ds.dataset(files, schema=SCHEMA, format="parquet").to_table(columns=["id"])["id"].to_pylist())
+
+    def _frames(self, leads) -> Iterator[pd.DataFrame]:
+        """One DataFrame per keyset chunk, with the join tables folded into CSV columns."""
+        last = None
+        while True:
+            chunk = leads if last is None else leads.filter(
+                Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1])
+            )
+            rows = list(chunk.values_list(*LEAD_FIELDS)[: self.chunk_size])
+            if not rows:
+                return
+            last = (rows[-1][LEAD_FIELDS.index("created_at")], rows[-1][0])
+            frame = pd.DataFrame.from_records(rows, columns=LEAD_FIELDS)
+            pks = frame["id"].tolist()
+            frame["id"] = frame["id"].astype(str)
+            frame["interests"] = frame["id"].map(self._joined(Lead.interests.through, "property_id", pks))
+            frame["preferred_areas"] = frame["id"].map(self._joined(Lead.preferred_areas.through, "area__slug", pks))
+            yield frame
+
+    def _joined(self, through, column: str, pks: list) -> dict[str, str]:
+        joined: dict[str, list[str]] = {}
+        for lead_pk, value in through.objects.using(self.using).filter(lead_id__in=pks).values_list("lead_id", column):
+            joined.setdefault(str(lead_pk), []).append(str(value))
+        return {pk: ",".join(values) for pk, values in joined.items()}
+
+    # -- reading ---------------------------------------------------------------------
+
+    def files(self, start: datetime | None = None, end: datetime | None = None) -> list[Path]:
+        """Parts that may hold leads created in ``[start, end)``."""
+        found = []
+        for month, entry in sorted(self.manifest()["months"].items()):
+            for part in entry["parts"]:
+                if start is not None and datetime.fromisoformat(part["max_created"]) < start:
+                    continue
+                if end is not None and datetime.fromisoformat(part["min_created"]) >= end:
+                    continue
+                found.append(self.root / f"month={month}" / part["name"])
+        return found
+
+    def batches(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        columns: list[str] | None = None,
+        **equals,
+    ) -> Iterator[pd.DataFrame]:
+        """Archived leads created in ``[start, end)`` matching ``field=value`` (or ``field=[values]``)."""
+        files = self.files(start, end)
+        if not files:
+            return
+        condition = None
+        for expression in self._conditions(start, end, equals):
+            condition = expression if condition is None else condition & expression
+        dataset = ds.dataset([str(path) for path in files], schema=SCHEMA, format="parquet")
+        for batch in dataset.to_batches(columns=columns, filter=condition):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def read(self, *args, **kwargs) -> pd.DataFrame:
+        """``batches()`` concatenated; only for selections known to be small."""
+        frames = list(self.batches(*args, **kwargs))
+        if not frames:
+            columns = kwargs.get("columns") or SCHEMA.names
+            return SCHEMA.empty_table().select(columns).to_pandas()
+        return pd.concat(frames, ignore_index=True)
+
+    def count(self, *args, **kwargs) -> int:
+        return sum(len(frame) for frame in self.batches(*args, columns=["id"], **kwargs))
+
+    def _conditions(self, start, end, equals: dict) -> Iterator[ds.Expression]:
+        created = ds.field("created_at")
+        if start is not None:
+            yield created >= pa.scalar(start, type=SCHEMA.field("created_at").type)
+        if end is not None:
+            yield created < pa.scalar(end, type=SCHEMA.field("created_at").type)
+        for name, value in equals.items():
+            if name not in SCHEMA.names:
+                raise ValueError(f"Unknown archive column: {name}")
+            if isinstance(value, (list, tuple, set)):
+                yield ds.field(name).isin(list(value))
+            else:
+                yield ds.field(name) == value
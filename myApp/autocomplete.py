@@ -0,0 +1,234 @@
+"""In-memory typeahead index over listing titles, cities, areas and badges.
+
+Terms live in a character trie. Every node caches its top-k entries by
+weight, so a prefix lookup is a walk of ``len(prefix)`` nodes plus a cached
+list; caches along a term's path are dropped when that term changes. When an
+exact prefix yields too few results, a bounded Levenshtein walk over the trie
+adds typo-tolerant matches ("Ortigass" -> "Ortigas Center").
+
+Each worker keeps its own index. It is built from one query on first use
+and patched in place, once the save commits, in the worker that saved. When
+the shared listing generation shows another worker changed listings, it is
+rebuilt, but at most once per ``rebuild_interval`` seconds, so a bulk import
+or a burst of admin edits does not turn every keystroke into a rebuild.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .cache import listing_generation
+from .models import Property
+
+TOP_K = 10
+KIND_WEIGHTS = {"city": 4.0, "area": 3.0, "badge": 1.5, "listing": 1.0}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+@dataclass
+class Suggestion:
+    text: str
+    kind: str
+    slug: str = ""
+    count: int = 0
+
+    @property
+    def weight(self) -> float:
+        return KIND_WEIGHTS.get(self.kind, 1.0) * self.count
+
+
+@dataclass
+class _Node:
+    children: dict[str, "_Node"] = field(default_factory=dict)
+    entries: dict[tuple[str, str], Suggestion] = field(default_factory=dict)
+    best: list[Suggestion] | None = None
+
+
+class SuggestionIndex:
+    def __init__(self, recheck_interval: float = 5.0, rebuild_interval: float = 60.0):
+        self.recheck_interval = recheck_interval
+        self.rebuild_interval = rebuild_interval
+        self._root = _Node()
+        self._by_property: dict[str, list[tuple[str, tuple[str, str]]]] = {}
+        self._lock = threading.RLock()
+        self._built = False
+        self._generation: int | None = None
+        self._checked_at = 0.0
+        self._built_at = 0.0
+
+    # -- building ------------------------------------------------------------
+
+    @staticmethod
+    def _terms(prop: Property) -> list[tuple[str, Suggestion]]:
+        """(trie key, suggestion) pairs contributed by one listing."""
+        terms: list[tuple[str, Suggestion]] = []
+        title = normalize(prop.title)
+        if title:
+            # Index every word start so "condo" finds "Modern 2BR Condo in BGC".
+            words = title.split(" ")
+            for i in range(len(words)):
+                if i == 0 or len(words[i]) >= 3:
+                    terms.append((" ".join(words[i:]), Suggestion(prop.title, "listing", slug=prop.slug)))
+        for kind, value in (("city", prop.city), ("area", prop.area)):
+            if normalize(value):
+                terms.append((normalize(value), Suggestion(value.strip(), kind)))
+        for badge in prop.badges.split(","):
+            if normalize(badge):
+                terms.append((normalize(badge), Suggestion(badge.strip(), "badge")))
+        return terms
+
+    def build(self) -> None:
+        generation = listing_generation()
+        rows = Property.objects.only("id", "slug", "title", "city", "area", "badges").order_by()
+        with self._lock:
+            self._root = _Node()
+            self._by_property = {}
+            for prop in rows.iterator(chunk_size=2000):
+                self._add(prop)
+            # Fill every node's top-k cache up front so no keystroke pays for it.
+            self._best(self._root)
+            self._built = True
+            self._generation = generation
+            self._checked_at = self._built_at = time.monotonic()
+
+    def ensure_current(self) -> None:
+        now = time.monotonic()
+        if self._built and now - self._checked_at < self.recheck_interval:
+            return
+        if not self._built:
+            self.build()
+        elif now - self._built_at >= self.rebuild_interval and listing_generation() != self._generation:
+            self.build()
+        else:
+            self._checked_at = now
+
+    # -- incremental maintenance ---------------------------------------------
+
+    def _path(self, key: str, create: bool) -> list[_Node]:
+        nodes = [self._root]
+        node = self._root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return []
+                child = node.children[char] = _Node()
+            node = child
+            nodes.append(node)
+        return nodes
+
+    def _add(self, prop: Property) -> None:
+        contributed = []
+        for key, suggestion in self._terms(prop):
+            nodes = self._path(key, create=True)
+            entry_key = (suggestion.kind, suggestion.slug or normalize(suggestion.text))
+            entry = nodes[-1].entries.get(entry_key)
+            if entry is None:
+                entry = nodes[-1].entries[entry_key] = suggestion
+            entry.count += 1
+            for node in nodes:
+                node.best = None
+            contributed.append((key, entry_key))
+        self._by_property[str(prop.pk)] = contributed
+
+    def _remove(self, pk: str) -> None:
+        for key, entry_key in self._by_property.pop(pk, []):
+            nodes = self._path(key, create=False)
+            if not nodes:
+                continue
+            entry = nodes[-1].entries.get(entry_key)
+            if entry is not None:
+                entry.count -= 1
+                if entry.count <= 0:
+                    del nodes[-1].entries[entry_key]
+            for node in nodes:
+                node.best = None
+            # Prune now-empty branches from the leaf up.
+            for depth in range(len(key), 0, -1):
+                node = nodes[depth]
+                if node.children or node.entries:
+                    break
+                del nodes[depth - 1].children[key[depth - 1]]
+
+    def update_property(self, prop: Property) -> None:
+        if not self._built:
+            return
+        with self._lock:
+            self._remove(str(prop.pk))
+            self._add(prop)
+
+    def remove_property(self, pk) -> None:
+        if not self._built:
+            return
+        with self._lock:
+            self._remove(str(pk))
+
+    def note_local_change(self, generation: int) -> None:
+        """Adopt ``generation`` if our own change is the only one since the last build."""
+        if self._built and self._generation == generation - 1:
+            self._generation = generation
+
+    # -- querying ------------------------------------------------------------
+
+    def _best(self, node: _Node) -> list[Suggestion]:
+        if node.best is None:
+            candidates = list(node.entries.values())
+            for child in node.children.values():
+                candidates.extend(self._best(child))
+            unique = {}
+            for suggestion in candidates:
+                unique.setdefault((suggestion.kind, suggestion.slug or suggestion.text.lower()), suggestion)
+            node.best = heapq.nlargest(TOP_K, unique.values(), key=lambda s: s.weight)
+        return node.best
+
+    def _fuzzy(self, query: str, max_edits: int, max_nodes: int = 20000) -> list[tuple[int, _Node]]:
+        """Nodes whose path is within ``max_edits`` of ``query`` (as a prefix)."""
+        matches: list[tuple[int, _Node]] = []
+        first_row = list(range(len(query) + 1))
+        stack = [(child, char, first_row) for char, child in self._root.children.items()]
+        visited = 0
+        while stack and visited < max_nodes:
+            node, char, previous = stack.pop()
+            visited += 1
+            row = [previous[0] + 1]
+            for col in range(1, len(query) + 1):
+                cost = 0 if query[col - 1] == char else 1
+                row.append(min(row[col - 1] + 1, previous[col] + 1, previous[col - 1] + cost))
+            if row[-1] <= max_edits:
+                matches.append((row[-1], node))
+                continue
+            if min(row) <= max_edits:
+                stack.extend((child, next_char, row) for next_char, child in node.children.items())
+        return matches
+
+    def suggest(self, query: str, limit: int = 8) -> list[Suggestion]:
+        key = normalize(query)
+        if not key:
+            return []
+        self.ensure_current()
+        with self._lock:
+            nodes = self._path(key, create=False)
+            results = list(self._best(nodes[-1])) if nodes else []
+            if len(results) < limit and len(key) >= 3:
+                max_edits = 1 if len(key) < 7 else 2
+                ranked = sorted(self._fuzzy(key, max_edits), key=lambda item: item[0])
+                for distance, node in ranked:
+                    results.extend(self._best(node))
+            seen = set()
+            unique = []
+            for suggestion in results:
+                ident = (suggestion.kind, suggestion.slug or suggestion.text.lower())
+                if ident not in seen:
+                    seen.add(ident)
+                    unique.append(suggestion)
+            return unique[:limit]
+
+
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,179 @@
+"""Viewing bookings on a fixed slot grid.
+
+Time is cut into ``BOOKING_SLOT_MINUTES`` slots aligned to the hour. A
+confirmed booking holds one ``BookingSlot`` row per slot it covers, and
+``BookingSlot`` is unique on ``(agent, start)`` and on ``(property, start)``.
+Interval overlap then becomes equality on an indexed column:
+
+* conflict checks are index lookups, and
+* the database, not application code, rejects the second of two concurrent
+  reservations for the same agent or listing (``reserve`` catches the
+  ``IntegrityError`` and tries the next free agent).
+
+``availability`` answers a date range with three queries: the eligible
+agents, their held slots, and the listing's held slots. It then walks the
+grid once.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Agent, Booking, BookingSlot, Lead, Property
+
+
+class SlotUnavailable(Exception):
+    """The listing or every eligible agent is already booked for that time."""
+
+
+@dataclass
+class OpenSlot:
+    start: datetime
+    end: datetime
+    agent_ids: tuple
+
+
+def slot_length() -> timedelta:
+    return timedelta(minutes=getattr(settings, "BOOKING_SLOT_MINUTES", 30))
+
+
+def opening_hours(day: date) -> tuple[datetime, datetime] | None:
+    """Bookable ``[open, close)`` for ``day`` in local time, or None when closed."""
+    hours = getattr(settings, "BOOKING_HOURS", {}).get(day.weekday())
+    if hours is None:
+        return None
+    opens, closes = hours
+    return (
+        timezone.make_aware(datetime.combine(day, time(opens))),
+        timezone.make_aware(datetime.combine(day, time(closes))),
+    )
+
+
+def grid(start: datetime, end: datetime) -> list[datetime]:
+    """Slot starts in ``[start, end)`` that fall inside opening hours."""
+    step = slot_length()
+    slots = []
+    day = timezone.localtime(start).date()
+    while day <= timezone.localtime(end).date():
+        hours = opening_hours(day)
+        if hours is not None:
+            current = hours[0]
+            while current + step <= hours[1]:
+                if start <= current < end:
+                    slots.append(current)
+                current += step
+        day += timedelta(days=1)
+    return slots
+
+
+def eligible_agents(property_obj: Property, using: str = "default") -> tuple:
+    """Active agents assigned to the listing, or with no assignments at all."""
+    return tuple(
+        Agent.objects.using(using)
+        .filter(active=True)
+        .filter(Q(properties=property_obj) | Q(properties__isnull=True))
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .distinct()
+    )
+
+
+def availability(property_obj: Property, start: datetime, end: datetime, using: str = "default") -> list[OpenSlot]:
+    """Open slots for the listing in ``[start, end)``, each with the agents free then."""
+    agents = eligible_agents(property_obj, using)
+    slots = grid(max(start, timezone.now()), end)
+    if not agents or not slots:
+        return []
+    held = BookingSlot.objects.using(using).filter(start__gte=slots[0], start__lte=slots[-1])
+    listing_busy = set(held.filter(property=property_obj).values_list("start", flat=True))
+    agents_busy = defaultdict(set)
+    for agent_id, slot in held.filter(agent_id__in=agents).values_list("agent_id", "start"):
+        agents_busy[slot].add(agent_id)
+
+    step = slot_length()
+    found = []
+    for slot in slots:
+        if slot in listing_busy:
+            continue
+        busy = agents_busy.get(slot)
+        # Most slots have nobody booked: share the agents tuple instead of copying it.
+        free = tuple(agent_id for agent_id in agents if agent_id not in busy) if busy else agents
+        if free:
+            found.append(OpenSlot(slot, slot + step, free))
+    return found
+
+
+def _validate(start: datetime, slots: int) -> list[datetime]:
+    if timezone.is_naive(start):
+        raise ValueError("Booking start must be timezone-aware")
+    step = slot_length()
+    starts = [start + step * i for i in range(slots)]
+    if slots < 1 or grid(start, starts[-1] + step) != starts:
+        raise ValueError("Bookings must cover whole slots inside opening hours")
+    if start <= timezone.now():
+        raise ValueError("Bookings must start in the future")
+    return starts
+
+
+def reserve(
+    property_obj: Property,
+    start: datetime,
+    name: str,
+    phone: str,
+    lead: Lead | None = None,
+    agent: Agent | None = None,
+    slots: int = 1,
+    using: str = "default",
+) -> Booking:
+    """Book ``slots`` consecutive slots from ``start`` with ``agent`` or the least-busy free one."""
+    starts = _validate(start, slots)
+    if agent is not None:
+        candidates = [agent.pk]
+    else:
+        # Least-booked that day first, so viewings spread across agents.
+        day = timezone.localtime(start).date()
+        opens, closes = opening_hours(day)
+        load = dict(
+            BookingSlot.objects.using(using)
+            .filter(start__gte=opens, start__lt=closes)
+            .values("agent_id")
+            .annotate(held=Count("pk"))
+            .values_list("agent_id", "held")
+        )
+        busy = set(
+            BookingSlot.objects.using(using).filter(start__in=starts).values_list("agent_id", flat=True)
+        )
+        candidates = sorted(
+            (pk for pk in eligible_agents(property_obj, using) if pk not in busy), key=lambda pk: load.get(pk, 0)
+        )
+
+    for agent_id in candidates:
+        try:
+            with transaction.atomic(using=using):
+                booking = Booking.objects.using(using).create(
+                    property=property_obj, agent_id=agent_id, lead=lead, name=name, phone=phone,
+                    start=starts[0], end=starts[-1] + slot_length(),
+                )
+                BookingSlot.objects.using(using).bulk_create(
+                    [BookingSlot(booking=booking, agent_id=agent_id, property=property_obj, start=slot) for slot in starts]
+                )
+            return booking
+        except IntegrityError:
+            # Someone got there first: the listing is taken, or just this agent is.
+            if BookingSlot.objects.using(using).filter(property=property_obj, start__in=starts).exists():
+                break
+    raise SlotUnavailable(f"{property_obj.slug} has no free agent at {timezone.localtime(start):%Y-%m-%d %H:%M}")
+
+
+def cancel(booking: Booking, using: str = "default") -> None:
+    """Release the booking's slots; the booking row stays for history."""
+    with transaction.atomic(using=using):
+        BookingSlot.objects.using(using).filter(booking=booking).delete()
+        booking.status = Booking.CANCELLED
+        booking.save(using=using, update_fields=["status"])
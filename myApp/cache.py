@@ -0,0 +1,311 @@
+"""Read-through object cache for Property lookups.
+
+Two tiers sit in front of the database:
+
+* a per-process LRU with a short TTL, which saves the object read and
+  unpickling on a hit, and
+* a shared tier backed by a Django cache alias (file or cache server) so that
+  every gunicorn worker benefits from a single DB read.
+
+Coherence across workers is version-stamped: each property has a version
+token in the shared tier that is replaced by a fresh random one on
+save/delete. Shared entries are keyed by (id, version) and local entries
+remember the version they were loaded at, so a new token makes every stale
+copy unreachable at once. Every lookup, local hits included, reads the
+version key. A version key lost to culling or a cache restart comes back as
+a new random token, never as one an old object was stored under.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import Http404
+
+from .models import Property
+
+
+class PropertyCache:
+    key_prefix = "property"
+
+    def __init__(self, max_entries: int = 512, local_ttl: float = 30.0, shared_ttl: int = 3600):
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self._local: OrderedDict[str, tuple[Property, str, float]] = OrderedDict()
+        self._slugs: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "local_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    # -- shared tier helpers -------------------------------------------------
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, "PROPERTY_CACHE_ALIAS", "default")]
+
+    def _version_key(self, pk: str) -> str:
+        return f"{self.key_prefix}:v:{pk}"
+
+    def _object_key(self, pk: str, version: str) -> str:
+        return f"{self.key_prefix}:obj:{pk}:{version}"
+
+    def _slug_key(self, slug: str) -> str:
+        return f"{self.key_prefix}:slug:{slug}"
+
+    @staticmethod
+    def _new_version() -> str:
+        return uuid.uuid4().hex
+
+    def _current_version(self, pk: str) -> str:
+        key = self._version_key(pk)
+        version = self.shared.get(key)
+        if version is None:
+            version = self._new_version()
+            if not self.shared.add(key, version, None):
+                # Another worker got there first; use its token.
+                version = self.shared.get(key, version)
+        return version
+
+    # -- local tier helpers --------------------------------------------------
+
+    def _local_get(self, pk: str) -> tuple[Property, str] | None:
+        with self._lock:
+            entry = self._local.get(pk)
+            if entry is None:
+                return None
+            obj, version, expires = entry
+            if expires < time.monotonic():
+                del self._local[pk]
+                return None
+            self._local.move_to_end(pk)
+            return obj, version
+
+    def _local_put(self, obj: Property, version: str) -> None:
+        pk = str(obj.pk)
+        with self._lock:
+            self._local[pk] = (obj, version, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(pk)
+            self._slugs[obj.slug] = pk
+            while len(self._local) > self.max_entries:
+                evicted_pk, (evicted, _, _) = self._local.popitem(last=False)
+                self._slugs.pop(evicted.slug, None)
+                self.counters["evictions"] += 1
+
+    def _local_drop(self, pk: str, slug: str | None = None) -> None:
+        with self._lock:
+            entry = self._local.pop(pk, None)
+            if entry is not None:
+                self._slugs.pop(entry[0].slug, None)
+            if slug:
+                self._slugs.pop(slug, None)
+
+    # -- public API ----------------------------------------------------------
+
+    def get_by_id(self, pk) -> Property | None:
+        pk = str(pk)
+        version = self._current_version(pk)
+
+        local = self._local_get(pk)
+        if local is not None and local[1] == version:
+            self.counters["local_hits"] += 1
+            return local[0]
+
+        obj = self.shared.get(self._object_key(pk, version))
+        if obj is not None:
+            self.counters["shared_hits"] += 1
+            self._local_put(obj, version)
+            return obj
+
+        self.counters["misses"] += 1
+        obj = Property.objects.filter(pk=pk).first()
+        if obj is not None:
+            self._store(obj, version)
+        return obj
+
+    def get_by_slug(self, slug: str) -> Property | None:
+        pk = self._slugs.get(slug) or self.shared.get(self._slug_key(slug))
+        if pk is not None:
+            obj = self.get_by_id(pk)
+            if obj is not None and obj.slug == slug:
+                return obj
+            self._local_drop(pk, slug)
+
+        self.counters["misses"] += 1
+        obj = Property.objects.filter(slug=slug).first()
+        if obj is not None:
+            self._store(obj, self._current_version(str(obj.pk)))
+        return obj
+
+    def _current_versions(self, pks: list[str]) -> dict[str, str]:
+        if not pks:
+            return {}
+        keys = {self._version_key(pk): pk for pk in pks}
+        versions = {keys[key]: version for key, version in self.shared.get_many(list(keys)).items()}
+        for pk in pks:
+            if pk not in versions:
+                versions[pk] = self._current_version(pk)
+        return versions
+
+    def _get_cached(self, pks: list[str]) -> tuple[dict[str, Property], list[str], dict[str, str]]:
+        """Cache hits, the ids that missed and the versions read, in two shared-tier reads."""
+        versions = self._current_versions(pks)
+        found: dict[str, Property] = {}
+        remote: list[str] = []
+        for pk in pks:
+            local = self._local_get(pk)
+            if local is not None and local[1] == versions[pk]:
+                self.counters["local_hits"] += 1
+                found[pk] = local[0]
+            else:
+                remote.append(pk)
+        if remote:
+            keys = {self._object_key(pk, versions[pk]): pk for pk in remote}
+            for key, obj in self.shared.get_many(list(keys)).items():
+                pk = keys[key]
+                self.counters["shared_hits"] += 1
+                self._local_put(obj, versions[pk])
+                found[pk] = obj
+        return found, [pk for pk in remote if pk not in found], versions
+
+    def get_many(self, pks: Iterable) -> dict[str, Property]:
+        """Return ``{str(pk): Property}`` for the given ids, in the order given.
+
+        The cost does not grow with the number of ids: one shared-tier read
+        for the versions and one for the objects, then one ``in_bulk`` query
+        and one write for whatever missed.
+        """
+        pks = list(dict.fromkeys(str(pk) for pk in pks))
+        if not pks:
+            return {}
+        found, missing, versions = self._get_cached(pks)
+        if missing:
+            self.counters["misses"] += len(missing)
+            loaded = {str(pk): obj for pk, obj in Property.objects.in_bulk(missing).items()}
+            self._store_many(loaded.values(), versions)
+            found.update(loaded)
+        return {pk: found[pk] for pk in pks if pk in found}
+
+    def get_many_by_slug(self, slugs: Iterable[str]) -> dict[str, Property]:
+        """Return ``{slug: Property}`` for the given slugs, in the order given, like ``get_many``."""
+        slugs = list(dict.fromkeys(slugs))
+        if not slugs:
+            return {}
+        pks = {slug: self._slugs.get(slug) for slug in slugs}
+        unknown = {self._slug_key(slug): slug for slug, pk in pks.items() if pk is None}
+        if unknown:
+            for key, pk in self.shared.get_many(list(unknown)).items():
+                pks[unknown[key]] = pk
+        found, _, _ = self._get_cached([pk for pk in pks.values() if pk is not None])
+        by_slug = {obj.slug: obj for obj in found.values()}
+
+        # Slugs never cached, evicted, or renamed since: one query for all of them.
+        missing = [slug for slug in slugs if slug not in by_slug]
+        if missing:
+            self.counters["misses"] += len(missing)
+            loaded = Property.objects.in_bulk(missing, field_name="slug")
+            self._store_many(loaded.values(), self._current_versions([str(obj.pk) for obj in loaded.values()]))
+            by_slug.update(loaded)
+        return {slug: by_slug[slug] for slug in slugs if slug in by_slug}
+
+    def _store(self, obj: Property, version: str) -> None:
+        pk = str(obj.pk)
+        self.shared.set(self._object_key(pk, version), obj, self.shared_ttl)
+        self.shared.set(self._slug_key(obj.slug), pk, self.shared_ttl)
+        self._local_put(obj, version)
+
+    def _store_many(self, objs: Iterable[Property], versions: dict[str, str]) -> None:
+        entries = {}
+        for obj in objs:
+            pk = str(obj.pk)
+            entries[self._object_key(pk, versions[pk])] = obj
+            entries[self._slug_key(obj.slug)] = pk
+            self._local_put(obj, versions[pk])
+        if entries:
+            self.shared.set_many(entries, self.shared_ttl)
+
+    def invalidate(self, pk, slug: str | None = None) -> None:
+        pk = str(pk)
+        # A plain set: concurrent invalidations each leave a token no cached object was stored under.
+        self.shared.set(self._version_key(pk), self._new_version(), None)
+        if slug:
+            self.shared.delete(self._slug_key(slug))
+        self._local_drop(pk, slug)
+        self.counters["invalidations"] += 1
+
+    def invalidate_on_commit(self, pk, slug: str | None = None, using: str = "default") -> None:
+        """Invalidate now and again once the surrounding transaction commits.
+
+        The second pass closes the window in which another worker could
+        re-populate the cache with the pre-commit row.
+        """
+        self.invalidate(pk, slug)
+        transaction.on_commit(lambda: self.invalidate(pk, slug), using=using)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+            self._slugs.clear()
+
+    def stats(self) -> dict:
+        lookups = self.counters["local_hits"] + self.counters["shared_hits"] + self.counters["misses"]
+        hits = self.counters["local_hits"] + self.counters["shared_hits"]
+        return {
+            **self.counters,
+            "local_size": len(self._local),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+property_cache = PropertyCache(
+    max_entries=getattr(settings, "PROPERTY_CACHE_MAX_ENTRIES", 512),
+    local_ttl=getattr(settings, "PROPERTY_CACHE_LOCAL_TTL", 30.0),
+    shared_ttl=getattr(settings, "PROPERTY_CACHE_SHARED_TTL", 3600),
+)
+
+
+def generation(name: str) -> int:
+    """Shared counter for ``name``; per-worker indexes compare it to detect staleness."""
+    shared = property_cache.shared
+    key = f"generation:{name}"
+    value = shared.get(key)
+    if value is None:
+        shared.add(key, 1, None)
+        value = shared.get(key, 1)
+    return value
+
+
+def bump_generation(name: str) -> int:
+    shared = property_cache.shared
+    key = f"generation:{name}"
+    try:
+        return shared.incr(key)
+    except ValueError:
+        shared.set(key, 2, None)
+        return 2
+
+
+def listing_generation() -> int:
+    return generation("listings")
+
+
+def bump_listing_generation() -> int:
+    return bump_generation("listings")
+
+
+def get_property_or_404(slug: str) -> Property:
+    prop = property_cache.get_by_slug(slug)
+    if prop is None:
+        raise Http404("No Property matches the given query.")
+    return prop
@@ -0,0 +1,84 @@
+"""SQLite tuned for several gunicorn workers sharing one database file.
+
+Stock SQLite raises "database is locked" as soon as a dashboard read and a
+lead write overlap. The production profile (``sqlite_options``) changes
+four things on every new connection:
+
+* ``journal_mode=WAL``: readers no longer block the writer, and the writer
+  no longer blocks readers;
+* ``synchronous=NORMAL``: under WAL, commits stop fsyncing and only
+  checkpoints do; a power cut can lose the last commits but never corrupts;
+* ``mmap_size`` / ``cache_size`` / ``temp_store``: pages are read through
+  the OS page cache, with a larger private cache and in-memory sort spill;
+* ``busy_timeout`` plus ``BEGIN IMMEDIATE``: a writer takes the write lock
+  when its transaction starts, so a competing writer waits in SQLite's busy
+  handler. A deferred transaction that upgrades from read to write fails at
+  once instead, whatever the timeout.
+
+``retry_on_busy`` covers what is left. When a wait runs out, it re-runs the
+whole transaction after a jittered backoff.
+"""
+from __future__ import annotations
+
+import random
+import time
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+BUSY_TIMEOUT_MS = 5000
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": BUSY_TIMEOUT_MS,
+    "mmap_size": 256 * 2**20,
+    # Negative sizes are in KiB: 32 MiB of page cache per connection.
+    "cache_size": -32_000,
+    "temp_store": "MEMORY",
+}
+
+
+def sqlite_options(pragmas: dict | None = None, busy_timeout_ms: int = BUSY_TIMEOUT_MS) -> dict:
+    """``OPTIONS`` for a sqlite3 ``DATABASES`` entry that apply the production profile."""
+    pragmas = {**SQLITE_PRAGMAS, "busy_timeout": busy_timeout_ms, **(pragmas or {})}
+    return {
+        "timeout": busy_timeout_ms / 1000,
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join(f"PRAGMA {name}={value}" for name, value in pragmas.items()),
+    }
+
+
+def is_busy(exc: BaseException) -> bool:
+    message = str(exc).lower()
+    return isinstance(exc, OperationalError) and ("locked" in message or "busy" in message)
+
+
+def retry_on_busy(func=None, *, attempts: int = 4, delay: float = 0.05, using: str = DEFAULT_DB_ALIAS):
+    """Run ``func`` in its own transaction, again from scratch while the database is busy.
+
+    Once the transaction has committed, nothing is retried, even if an
+    ``on_commit`` callback then hits a busy database. Called inside an outer
+    transaction, ``func`` simply runs: only the outermost transaction can
+    be retried.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if connections[using].in_atomic_block:
+                return func(*args, **kwargs)
+            for attempt in range(attempts):
+                committed = []
+                try:
+                    with transaction.atomic(using=using):
+                        # Registered first, so it runs before any other callback.
+                        transaction.on_commit(lambda: committed.append(True), using=using)
+                        return func(*args, **kwargs)
+                except OperationalError as exc:
+                    if committed or not is_busy(exc) or attempt == attempts - 1:
+                        raise
+                time.sleep(delay * 2**attempt * random.uniform(0.5, 1.5))
+
+        return wrapper
+
+    return decorator if func is None else decorator(func)
@@ -0,0 +1,477 @@
+"""Sharded sitemaps and partner listing feeds, rebuilt incrementally.
+
+Listings are split into shards by primary-key range. UUIDv7 keys are
+time-ordered, so new listings land in the last shard and shard boundaries
+stay put between runs. Each shard is written as
+
+* ``sitemap-NNNN.xml``     (sitemaps.org urlset, with ``.gz`` and ``.br``),
+* ``listings-NNNN.ndjson`` (one JSON object per listing, with ``.gz``), and
+* ``listings-NNNN.xml``    (with ``.gz``),
+
+plus a ``shard-NNNN.keys`` sidecar holding the shard's keys in order.
+``sitemap.xml`` (a sitemap index) and ``listings.json`` (the partner index)
+point at the shards; ``manifest.json`` records shard boundaries, counts and
+the cut-off of the last run.
+
+The next run asks the database only for keys whose ``updated_at`` (or
+tombstone ``deleted_at``) is newer than that cut-off. Shards containing none
+of them are left alone; the rest are spliced from their previous output with
+only the changed rows re-read and re-rendered, then recompressed.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import re
+import tempfile
+import uuid
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Property, PropertyTombstone
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+MANIFEST_VERSION = 1
+# Transactions that commit after a run started can carry an older updated_at.
+CHANGE_SKEW = timedelta(minutes=1)
+FEED_FIELDS = (
+    "id",
+    "slug",
+    "title",
+    "description",
+    "price_amount",
+    "city",
+    "area",
+    "beds",
+    "baths",
+    "floor_area_sqm",
+    "parking",
+    "hero_image",
+    "badges",
+    "created_at",
+    "updated_at",
+)
+FEED_NAME_RE = re.compile(r"^(sitemap|listings)(-\d{4,})?\.(xml|ndjson|json)$")
+SHARD_FILE_RE = re.compile(r"^((sitemap|listings)-\d{4,}\.(xml|ndjson)(\.gz|\.br)?|shard-\d{4,}\.keys)$")
+# Pattern, header, footer and whether a .br copy is worth its CPU. Bodies hold
+# one line per listing in key order, which is what lets _patch splice them.
+# Partner shards are fetched by a handful of gzip-capable clients, so they
+# skip Brotli to keep incremental rebuilds cheap.
+SHARD_FORMATS = (
+    (
+        "sitemap-{:04d}.xml",
+        b'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+        b"</urlset>\n",
+        True,
+    ),
+    ("listings-{:04d}.ndjson", b"", b"", False),
+    ("listings-{:04d}.xml", b'<?xml version="1.0" encoding="UTF-8"?>\n<listings>\n', b"</listings>\n", False),
+)
+XML_LINE_ENTITIES = {"\n": "&#10;", "\r": "&#13;"}
+CONTENT_TYPES = {
+    ".xml": "application/xml",
+    ".ndjson": "application/x-ndjson",
+    ".json": "application/json",
+}
+
+
+@dataclass
+class Shard:
+    number: int
+    start: str | None  # hex of the first primary key in range; None for the first shard
+    count: int = 0
+    lastmod: str | None = None
+
+    @property
+    def start_int(self) -> int:
+        return uuid.UUID(self.start).int if self.start else -1
+
+
+@dataclass
+class BuildResult:
+    full: bool
+    shards: int
+    rewritten: int
+    removed: int
+    listings: int
+
+
+def feeds_root() -> Path:
+    return Path(getattr(settings, "FEEDS_ROOT", Path(settings.BASE_DIR) / "var" / "feeds"))
+
+
+def feed_file(name: str, accept_encoding: str = "") -> tuple[Path, str | None] | None:
+    """Best precompressed variant of a generated file for the client, or None if unknown."""
+    from .middleware import negotiate_encoding
+
+    if not FEED_NAME_RE.match(name):
+        return None
+    path = feeds_root() / name
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is not None:
+        variant = path.with_name(name + (".br" if encoding == "br" else ".gz"))
+        if variant.exists():
+            return variant, encoding
+    return (path, None) if path.exists() else None
+
+
+class FeedBuilder:
+    def __init__(
+        self,
+        root: Path | None = None,
+        site_url: str | None = None,
+        shard_size: int | None = None,
+        using: str = "default",
+        workers: int | None = None,
+    ):
+        self.root = Path(root) if root else feeds_root()
+        self.site_url = (site_url if site_url is not None else settings.SITE_URL).rstrip("/")
+        self.shard_size = shard_size or getattr(settings, "FEEDS_SHARD_SIZE", 10_000)
+        self.using = using
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.detail_prefix, self.detail_suffix = reverse("property_detail", args=["__slug__"]).split("__slug__")
+        self.feed_prefix = reverse("feed_file", args=["sitemap.xml"]).rsplit("sitemap.xml", 1)[0]
+
+    # -- entry point -----------------------------------------------------------
+
+    def build(self, full: bool = False) -> BuildResult:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "w") as lock, ThreadPoolExecutor(self.workers) as pool:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._pool, self._pending = pool, []
+            started = timezone.now()
+            manifest = self._load_manifest()
+            if full or manifest is None:
+                full, rewritten, removed = True, self._build_all(), 0
+            else:
+                rewritten, removed = self._build_changed(manifest)
+            for future in self._pending:
+                future.result()
+            self._write_indexes()
+            self._write_json(
+                "manifest.json",
+                {
+                    "version": MANIFEST_VERSION,
+                    "site_url": self.site_url,
+                    "shard_size": self.shard_size,
+                    "cutoff": (started - CHANGE_SKEW).isoformat(),
+                    "next_number": self.next_number,
+                    "shards": [asdict(shard) for shard in self.shards],
+                },
+                compress=False,
+            )
+        return BuildResult(
+            full=full,
+            shards=len(self.shards),
+            rewritten=rewritten,
+            removed=removed,
+            listings=sum(shard.count for shard in self.shards),
+        )
+
+    def _load_manifest(self) -> dict | None:
+        try:
+            manifest = json.loads((self.root / "manifest.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if (
+            manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("site_url") != self.site_url
+            or manifest.get("shard_size") != self.shard_size
+        ):
+            return None
+        return manifest
+
+    # -- full and incremental builds ---------------------------------------------
+
+    def _rows(self):
+        return Property.objects.using(self.using).order_by("id").values_list(*FEED_FIELDS)
+
+    def _build_all(self) -> int:
+        stale = {path.name for path in self.root.iterdir() if SHARD_FILE_RE.match(path.name)}
+        self.shards, self.next_number = [], 1
+        batch: list[tuple] = []
+        for row in self._rows().iterator(chunk_size=2000):
+            batch.append(row)
+            if len(batch) == self.shard_size:
+                self._emit_new(batch)
+                batch = []
+        if batch or not self.shards:
+            self._emit_new(batch)
+        stale -= {name for shard in self.shards for name in shard_files(shard.number)}
+        for name in stale:
+            (self.root / name).unlink(missing_ok=True)
+        return len(self.shards)
+
+    def _emit_new(self, rows: list[tuple]) -> None:
+        start = row_hex(rows[0]) if self.shards and rows else None
+        self.shards.append(self._emit(self._new_shard(start), rows))
+
+    def _build_changed(self, manifest: dict) -> tuple[int, int]:
+        self.shards = [Shard(**shard) for shard in manifest["shards"]]
+        self.next_number = manifest["next_number"]
+        cutoff = datetime.fromisoformat(manifest["cutoff"])
+        bounds = [shard.start_int for shard in self.shards[1:]]
+
+        dirty: dict[int, set[uuid.UUID]] = {}
+        changed = (
+            Property.objects.using(self.using).filter(updated_at__gte=cutoff).order_by().values_list("id", flat=True)
+        )
+        deleted = (
+            PropertyTombstone.objects.using(self.using)
+            .filter(deleted_at__gte=cutoff)
+            .order_by()
+            .values_list("id", flat=True)
+        )
+        for queryset in (changed, deleted):
+            for pk in queryset.iterator(chunk_size=5000):
+                dirty.setdefault(bisect_right(bounds, pk.int), set()).add(pk)
+
+        rewritten = removed = 0
+        shards: list[Shard] = []
+        for index, shard in enumerate(self.shards):
+            if index not in dirty:
+                shards.append(shard)
+                continue
+            pieces = self._patch(shard, dirty[index])
+            if pieces is None:
+                end = self.shards[index + 1].start if index + 1 < len(self.shards) else None
+                pieces = self._rewrite_range(shard, end)
+            rewritten += len(pieces)
+            if not pieces:
+                removed += 1
+                for name in shard_files(shard.number):
+                    (self.root / name).unlink(missing_ok=True)
+            shards.extend(pieces)
+        if shards and shards[0].start is not None:
+            shards[0].start = None  # the first shard always covers everything below the second
+        if not shards:
+            shards = [self._emit(self._new_shard(None), [])]
+        self.shards = shards
+        return rewritten, removed
+
+    def _patch(self, shard: Shard, changed: set[uuid.UUID]) -> list[Shard] | None:
+        """Rebuild a shard from its previous output, rendering only the ``changed`` rows.
+
+        Every shard file holds one line per listing in key order and the
+        ``.keys`` sidecar lists those keys, so unchanged lines are copied as
+        bytes. Returns None when the old output is unusable or the shard has
+        grown enough to need splitting; the caller then rewrites the range.
+        """
+        try:
+            data = (self.root / f"shard-{shard.number:04d}.keys").read_bytes()
+            bodies = []
+            for pattern, head, tail, _ in SHARD_FORMATS:
+                content = (self.root / pattern.format(shard.number)).read_bytes()
+                body = content[len(head):len(content) - len(tail)]
+                bodies.append(body.split(b"\n")[:-1] if body else [])
+        except OSError:
+            return None
+        keys = [data[offset:offset + 16] for offset in range(0, len(data), 16)]
+        if any(len(body) != len(keys) for body in bodies):
+            return None
+
+        pks = list(changed)
+        fresh = []
+        for offset in range(0, len(pks), 500):
+            fresh.extend(self._rows().filter(id__in=pks[offset:offset + 500]))
+        rendered = self._render(fresh)
+        gone = {pk.bytes for pk in pks}
+        entries = sorted(
+            [(key, 0, line) for line, key in enumerate(keys) if key not in gone]
+            + [(row[0].bytes, 1, line) for line, row in enumerate(fresh)]
+        )
+        if len(entries) > self.shard_size * 3 // 2:
+            return None
+        if not entries:
+            return []
+        sources = (bodies, rendered)
+        lines = tuple([sources[source][fmt][line] for _, source, line in entries] for fmt in range(len(SHARD_FORMATS)))
+        lastmod = max([datetime.fromisoformat(shard.lastmod)] + [row[14] for row in fresh])
+        return [self._store(shard, [key for key, _, _ in entries], lines, lastmod)]
+
+    def _rewrite_range(self, shard: Shard, end: str | None) -> list[Shard]:
+        """Rewrite one shard's key range from the database, splitting it if it has grown too large."""
+        rows = self._rows()
+        if shard.start:
+            rows = rows.filter(id__gte=uuid.UUID(shard.start))
+        if end:
+            rows = rows.filter(id__lt=uuid.UUID(end))
+        total = rows.count()
+        if total == 0:
+            return []
+        parts = -(-total // self.shard_size) if total > self.shard_size * 3 // 2 else 1
+        per_part = -(-total // parts)
+
+        pieces, batch = [], []
+        for row in rows.iterator(chunk_size=2000):
+            batch.append(row)
+            if len(batch) == per_part and len(pieces) < parts - 1:
+                pieces.append(self._emit(shard if not pieces else self._new_shard(row_hex(batch[0])), batch))
+                batch = []
+        if batch:
+            pieces.append(self._emit(shard if not pieces else self._new_shard(row_hex(batch[0])), batch))
+        return pieces
+
+    def _new_shard(self, start: str | None) -> Shard:
+        shard = Shard(number=self.next_number, start=start)
+        self.next_number += 1
+        return shard
+
+    # -- rendering -----------------------------------------------------------------
+
+    def _emit(self, shard: Shard, rows: list[tuple]) -> Shard:
+        lastmod = max((row[14] for row in rows), default=None)
+        return self._store(shard, [row[0].bytes for row in rows], self._render(rows), lastmod)
+
+    def _store(self, shard: Shard, keys: list[bytes], lines: tuple[list[bytes], ...], lastmod) -> Shard:
+        shard.count = len(keys)
+        shard.lastmod = (lastmod or timezone.now()).isoformat(timespec="seconds")
+        for (pattern, head, tail, use_brotli), body in zip(SHARD_FORMATS, lines):
+            content = head + b"\n".join(body) + b"\n" + tail if body else head + tail
+            self._write(pattern.format(shard.number), content, use_brotli=use_brotli)
+        self._write(f"shard-{shard.number:04d}.keys", b"".join(keys), compress=False)
+        return shard
+
+    def _render(self, rows: list[tuple]) -> tuple[list[bytes], list[bytes], list[bytes]]:
+        """One line per row for each of SHARD_FORMATS (no newlines inside a line)."""
+        base = self.site_url + self.detail_prefix
+        suffix = self.detail_suffix
+        sitemap, ndjson, xml = [], [], []
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        for (pk, slug, title, description, price, city, area, beds, baths, sqm, parking, image, badges,
+             created_at, updated_at) in rows:
+            url = base + slug + suffix
+            updated = updated_at.isoformat(timespec="seconds")
+            badge_list = [badge.strip() for badge in badges.split(",") if badge.strip()]
+            sitemap.append(f"<url><loc>{_xml(url)}</loc><lastmod>{updated}</lastmod></url>".encode())
+            ndjson.append(
+                dumps(
+                    {
+                        "id": str(pk),
+                        "url": url,
+                        "title": title,
+                        "description": description,
+                        "price": price,
+                        "currency": "PHP",
+                        "city": city,
+                        "area": area,
+                        "beds": beds,
+                        "baths": baths,
+                        "floor_area_sqm": sqm,
+                        "parking": parking,
+                        "image": image,
+                        "badges": badge_list,
+                        "created_at": created_at.isoformat(timespec="seconds"),
+                        "updated_at": updated,
+                    }
+                ).encode()
+            )
+            xml.append(
+                (
+                    f"<listing id={quoteattr(str(pk))}><url>{_xml(url)}</url><title>{_xml(title)}</title>"
+                    f"<description>{_xml(description)}</description><price currency=\"PHP\">{price}</price>"
+                    f"<city>{_xml(city)}</city><area>{_xml(area)}</area><beds>{beds}</beds><baths>{baths}</baths>"
+                    f"<floor_area_sqm>{sqm}</floor_area_sqm><parking>{'true' if parking else 'false'}</parking>"
+                    f"<image>{_xml(image)}</image><badges>{_xml(', '.join(badge_list))}</badges>"
+                    f"<updated_at>{updated}</updated_at></listing>"
+                ).encode()
+            )
+        return sitemap, ndjson, xml
+
+    def _write_indexes(self) -> None:
+        base = self.site_url + self.feed_prefix
+        entries = "".join(
+            f"<sitemap><loc>{_xml(base)}sitemap-{shard.number:04d}.xml</loc><lastmod>{shard.lastmod}</lastmod></sitemap>\n"
+            for shard in self.shards
+        )
+        index = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            f"{entries}</sitemapindex>\n"
+        )
+        self._write("sitemap.xml", index.encode(), wait=True)
+        self._write_json(
+            "listings.json",
+            {
+                "generated_at": timezone.now().isoformat(timespec="seconds"),
+                "count": sum(shard.count for shard in self.shards),
+                "shards": [
+                    {
+                        "ndjson": f"{base}listings-{shard.number:04d}.ndjson",
+                        "xml": f"{base}listings-{shard.number:04d}.xml",
+                        "count": shard.count,
+                        "lastmod": shard.lastmod,
+                    }
+                    for shard in self.shards
+                ],
+            },
+        )
+
+    # -- files -------------------------------------------------------------------
+
+    def _write_json(self, name: str, data: dict, compress: bool = True) -> None:
+        self._write(name, json.dumps(data, indent=1).encode(), compress=compress, wait=True)
+
+    def _write(
+        self, name: str, data: bytes, compress: bool = True, use_brotli: bool = True, wait: bool = False
+    ) -> None:
+        # Compression releases the GIL, so shards compress in parallel while the
+        # next one is read; bounding the queue bounds memory on full builds.
+        while len(self._pending) >= self.workers * 2:
+            self._pending.pop(0).result()
+        future = self._pool.submit(self._write_variants, name, data, compress, use_brotli)
+        if wait:
+            future.result()
+        else:
+            self._pending.append(future)
+
+    def _write_variants(self, name: str, data: bytes, compress: bool, use_brotli: bool) -> None:
+        _atomic_write(self.root / name, data)
+        if compress:
+            _atomic_write(self.root / f"{name}.gz", gzip.compress(data, compresslevel=6, mtime=0))
+            if use_brotli and brotli is not None:
+                _atomic_write(self.root / f"{name}.br", brotli.compress(data, quality=5))
+
+
+def row_hex(row: tuple) -> str:
+    return row[0].hex
+
+
+def shard_files(number: int) -> list[str]:
+    names = [pattern.format(number) for pattern, *_ in SHARD_FORMATS]
+    return [name + suffix for name in names for suffix in ("", ".gz", ".br")] + [f"shard-{number:04d}.keys"]
+
+
+def _xml(text: str) -> str:
+    return escape(text, XML_LINE_ENTITIES)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Lead
+from .models import Lead, SavedSearch
 
 
 class LeadForm(forms.ModelForm):
@@ -23,3 +23,18 @@ class LeadForm(forms.ModelForm):
         return phone.replace(" ", "").strip()
 
 
+class SavedSearchForm(forms.ModelForm):
+    class Meta:
+        model = SavedSearch
+        fields = ["email", "q", "city", "beds", "price_max"]
+
+
+class BookingForm(forms.Form):
+    property = forms.UUIDField()
+    start = forms.DateTimeField()
+    name = forms.CharField(max_length=255)
+    phone = forms.CharField(max_length=255)
+    lead = forms.UUIDField(required=False)
+
+    def clean_phone(self):
+        return self.cleaned_data.get("phone", "").replace(" ", "").strip()
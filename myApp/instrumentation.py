@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import time
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` that totals query count and DB time.
+
+    Usage::
+
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = get_response(request)
+        timer.count, timer.seconds
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
@@ -0,0 +1,142 @@
+"""Lead interests and preferred areas as join tables, plus per-listing lead counts.
+
+``Lead.interest_ids`` and ``Lead.areas`` stay as submitted; ``link_lead``
+parses them into ``Lead.interests`` and ``Lead.preferred_areas``. The
+interest CSV holds listing ids or slugs (the lead form fills in the slug
+from the page URL), so both are accepted.
+
+``Property.lead_count`` follows ``Lead.interests`` through the
+``m2m_changed`` receiver in ``myApp.signals``, which calls
+``adjust_lead_counts`` with F() updates. Bulk writes that skip signals
+(``backfill_lead_relations``) call ``recount_leads`` afterwards.
+"""
+from __future__ import annotations
+
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .cache import property_cache
+from .live import publish
+from .models import Area, Lead, Property
+from .ranking import rerank
+
+SEPARATORS = (";", "|", "/")
+_counts_frozen: ContextVar[bool] = ContextVar("lead_counts_frozen", default=False)
+
+
+def split_csv(value: str) -> list[str]:
+    for separator in SEPARATORS:
+        value = value.replace(separator, ",")
+    return [token for token in (part.strip() for part in value.split(",")) if token]
+
+
+def parse_interests(value: str) -> tuple[set[uuid.UUID], set[str]]:
+    """Split an ``interest_ids`` CSV into listing ids and listing slugs."""
+    ids: set[uuid.UUID] = set()
+    slugs: set[str] = set()
+    for token in split_csv(value):
+        try:
+            ids.add(uuid.UUID(token))
+        except ValueError:
+            slugs.add(token.strip("/"))
+    return ids, slugs
+
+
+def parse_areas(value: str) -> dict[str, str]:
+    """``{slug: name}`` for each distinct area in an ``areas`` CSV."""
+    areas: dict[str, str] = {}
+    for token in split_csv(value):
+        name = " ".join(token.split())[:64]
+        slug = slugify(name)[:64]
+        if slug:
+            areas.setdefault(slug, name)
+    return areas
+
+
+def resolve_properties(ids: Iterable[uuid.UUID], slugs: Iterable[str], using: str = "default") -> dict:
+    """``{id or slug: property pk}`` for the tokens that name an existing listing."""
+    ids, slugs = set(ids), set(slugs)
+    if not ids and not slugs:
+        return {}
+    found = {}
+    for pk, slug in Property.objects.using(using).filter(Q(pk__in=ids) | Q(slug__in=slugs)).values_list("pk", "slug"):
+        if pk in ids:
+            found[pk] = pk
+        if slug in slugs:
+            found[slug] = pk
+    return found
+
+
+def resolve_areas(areas: dict[str, str], using: str = "default") -> dict[str, uuid.UUID]:
+    """``{slug: Area pk}``, creating the areas not seen before."""
+    if not areas:
+        return {}
+    Area.objects.using(using).bulk_create(
+        [Area(slug=slug, name=name) for slug, name in areas.items()], ignore_conflicts=True
+    )
+    return dict(Area.objects.using(using).filter(slug__in=areas).values_list("slug", "pk"))
+
+
+def link_lead(lead: Lead) -> None:
+    """Fill ``lead.interests`` and ``lead.preferred_areas`` from its CSV columns."""
+    using = lead._state.db or "default"
+    ids, slugs = parse_interests(lead.interest_ids)
+    lead.interests.set(set(resolve_properties(ids, slugs, using).values()))
+    lead.preferred_areas.set(resolve_areas(parse_areas(lead.areas), using).values())
+
+
+@contextmanager
+def keep_lead_counts():
+    """Leave ``lead_count`` alone for deletes in this block (archival keeps counting them)."""
+    token = _counts_frozen.set(True)
+    try:
+        yield
+    finally:
+        _counts_frozen.reset(token)
+
+
+def lead_counts_frozen() -> bool:
+    return _counts_frozen.get()
+
+
+def adjust_lead_counts(property_pks: Iterable, delta: int, using: str = "default") -> None:
+    property_pks = list(property_pks)
+    if not property_pks or not delta:
+        return
+    Property.objects.using(using).filter(pk__in=property_pks).update(lead_count=F("lead_count") + delta)
+    rerank(property_pks, using)
+    # update() skips post_save, so drop the cached copies and tell the dashboards ourselves.
+    for pk in property_pks:
+        property_cache.invalidate_on_commit(pk, using=using)
+    diff = {"op": "leads", "ids": property_pks, "delta": delta}
+    transaction.on_commit(lambda: publish("property", diff, using), using=using)
+
+
+def recount_leads(using: str = "default", property_pks: Iterable | None = None) -> int:
+    """Recompute ``lead_count`` from the join table; returns how many were wrong."""
+    through = Lead.interests.through
+    counts = (
+        through.objects.filter(property_id=OuterRef("pk"))
+        .order_by()
+        .values("property_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    properties = Property.objects.using(using).alias(actual=Coalesce(Subquery(counts), Value(0)))
+    if property_pks is not None:
+        properties = properties.filter(pk__in=list(property_pks))
+    stale = list(properties.exclude(lead_count=F("actual")).values_list("pk", flat=True))
+    for start in range(0, len(stale), 500):
+        chunk = stale[start:start + 500]
+        Property.objects.using(using).filter(pk__in=chunk).update(lead_count=Coalesce(Subquery(counts), Value(0)))
+        rerank(chunk, using)
+        for pk in chunk:
+            property_cache.invalidate_on_commit(pk, using=using)
+    return len(stale)
@@ -0,0 +1,113 @@
+"""Server-Sent Events for the live dashboard, from a backlog every worker shares.
+
+Signals publish small JSON diffs about listings and leads once the
+transaction commits. ``publish`` stores each one as a ``LiveEvent`` row,
+so the event is visible to whichever worker serves a dashboard's stream,
+not only to the one that took the write. The newest ``BACKLOG`` rows are
+kept; older ones are pruned every ``PRUNE_EVERY`` publishes.
+
+``stream`` is a plain generator, so it runs under the WSGI workers the
+Procfile starts. It sends what is new since ``Last-Event-ID``, then polls
+the backlog every ``POLL_SECONDS`` until ``LIVE_STREAM_SECONDS`` have
+passed and ends. The browser reconnects ``RETRY_MS`` later with the last id
+it saw. Under WSGI that duration is 0, so each reconnect is one short
+request that answers and returns its worker: the dashboard polls every
+``RETRY_MS``. Behind an ASGI server, raise it so streams stay open and
+deliver within ``POLL_SECONDS``. It should stay well under the server's
+worker timeout.
+
+A client that fell further behind than the backlog is sent a ``reload``
+event instead.
+"""
+from __future__ import annotations
+
+import json
+import time
+
+from django.conf import settings
+
+from .models import LiveEvent
+
+BACKLOG = 1000
+PRUNE_EVERY = 100
+POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15.0
+RETRY_MS = 3000
+
+
+def encode(event_id: int, event: str, data: str) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+def publish(event: str, data: dict, using: str = "default") -> int:
+    row = LiveEvent.objects.using(using).create(
+        event=event, data=json.dumps(data, separators=(",", ":"), default=str)
+    )
+    if row.pk % PRUNE_EVERY == 0:
+        LiveEvent.objects.using(using).filter(pk__lte=row.pk - BACKLOG).delete()
+    return row.pk
+
+
+def last_id(using: str = "default") -> int:
+    return LiveEvent.objects.using(using).order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+def since(last: int, using: str = "default") -> tuple[int, bytes] | None:
+    """The newest id and the encoded events after ``last``; None if ``last`` already left the backlog."""
+    rows = list(LiveEvent.objects.using(using).filter(pk__gte=last).order_by("pk").values_list("pk", "event", "data"))
+    # ``last`` is an id we sent, so its row is there unless it was pruned (or the table reset).
+    if last:
+        if not rows or rows[0][0] != last:
+            return None
+        rows = rows[1:]
+    if not rows:
+        return last, b""
+    return rows[-1][0], b"".join(encode(*row) for row in rows)
+
+
+def stream(last: int | None, seconds: float | None = None, using: str = "default"):
+    """SSE body for one dashboard, starting after ``last`` (or now)."""
+    deadline = time.monotonic() + (settings.LIVE_STREAM_SECONDS if seconds is None else seconds)
+    yield f"retry: {RETRY_MS}\n\n".encode()
+    if last is None:
+        last = last_id(using)
+        # An id with no data sets the browser's Last-Event-ID without firing an event.
+        yield f"id: {last}\n\n".encode()
+    quiet_since = time.monotonic()
+    while True:
+        pending = since(last, using)
+        if pending is None:
+            yield b"event: reload\ndata: {}\n\n"
+            return
+        last, chunk = pending
+        now = time.monotonic()
+        if chunk:
+            yield chunk
+            quiet_since = now
+        elif now - quiet_since >= HEARTBEAT_SECONDS:
+            yield b": ping\n\n"
+            quiet_since = now
+        if now >= deadline:
+            return
+        time.sleep(min(POLL_SECONDS, deadline - now))
+
+
+def property_diff(instance, op: str) -> dict:
+    data = {"op": op, "id": instance.pk, "slug": instance.slug}
+    if op != "deleted":
+        data.update(
+            title=instance.title, city=instance.city, area=instance.area, price_amount=instance.price_amount,
+            beds=instance.beds, baths=instance.baths, lead_count=instance.lead_count,
+        )
+    return data
+
+
+def lead_diff(instance, op: str) -> dict:
+    data = {"op": op, "id": instance.pk}
+    if op != "deleted":
+        data.update(
+            name=instance.name, phone=instance.phone, buy_or_rent=instance.buy_or_rent,
+            budget_max=instance.budget_max, areas=instance.areas, score=instance.score,
+            converted=instance.converted, created_at=instance.created_at,
+        )
+    return data
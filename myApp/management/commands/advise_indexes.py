@@ -0,0 +1,108 @@
+import os
+import random
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from myApp import advisor
+from myApp.models import Property
+
+ALIAS = "index_advisor"
+AREAS = ["Poblacion", "BGC", "Ortigas", "Eastwood", "Ermita", "Legaspi Village", "Kapitolyo", "Salcedo"]
+WORDS = ["condo", "loft", "studio", "townhouse", "penthouse", "bright", "quiet", "corner", "renovated", "furnished"]
+
+
+class Command(BaseCommand):
+    help = "Replay listing filters through the results/dashboard querysets, EXPLAIN them and propose indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=None, help="advise on this alias instead of a scratch SQLite file")
+        parser.add_argument("--log", default=None, help="replay parameters from this access log instead of synthetic ones")
+        parser.add_argument("--listings", type=int, default=50_000, help="scratch database size")
+        parser.add_argument(
+            "--migration", default=None, help="migrate the scratch database only up to this myApp migration"
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="timed runs per shape")
+
+    def handle(self, *args, **options):
+        requests = advisor.logged_params(options["log"]) if options["log"] else advisor.synthetic_params()
+        if not requests:
+            raise CommandError(f"No results or dashboard GET requests in {options['log']}.")
+        source = f"{len(requests):,} requests from {options['log']}" if options["log"] else "synthetic parameters"
+
+        if options["database"]:
+            return self.report(requests, options["database"], source, options["repeat"])
+        with tempfile.TemporaryDirectory() as tmp:
+            databases = {
+                "default": connections.settings["default"],
+                ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(tmp, "advisor.sqlite3")},
+            }
+            connections.settings[ALIAS] = connections.configure_settings(databases)[ALIAS]
+            try:
+                if options["migration"]:
+                    call_command("migrate", "myApp", options["migration"], database=ALIAS, verbosity=0)
+                else:
+                    call_command("migrate", database=ALIAS, verbosity=0)
+                self.populate(options["listings"])
+                self.report(requests, ALIAS, f"{source}, {options['listings']:,} scratch listings", options["repeat"])
+            finally:
+                connections[ALIAS].close()
+                del connections[ALIAS]
+                del connections.settings[ALIAS]
+
+    def populate(self, listings: int) -> None:
+        rng = random.Random(5)
+        Property.objects.using(ALIAS).bulk_create(
+            [
+                Property(
+                    slug=f"listing-{i}", title=f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+                    description=" ".join(rng.sample(WORDS, 4)), city=rng.choice(advisor.CITIES),
+                    area=rng.choice(AREAS), price_amount=rng.randrange(15_000, 250_000, 500),
+                    beds=rng.randint(0, 4), rank_score=round(rng.uniform(0, 100), 1),
+                )
+                for i in range(listings)
+            ],
+            batch_size=2000,
+        )
+
+    def report(self, requests, using: str, source: str, repeat: int) -> None:
+        shapes = advisor.collect_shapes(requests, using)
+        advice = advisor.advise(shapes, using, repeat)
+        self.stdout.write(f"{len(shapes)} query shapes on {connections[using].vendor} ({source})\n")
+
+        self.stdout.write(f"{'shape':<60} {'hits':>5} {'ms':>8}  issues / unindexable predicates")
+        for shape in shapes:
+            unindexable = f"  [{', '.join(shape.terms.unindexable)}]" if shape.terms.unindexable else ""
+            self.stdout.write(f"{shape.name:<60} {shape.hits:>5,} {shape.ms:>8.2f}  {shape.plan.issues}{unindexable}")
+
+        self.stdout.write(f"\n{'candidate':<28} {'verdict':<10} best gain / worst loss")
+        for candidate in advice.recommended + advice.rejected:
+            if candidate in advice.recommended:
+                verdict = "recommend"
+            else:
+                verdict = "slower" if candidate.regressions else "redundant" if candidate.recommended else "no gain"
+            lines = []
+            if candidate.gains:
+                lines.append(max(candidate.gains, key=lambda entry: entry[0].ms - entry[1]))
+            if candidate.regressions:
+                lines.append(max(candidate.regressions, key=lambda entry: entry[1] - entry[0].ms))
+            detail = "; ".join(f"{shape.name}: {shape.ms:.2f} -> {ms:.2f} ms" for shape, ms in lines) or "-"
+            self.stdout.write(f"{', '.join(candidate.fields):<28} {verdict:<10} {detail}")
+        if not advice.recommended:
+            self.stdout.write(self.style.SUCCESS("\nNo new indexes needed."))
+            return
+
+        declared = {index.name for index in Property._meta.indexes}
+        self.stdout.write("\nRecommended (Property.Meta.indexes):")
+        for candidate in advice.recommended:
+            index = candidate.index()
+            note = "  # already declared" if index.name in declared else ""
+            self.stdout.write(f'    models.Index(fields={list(index.fields)!r}, name="{index.name}"),{note}')
+
+        self.stdout.write(f"\n{'shape':<60} {'before':>8} {'after':>8}  plan after")
+        for shape, (plan, ms) in zip(shapes, advice.after):
+            cost = f"  (cost {shape.plan.cost:.0f} -> {plan.cost:.0f})" if plan.cost is not None else ""
+            self.stdout.write(f"{shape.name:<60} {shape.ms:>8.2f} {ms:>8.2f}  {plan.issues}{cost}")
+        self.stdout.write(self.style.SUCCESS("\nShip the recommended indexes with `makemigrations myApp`."))
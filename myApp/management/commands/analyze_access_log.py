@@ -0,0 +1,64 @@
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myApp.accesslog import filter_combination, read_records
+
+
+class Command(BaseCommand):
+    help = "Summarise the JSONL access log by view and by view plus filter combination"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="log file (default: ACCESS_LOG_PATH)")
+        parser.add_argument("--view", default=None, help="only this URL name")
+        parser.add_argument("--top", type=int, default=20, help="filter combinations to list")
+        parser.add_argument("--current-only", action="store_true", help="skip rotated .gz generations")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.ACCESS_LOG_PATH
+        if not path:
+            raise CommandError("No log: pass --path or set ACCESS_LOG_PATH.")
+        rows, dropped = [], 0
+        for record in read_records(path, rotated=not options["current_only"]):
+            if record.get("event") == "dropped":
+                dropped += record["count"]
+                continue
+            if options["view"] and record.get("view") != options["view"]:
+                continue
+            rows.append(
+                (
+                    record.get("view") or "-", filter_combination(record.get("params") or {}), record["status"],
+                    record["ms"], record["db_ms"], record["queries"], record["bytes"],
+                )
+            )
+        if not rows:
+            self.stdout.write(f"No requests logged in {path}.")
+            return
+        frame = pd.DataFrame(rows, columns=["view", "filters", "status", "ms", "db_ms", "queries", "bytes"])
+        frame["errors"] = frame["status"] >= 500
+        frame["client_errors"] = frame["status"].between(400, 499)
+
+        self.stdout.write(f"{len(frame):,} requests, {dropped:,} dropped under backpressure\n")
+        self.stdout.write(
+            f"{'view':<22} {'requests':>9} {'share':>6} {'p50 ms':>8} {'p95 ms':>8} {'db ms':>7} "
+            f"{'queries':>8} {'KB':>7} {'4xx':>5} {'5xx':>5}"
+        )
+        for view, group in self.grouped(frame, ["view"]):
+            self.stdout.write(
+                f"{view:<22} {len(group):>9,} {100 * len(group) / len(frame):>5.1f}% "
+                f"{group['ms'].quantile(0.5):>8.1f} {group['ms'].quantile(0.95):>8.1f} {group['db_ms'].mean():>7.1f} "
+                f"{group['queries'].mean():>8.1f} {group['bytes'].mean() / 1024:>7.1f} "
+                f"{group['client_errors'].sum():>5,} {group['errors'].sum():>5,}"
+            )
+
+        self.stdout.write(f"\n{'view':<22} {'filters':<28} {'requests':>9} {'p95 ms':>8} {'db ms':>7} {'5xx':>5}")
+        for (view, filters), group in self.grouped(frame, ["view", "filters"])[: options["top"]]:
+            self.stdout.write(
+                f"{view:<22} {filters:<28} {len(group):>9,} {group['ms'].quantile(0.95):>8.1f} "
+                f"{group['db_ms'].mean():>7.1f} {group['errors'].sum():>5,}"
+            )
+
+    def grouped(self, frame: pd.DataFrame, keys: list[str]) -> list:
+        """Groups of ``frame`` by ``keys``, busiest first."""
+        groups = list(frame.groupby(keys if len(keys) > 1 else keys[0], sort=False))
+        return sorted(groups, key=lambda item: len(item[1]), reverse=True)
@@ -0,0 +1,29 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from myApp.archive import LeadArchive
+
+
+class Command(BaseCommand):
+    help = "Move leads older than LEAD_ARCHIVE_AFTER_DAYS into monthly Parquet files under LEAD_ARCHIVE_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, help="Defaults to LEAD_ARCHIVE_AFTER_DAYS")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        days = options.get("older_than_days") or settings.LEAD_ARCHIVE_AFTER_DAYS
+        before = timezone.now() - timedelta(days=days)
+        archive = LeadArchive(chunk_size=options.get("chunk_size", 5000))
+        started = time.perf_counter()
+        result = archive.archive(before)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {result.archived} lead(s) older than {days} day(s) across {result.months} month(s), "
+                f"removed {result.deleted} from the table in {time.perf_counter() - started:.2f}s -> {archive.root}"
+            )
+        )
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myApp.leads import parse_areas, parse_interests, recount_leads, resolve_areas, resolve_properties
+from myApp.models import Lead
+
+
+class Command(BaseCommand):
+    help = "Fill Lead.interests and Lead.preferred_areas from the interest_ids/areas CSV columns, then recount leads per listing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options.get("chunk_size", 2000)
+        started = time.perf_counter()
+        leads = interests = areas = 0
+        last = None
+        while True:
+            batch = Lead.objects.order_by("pk").exclude(interest_ids="", areas="")
+            if last is not None:
+                batch = batch.filter(pk__gt=last)
+            rows = list(batch.values_list("pk", "interest_ids", "areas")[:chunk_size])
+            if not rows:
+                break
+            with transaction.atomic():
+                added = self.link_chunk(rows)
+            leads += len(rows)
+            interests += added[0]
+            areas += added[1]
+            last = rows[-1][0]
+
+        corrected = recount_leads()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Linked {leads} lead(s): {interests} interest(s), {areas} area(s); "
+                f"corrected {corrected} lead count(s) in {time.perf_counter() - started:.2f}s"
+            )
+        )
+
+    def link_chunk(self, rows) -> tuple[int, int]:
+        """Resolve a chunk's tokens with one query per table and bulk-insert the join rows."""
+        parsed = [(pk, parse_interests(interest_ids), parse_areas(area_csv)) for pk, interest_ids, area_csv in rows]
+        properties = resolve_properties(
+            {pk for _, (ids, _), _ in parsed for pk in ids},
+            {slug for _, (_, slugs), _ in parsed for slug in slugs},
+        )
+        area_ids = resolve_areas({slug: name for *_, found in parsed for slug, name in found.items()})
+
+        interest_rows, area_rows = [], []
+        for lead_pk, (ids, slugs), found in parsed:
+            for property_pk in {properties[token] for token in ids | slugs if token in properties}:
+                interest_rows.append(Lead.interests.through(lead_id=lead_pk, property_id=property_pk))
+            for slug in found:
+                area_rows.append(Lead.preferred_areas.through(lead_id=lead_pk, area_id=area_ids[slug]))
+        # Re-runs are harmless: existing pairs hit the unique constraint and are skipped.
+        Lead.interests.through.objects.bulk_create(interest_rows, batch_size=1000, ignore_conflicts=True)
+        Lead.preferred_areas.through.objects.bulk_create(area_rows, batch_size=1000, ignore_conflicts=True)
+        return len(interest_rows), len(area_rows)
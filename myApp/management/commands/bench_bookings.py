@@ -0,0 +1,139 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.utils import timezone
+
+from myApp.bookings import SlotUnavailable, availability, grid, reserve
+from myApp.models import Agent, Booking, Property
+
+ALIAS = "bench_bookings"
+
+
+class Command(BaseCommand):
+    help = "Book viewings from many threads at once on a scratch SQLite database and check for double bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agents", type=int, default=2_000)
+        parser.add_argument("--listings", type=int, default=5_000)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=500, help="reservations tried per thread")
+        parser.add_argument("--hot", type=int, default=200, help="listings most requests go to, to force conflicts")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            databases = {
+                "default": connections.settings["default"],
+                ALIAS: {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": os.path.join(tmp, "bench.sqlite3"),
+                    "OPTIONS": {"timeout": 30, "transaction_mode": "IMMEDIATE"},
+                },
+            }
+            connections.settings[ALIAS] = connections.configure_settings(databases)[ALIAS]
+            try:
+                call_command("migrate", database=ALIAS, verbosity=0)
+                self.stdout.write(f"Inserting {options['listings']:,} listings and {options['agents']:,} agents...")
+                listings = self.populate(options["agents"], options["listings"])
+                self.run(listings, options)
+            finally:
+                connections[ALIAS].close()
+                del connections.settings[ALIAS]
+
+    def populate(self, agents: int, listings: int) -> list:
+        rng = random.Random(7)
+        properties = Property.objects.using(ALIAS).bulk_create(
+            [Property(slug=f"listing-{i}", title=f"Listing {i}", price_amount=20_000) for i in range(listings)],
+            batch_size=2000,
+        )
+        staff = Agent.objects.using(ALIAS).bulk_create([Agent(name=f"Agent {i}") for i in range(agents)], batch_size=2000)
+        # Most agents cover a patch of listings; every tenth one can show anything.
+        through = Agent.properties.through
+        links = [
+            through(agent_id=agent.pk, property_id=listing.pk)
+            for i, agent in enumerate(staff)
+            if i % 10
+            for listing in rng.sample(properties, min(25, listings))
+        ]
+        through.objects.using(ALIAS).bulk_create(links, batch_size=5000)
+        return properties
+
+    def run(self, listings: list, options) -> None:
+        now = timezone.now()
+        slots = grid(now + timedelta(days=1), now + timedelta(days=8))
+        hot = listings[: options["hot"]]
+        results = {"booked": 0, "taken": 0, "locked": 0}
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(seed: int) -> None:
+            rng = random.Random(seed)
+            local = {key: 0 for key in results}
+            timings = []
+            try:
+                for _ in range(options["attempts"]):
+                    listing = rng.choice(hot) if rng.random() < 0.8 else rng.choice(listings)
+                    started = time.perf_counter()
+                    try:
+                        reserve(listing, rng.choice(slots), "Bench", "0917", slots=rng.choice((1, 1, 2)), using=ALIAS)
+                        local["booked"] += 1
+                    except SlotUnavailable:
+                        local["taken"] += 1
+                    except ValueError:
+                        continue  # a two-slot booking that would run past closing
+                    except OperationalError:
+                        local["locked"] += 1
+                    timings.append(time.perf_counter() - started)
+            finally:
+                connections[ALIAS].close()
+            with lock:
+                for key, value in local.items():
+                    results[key] += value
+                latencies.extend(timings)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        attempts = len(latencies)
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{options['threads']} threads, {attempts:,} attempts in {elapsed:.2f}s ({attempts / elapsed:,.0f}/s): "
+            f"{results['booked']:,} booked, {results['taken']:,} conflicts, {results['locked']:,} lock timeouts"
+        )
+        self.stdout.write(f"reserve latency  p50 {quantiles[49] * 1000:.1f}ms  p95 {quantiles[94] * 1000:.1f}ms")
+
+        timings = []
+        for listing in hot[:50]:
+            started = time.perf_counter()
+            availability(listing, now, now + timedelta(days=14), using=ALIAS)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(f"availability (14 days, hot listing)  p50 {statistics.median(timings) * 1000:.1f}ms")
+
+        overlaps = self.overlaps()
+        style = self.style.SUCCESS if overlaps == 0 else self.style.ERROR
+        self.stdout.write(style(f"{overlaps} overlapping bookings for the same agent or listing"))
+
+    def overlaps(self) -> int:
+        """Count overlapping confirmed bookings straight from the intervals, independent of BookingSlot."""
+        table = connections[ALIAS].ops.quote_name(Booking._meta.db_table)
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {table} a JOIN {table} b "
+                f"ON a.id < b.id AND (a.agent_id = b.agent_id OR a.property_id = b.property_id) "
+                f"AND a.start < b.\"end\" AND b.start < a.\"end\" "
+                f"WHERE a.status = %s AND b.status = %s",
+                [Booking.CONFIRMED, Booking.CONFIRMED],
+            )
+            return cursor.fetchone()[0]
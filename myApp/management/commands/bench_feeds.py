@@ -0,0 +1,94 @@
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from myApp.feeds import FeedBuilder
+from myApp.models import Property
+
+ALIAS = "bench_feeds"
+
+
+class Command(BaseCommand):
+    help = "Time a full feed build and incremental rebuilds after a 1% change, on a scratch SQLite database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--change", type=float, default=0.01, help="Fraction of listings edited between runs")
+        parser.add_argument("--shard-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        rows, fraction = options["rows"], options["change"]
+        with tempfile.TemporaryDirectory() as tmp:
+            databases = {
+                "default": connections.settings["default"],
+                ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(tmp, "bench.sqlite3")},
+            }
+            connections.settings[ALIAS] = connections.configure_settings(databases)[ALIAS]
+            try:
+                call_command("migrate", database=ALIAS, verbosity=0)
+                self.stdout.write(f"Inserting {rows:,} listings...")
+                self.populate(rows)
+                builder = FeedBuilder(root=os.path.join(tmp, "feeds"), shard_size=options["shard_size"], using=ALIAS)
+
+                self.report("full build", builder, full=True)
+                ids = list(Property.objects.using(ALIAS).order_by("id").values_list("id", flat=True))
+                changed = max(1, int(rows * fraction))
+                self.age_rows()
+                self.touch(ids[-changed:])
+                self.report(f"{fraction:.0%} newest edited", builder)
+                self.age_rows()
+                self.touch(random.sample(ids, changed))
+                self.report(f"{fraction:.0%} scattered edits", builder)
+            finally:
+                connections[ALIAS].close()
+                del connections.settings[ALIAS]
+
+    def populate(self, rows: int) -> None:
+        created = timezone.now() - timedelta(days=1)
+        cities = ["Makati", "Taguig", "Pasig", "Quezon City", "Mandaluyong", "Manila"]
+        for start in range(0, rows, 20_000):
+            Property.objects.using(ALIAS).bulk_create(
+                [
+                    Property(
+                        slug=f"listing-{i}",
+                        title=f"{2 + i % 3}BR condo in {cities[i % 6]} #{i}",
+                        description="Bright corner unit with city views, near transit and malls.",
+                        price_amount=20_000 + (i * 7919) % 180_000,
+                        city=cities[i % 6],
+                        area="BGC" if i % 6 == 1 else "",
+                        beds=1 + i % 4,
+                        badges="Pet-friendly, Furnished" if i % 5 == 0 else "",
+                        created_at=created,
+                        updated_at=created,
+                    )
+                    for i in range(start, min(start + 20_000, rows))
+                ],
+                batch_size=1000,
+            )
+
+    def age_rows(self) -> None:
+        # Make earlier edits older than the builder's change-skew window.
+        Property.objects.using(ALIAS).update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def touch(self, ids) -> None:
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            Property.objects.using(ALIAS).filter(id__in=ids[start:start + 500]).update(
+                price_amount=F("price_amount") + 1, updated_at=timezone.now()
+            )
+
+    def report(self, label: str, builder: FeedBuilder, full: bool = False) -> None:
+        started = time.perf_counter()
+        result = builder.build(full=full)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<22} {elapsed:>7.2f}s  rewrote {result.rewritten:>4}/{result.shards} shard(s)"
+        )
@@ -0,0 +1,95 @@
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+
+from myApp.ids import uuid7
+from myApp.models import Area, Lead, Property
+from myApp.scoring import LeadScorer, score_open_leads
+
+ALIAS = "bench_lead_scoring"
+CITIES = ["Makati", "Taguig", "Pasig", "Quezon City", "Mandaluyong", "Manila"]
+SOURCES = ["", "google", "facebook", "tiktok", "newsletter", "partner"]
+
+
+class Command(BaseCommand):
+    help = "Time a full lead re-score on a scratch SQLite database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5_000_000)
+        parser.add_argument("--listings", type=int, default=50_000)
+        parser.add_argument("--chunk-size", type=int, default=250_000)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            databases = {
+                "default": connections.settings["default"],
+                ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(tmp, "bench.sqlite3")},
+            }
+            connections.settings[ALIAS] = connections.configure_settings(databases)[ALIAS]
+            try:
+                call_command("migrate", database=ALIAS, verbosity=0)
+                self.stdout.write(f"Inserting {options['listings']:,} listings and {options['rows']:,} leads...")
+                self.populate(options["listings"], options["rows"])
+
+                started = time.perf_counter()
+                scorer = LeadScorer.from_db(ALIAS)
+                self.stdout.write(f"{'scorer build':<16} {time.perf_counter() - started:>7.2f}s")
+                for label in ("first score", "re-score"):
+                    result = score_open_leads(using=ALIAS, chunk_size=options["chunk_size"], scorer=scorer)
+                    self.stdout.write(
+                        f"{label:<16} {result.seconds:>7.2f}s  {result.scored:,} scored, {result.updated:,} written "
+                        f"({result.scored / result.seconds:,.0f} leads/s)"
+                    )
+            finally:
+                connections[ALIAS].close()
+                del connections.settings[ALIAS]
+
+    def populate(self, listings: int, rows: int) -> None:
+        Property.objects.using(ALIAS).bulk_create(
+            [
+                Property(
+                    slug=f"listing-{i}", title=f"Listing {i}", price_amount=15_000 + (i * 7919) % 185_000,
+                    city=CITIES[i % 6], area="BGC" if i % 6 == 1 else "",
+                )
+                for i in range(listings)
+            ],
+            batch_size=2000,
+        )
+        areas = Area.objects.using(ALIAS).bulk_create(
+            [Area(slug=name.lower().replace(" ", "-"), name=name) for name in CITIES + ["BGC", "Alabang"]]
+        )
+        area_ids = [area.pk.hex for area in areas]
+
+        # Raw inserts: bulk_create would spend most of the run building model instances.
+        now = timezone.now()
+        lead_table = Lead._meta.db_table
+        through_table = Lead.preferred_areas.through._meta.db_table
+        random.seed(7)
+        cursor = connections[ALIAS].cursor()
+        for start in range(0, rows, 100_000):
+            leads, links = [], []
+            for i in range(start, min(start + 100_000, rows)):
+                pk = uuid7().hex
+                stamp = (now - timedelta(minutes=random.randrange(0, 525_600))).strftime("%Y-%m-%d %H:%M:%S.%f")
+                leads.append((
+                    pk, f"Lead {i}", "0917", "", "rent", None if i % 7 == 0 else random.randrange(10_000, 250_000),
+                    random.choice(SOURCES), i % 3 == 0, i % 50 == 0,
+                    stamp, stamp,
+                ))
+                for area_id in random.sample(area_ids, i % 3):
+                    links.append((pk, area_id))
+            with transaction.atomic(using=ALIAS):
+                cursor.executemany(
+                    f"INSERT INTO {lead_table} (id, name, phone, email, buy_or_rent, budget_max, utm_source, "
+                    f"consent_contact, converted, created_at, updated_at, areas, interest_ids, utm_campaign, referrer, score) "
+                    f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '', '', '', '', 0)",
+                    leads,
+                )
+                cursor.executemany(f"INSERT INTO {through_table} (lead_id, area_id) VALUES (%s, %s)", links)
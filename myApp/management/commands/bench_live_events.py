@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from myApp.db import sqlite_options
+from myApp.live import last_id, publish, since
+
+ALIAS = "bench_live"
+
+
+class Command(BaseCommand):
+    help = "Time publishing dashboard events and the backlog read each dashboard poll makes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dashboards", type=int, default=500, help="polls per round, one per open dashboard")
+        parser.add_argument("--events", type=int, default=2_000)
+        parser.add_argument("--batch", type=int, default=10, help="events published between polling rounds")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            databases = {
+                "default": connections.settings["default"],
+                ALIAS: {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": os.path.join(tmp, "bench.sqlite3"),
+                    "OPTIONS": sqlite_options(),
+                },
+            }
+            connections.settings[ALIAS] = connections.configure_settings(databases)[ALIAS]
+            try:
+                call_command("migrate", database=ALIAS, verbosity=0)
+                self.run(options)
+            finally:
+                connections[ALIAS].close()
+                del connections[ALIAS]
+                del connections.settings[ALIAS]
+
+    def run(self, options) -> None:
+        diff = {"op": "updated", "id": "0190c1d2-0000-7000-8000-000000000000", "title": "Listing", "price_amount": 25000}
+        rounds = options["events"] // options["batch"]
+        cursors = [last_id(ALIAS)] * options["dashboards"]
+        publishing = polling = 0.0
+        delivered = 0
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(options["batch"]):
+                publish("property", diff, ALIAS)
+            publishing += time.perf_counter() - started
+            started = time.perf_counter()
+            for n, cursor in enumerate(cursors):
+                pending = since(cursor, ALIAS)
+                if pending is not None:
+                    cursors[n], chunk = pending
+                    delivered += chunk.count(b"event: property")
+            polling += time.perf_counter() - started
+        polls = options["dashboards"] * rounds
+        self.stdout.write(
+            f"{rounds * options['batch']:,} events: {publishing / (rounds * options['batch']) * 1e6:.0f}us per publish; "
+            f"{polls:,} polls delivered {delivered:,} events at {polling / polls * 1e6:.0f}us per poll"
+        )
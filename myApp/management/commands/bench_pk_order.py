@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from myApp.ids import uuid7
+
+
+class Command(BaseCommand):
+    help = "Benchmark insert throughput and primary key index size for uuid4 vs UUIDv7 lead keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--backend",
+            choices=["sqlite", "default"],
+            default="sqlite",
+            help="'sqlite' uses a scratch database file; 'default' uses temp tables on the configured DB (Postgres)",
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        batch_size = options["batch_size"]
+        use_default = options["backend"] == "default"
+
+        self.stdout.write(f"Inserting {rows:,} leads per key type (batch {batch_size:,})")
+        self.stdout.write(f"{'key':<6} {'rows/s':>12} {'last 10% rows/s':>16} {'pk index MiB':>13}")
+        for label, factory in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+            if use_default:
+                result = self.run_default(factory, rows, batch_size)
+            else:
+                result = self.run_sqlite(factory, rows, batch_size)
+            overall, tail, index_bytes = result
+            self.stdout.write(f"{label:<6} {overall:>12,.0f} {tail:>16,.0f} {index_bytes / 2**20:>13,.1f}")
+
+    def _batches(self, factory, rows: int, batch_size: int):
+        now = time.time()
+        for start in range(0, rows, batch_size):
+            yield [
+                (factory().hex, now, f"Lead {i}", "0917" + str(i).zfill(7))
+                for i in range(start, min(start + batch_size, rows))
+            ]
+
+    def _rates(self, timings: list[tuple[int, float]], rows: int) -> tuple[float, float]:
+        total = sum(elapsed for _, elapsed in timings) or 1e-9
+        tail_rows, tail_time = 0, 0.0
+        for count, elapsed in reversed(timings):
+            if tail_rows >= rows // 10:
+                break
+            tail_rows += count
+            tail_time += elapsed
+        return rows / total, tail_rows / (tail_time or 1e-9)
+
+    def run_sqlite(self, factory, rows: int, batch_size: int):
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        try:
+            db = sqlite3.connect(path)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # Same shape Django generates for a UUIDField primary key on SQLite.
+            db.execute(
+                "CREATE TABLE lead (id char(32) NOT NULL PRIMARY KEY, created_at real, name varchar(255), phone varchar(255))"
+            )
+            timings = []
+            for batch in self._batches(factory, rows, batch_size):
+                started = time.perf_counter()
+                db.executemany("INSERT INTO lead VALUES (?, ?, ?, ?)", batch)
+                db.commit()
+                timings.append((len(batch), time.perf_counter() - started))
+            try:
+                index_bytes = db.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = 'sqlite_autoindex_lead_1'"
+                ).fetchone()[0]
+            except sqlite3.OperationalError:
+                # dbstat not compiled in: fall back to the whole file.
+                page_size = db.execute("PRAGMA page_size").fetchone()[0]
+                index_bytes = page_size * db.execute("PRAGMA page_count").fetchone()[0]
+            db.close()
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        return (*self._rates(timings, rows), index_bytes or 0)
+
+    def run_default(self, factory, rows: int, batch_size: int):
+        if connection.vendor != "postgresql":
+            self.stderr.write("--backend=default is intended for Postgres; results on other vendors are indicative only")
+        timings = []
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS bench_lead")
+            cursor.execute(
+                "CREATE TEMPORARY TABLE bench_lead (id uuid PRIMARY KEY, created_at double precision, name varchar(255), phone varchar(255))"
+            )
+            for batch in self._batches(factory, rows, batch_size):
+                started = time.perf_counter()
+                cursor.executemany("INSERT INTO bench_lead VALUES (%s, %s, %s, %s)", batch)
+                timings.append((len(batch), time.perf_counter() - started))
+            index_bytes = 0
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT pg_relation_size('bench_lead_pkey')")
+                index_bytes = cursor.fetchone()[0]
+            cursor.execute("DROP TABLE bench_lead")
+        return (*self._rates(timings, rows), index_bytes)
@@ -0,0 +1,66 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from myApp.alerts import SearchMatcher
+from myApp.models import Property
+
+CITIES = ["Makati", "Taguig", "Pasig", "Quezon City", "Mandaluyong", "Manila", "Paranaque", "Muntinlupa"]
+CITIES += [f"City {i}" for i in range(32)]
+AREAS = ["BGC", "Ortigas Center", "Diliman", "Eastwood", "Poblacion", "Rockwell", "Salcedo", "Alabang"]
+AREAS += [f"District {i}" for i in range(152)]
+KEYWORDS = ["pool", "gym", "furnished", "parking", "view"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark saved-search matching with synthetic searches and listings (no DB writes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--searches", type=int, default=1_000_000)
+        parser.add_argument("--listings", type=int, default=50_000)
+        parser.add_argument("--keywords", type=int, default=5_000, help="distinct saved q terms")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        n_searches, n_listings = options["searches"], options["listings"]
+        keywords = KEYWORDS + [f"{rng.choice(KEYWORDS)}{i}" for i in range(max(options["keywords"] - len(KEYWORDS), 0))]
+
+        rows = (
+            (
+                i,
+                rng.choice(keywords) if rng.random() < 0.1 else "",
+                rng.choice(CITIES + AREAS) if rng.random() < 0.99 else "",
+                rng.choice([None, 1, 2, 3, 4]),
+                rng.randrange(20_000, 300_000, 5000) if rng.random() < 0.95 else None,
+            )
+            for i in range(n_searches)
+        )
+        started = time.perf_counter()
+        matcher = SearchMatcher(rows)
+        built = time.perf_counter()
+
+        listings = [
+            Property(
+                title=f"Listing {i}",
+                description=" ".join(rng.sample(keywords, 3)),
+                badges="",
+                city=rng.choice(CITIES),
+                area=rng.choice(AREAS),
+                beds=rng.randint(1, 4),
+                price_amount=rng.randrange(20_000, 1_000_000, 1000),
+            )
+            for i in range(n_listings)
+        ]
+        matched = 0
+        match_started = time.perf_counter()
+        for prop in listings:
+            matched += len(matcher.match(prop))
+        finished = time.perf_counter()
+
+        self.stdout.write(f"index build: {built - started:.2f}s for {n_searches:,} searches")
+        self.stdout.write(
+            f"matching:    {finished - match_started:.2f}s for {n_listings:,} listings "
+            f"({n_listings / (finished - match_started):,.0f} listings/s, {matched:,} matches)"
+        )
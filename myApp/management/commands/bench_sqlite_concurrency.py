@@ -0,0 +1,171 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from myApp.db import is_busy, retry_on_busy, sqlite_options
+from myApp.leads import link_lead
+from myApp.models import Lead, Property
+from myApp.queries import dashboard_filters, dashboard_queryset
+
+ALIAS = "bench_sqlite"
+CITIES = ["Makati", "Taguig", "Pasig", "Quezon City", "Manila", "Mandaluyong"]
+SORTS = ["new", "price_asc", "price_desc"]
+
+
+def _reader(deadline: float, seed: int, results) -> None:
+    """Dashboard page loads: a filtered count plus the first page, like ``views.dashboard``."""
+    rng = random.Random(seed)
+    timings, errors = [], 0
+    while time.time() < deadline:
+        filters = dashboard_filters({"city": rng.choice(CITIES + [""]), "sort": rng.choice(SORTS)})
+        started = time.perf_counter()
+        try:
+            qs = dashboard_queryset(filters).using(ALIAS)
+            qs.count()
+            list(qs[: filters["per"]])
+        except OperationalError as exc:
+            if not is_busy(exc):
+                raise
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - started)
+    connections[ALIAS].close()
+    results.put(("read", timings, errors))
+
+
+def _writer(deadline: float, seed: int, slugs: list[str], retry: bool, results) -> None:
+    """Three lead submissions (like ``views.lead_submit``) to every staff price edit.
+
+    The edit reads the listing before saving it, as the admin change form
+    does. In a deferred transaction that read-then-write cannot wait for the
+    write lock, so it is where stock SQLite reports "database is locked".
+    """
+    rng = random.Random(seed)
+
+    def submit():
+        lead = Lead(name="Bench", phone="0917", buy_or_rent=Lead.RENT, interest_ids=",".join(rng.sample(slugs, 2)))
+        lead.save(using=ALIAS)
+        link_lead(lead)
+
+    def edit():
+        listing = Property.objects.using(ALIAS).get(slug=rng.choice(slugs))
+        listing.price_amount += 500
+        listing.save(using=ALIAS)
+
+    timings, errors = [], 0
+    while time.time() < deadline:
+        operation = edit if rng.random() < 0.25 else submit
+        started = time.perf_counter()
+        try:
+            if retry:
+                retry_on_busy(operation, using=ALIAS)()
+            else:
+                with transaction.atomic(using=ALIAS):
+                    operation()
+        except OperationalError as exc:
+            if not is_busy(exc):
+                raise
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - started)
+    connections[ALIAS].close()
+    results.put(("write", timings, errors))
+
+
+class Command(BaseCommand):
+    help = "Compare stock and production SQLite settings with concurrent reader and writer processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="dashboard reader processes")
+        parser.add_argument("--writers", type=int, default=4, help="lead writer processes")
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--listings", type=int, default=5_000)
+        parser.add_argument("--timeout", type=float, default=5.0, help="busy timeout in seconds for both profiles")
+
+    def handle(self, *args, **options):
+        timeout_ms = int(options["timeout"] * 1000)
+        profiles = [
+            ("stock", {"timeout": options["timeout"]}, False),
+            ("production", sqlite_options(busy_timeout_ms=timeout_ms), True),
+        ]
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, {options['seconds']:.0f}s per profile, "
+            f"{options['listings']:,} listings"
+        )
+        self.stdout.write(
+            f"{'profile':<11} {'reads/s':>9} {'read p95':>9} {'writes/s':>9} {'write p95':>10} {'locked':>7}"
+        )
+        for name, db_options, retry in profiles:
+            with tempfile.TemporaryDirectory() as tmp:
+                databases = {
+                    "default": connections.settings["default"],
+                    ALIAS: {
+                        "ENGINE": "django.db.backends.sqlite3",
+                        "NAME": os.path.join(tmp, "bench.sqlite3"),
+                        "OPTIONS": db_options,
+                    },
+                }
+                connections.settings[ALIAS] = connections.configure_settings(databases)[ALIAS]
+                try:
+                    call_command("migrate", database=ALIAS, verbosity=0)
+                    slugs = self.populate(options["listings"])
+                    row = self.run(slugs, retry, options)
+                finally:
+                    connections[ALIAS].close()
+                    # The next profile points the alias at a new file.
+                    del connections[ALIAS]
+                    del connections.settings[ALIAS]
+            reads, writes, locked = row
+            self.stdout.write(
+                f"{name:<11} {len(reads) / options['seconds']:>9,.0f} {self.p95(reads):>7.1f}ms "
+                f"{len(writes) / options['seconds']:>9,.0f} {self.p95(writes):>8.1f}ms {locked:>7,}"
+            )
+
+    def populate(self, listings: int) -> list[str]:
+        rng = random.Random(3)
+        Property.objects.using(ALIAS).bulk_create(
+            [
+                Property(
+                    slug=f"listing-{i}", title=f"Listing {i}", city=rng.choice(CITIES),
+                    price_amount=rng.randrange(15_000, 250_000, 500), beds=rng.randint(0, 4),
+                )
+                for i in range(listings)
+            ],
+            batch_size=2000,
+        )
+        return [f"listing-{i}" for i in range(listings)]
+
+    def run(self, slugs: list[str], retry: bool, options) -> tuple[list, list, int]:
+        # Children inherit the parent's settings by forking; they must not share its sockets.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        deadline = time.time() + options["seconds"]
+        processes = [
+            context.Process(target=_reader, args=(deadline, seed, results)) for seed in range(options["readers"])
+        ] + [
+            context.Process(target=_writer, args=(deadline, 1000 + seed, slugs, retry, results))
+            for seed in range(options["writers"])
+        ]
+        for process in processes:
+            process.start()
+        reads, writes, locked = [], [], 0
+        for _ in processes:
+            role, timings, errors = results.get()
+            (reads if role == "read" else writes).extend(timings)
+            locked += errors
+        for process in processes:
+            process.join()
+        return reads, writes, locked
+
+    def p95(self, timings: list[float]) -> float:
+        if len(timings) < 2:
+            return 0.0
+        return statistics.quantiles(timings, n=100)[94] * 1000
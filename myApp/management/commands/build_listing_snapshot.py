@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myApp.snapshot import SnapshotBuilder, listing_snapshot
+
+
+class Command(BaseCommand):
+    help = "Build or refresh the memory-mapped listing snapshot used by /list and /dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild from every row instead of applying changes")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        current = None if options.get("full") else listing_snapshot.open_current()
+        snapshot = SnapshotBuilder().build(current=current)
+        kind = "Incremental refresh" if current is not None else "Full build"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{kind}: {len(snapshot):,} listing(s) in {time.perf_counter() - started:.2f}s -> {snapshot.path}"
+            )
+        )
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from myApp.models import Property
+
+
+class Command(BaseCommand):
+    help = "Report raw vs gzip vs Brotli bytes per route and for collected static assets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="localhost")
+
+    def routes(self) -> list[tuple[str, str, dict]]:
+        routes = [
+            ("home", reverse("home"), {}),
+            ("results", reverse("results"), {}),
+            ("results (htmx)", reverse("results") + "?city=Makati", {"HTTP_HX_REQUEST": "true"}),
+            ("dashboard", reverse("dashboard"), {}),
+            ("dashboard (htmx)", reverse("dashboard") + "?sort=price_asc", {"HTTP_HX_REQUEST": "true"}),
+            ("health_check", reverse("health_check"), {}),
+        ]
+        prop = Property.objects.order_by().first()
+        if prop is not None:
+            routes.append(("property_detail", reverse("property_detail", args=[prop.slug]), {}))
+        return routes
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=options["host"])
+        self.stdout.write(f"{'route':<20} {'raw':>9} {'gzip':>9} {'br':>9} {'saved':>7}")
+        for name, url, headers in self.routes():
+            sizes = {}
+            for encoding in ("identity", "gzip", "br"):
+                response = client.get(url, HTTP_ACCEPT_ENCODING=encoding, **headers)
+                body = b"".join(response.streaming_content) if response.streaming else response.content
+                sizes[encoding] = (len(body), response.get("Content-Encoding", "identity"))
+            raw = sizes["identity"][0]
+            best = min(size for size, _ in sizes.values())
+            br = f"{sizes['br'][0]:,}" if sizes["br"][1] == "br" else "n/a"
+            self.stdout.write(
+                f"{name:<20} {raw:>9,} {sizes['gzip'][0]:>9,} {br:>9} {100 * (raw - best) / max(raw, 1):>6.1f}%"
+            )
+
+        static_root = Path(settings.STATIC_ROOT)
+        if not static_root.exists():
+            self.stdout.write("\nRun `python manage.py collectstatic` to include precompressed static assets.")
+            return
+        self.stdout.write(f"\n{'static asset':<40} {'raw':>9} {'.gz':>9} {'.br':>9}")
+        for path in sorted(static_root.rglob("*")):
+            if not path.is_file() or path.suffix in (".gz", ".br"):
+                continue
+            gz, br = path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")
+            if not gz.exists() and not br.exists():
+                continue
+            self.stdout.write(
+                f"{str(path.relative_to(static_root)):<40} {path.stat().st_size:>9,} "
+                f"{gz.stat().st_size if gz.exists() else 0:>9,} {br.stat().st_size if br.exists() else 0:>9,}"
+            )
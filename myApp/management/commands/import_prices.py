@@ -0,0 +1,40 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from myApp.prices import import_prices
+
+
+class Command(BaseCommand):
+    help = "Apply a price feed (CSV with slug,price[,observed_at]) and record it in the price history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="") as handle:
+            result = import_prices(self.rows(csv.DictReader(handle)), batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Repriced {result.repriced:,} listing(s), recorded {result.recorded:,} change(s), "
+                f"skipped {result.unknown:,} unknown slug(s)"
+            )
+        )
+
+    def rows(self, reader):
+        for line, row in enumerate(reader, start=2):
+            try:
+                price = int(row["price"])
+            except (KeyError, TypeError, ValueError):
+                raise CommandError(f"line {line}: price must be an integer")
+            at = None
+            if row.get("observed_at"):
+                at = parse_datetime(row["observed_at"])
+                if at is None:
+                    raise CommandError(f"line {line}: bad observed_at {row['observed_at']!r}")
+                if timezone.is_naive(at):
+                    at = timezone.make_aware(at)
+            yield row["slug"], price, at
@@ -0,0 +1,41 @@
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from myApp.alerts import enqueue_matches, search_matcher
+from myApp.models import Property
+
+
+class Command(BaseCommand):
+    help = "Queue saved-search alerts for listings created or imported since a point in time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="ISO datetime; defaults to 24 hours ago")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = parse_datetime(options["since"]) if options.get("since") else None
+        if since is None:
+            since = timezone.now() - timedelta(hours=24)
+        elif timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        started = time.perf_counter()
+        matcher = search_matcher.refresh()
+        built = time.perf_counter()
+        listings = (
+            Property.objects.filter(created_at__gte=since)
+            .order_by()
+            .only("id", "title", "description", "badges", "city", "area", "beds", "price_amount")
+        )
+        queued = enqueue_matches(listings.iterator(chunk_size=options.get("chunk_size", 2000)))
+        finished = time.perf_counter()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Queued {queued} alert(s) from {matcher.size} saved search(es) "
+                f"(index {built - started:.2f}s, matching {finished - built:.2f}s)"
+            )
+        )
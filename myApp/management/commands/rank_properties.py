@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from myApp.ranking import rank_properties
+
+
+class Command(BaseCommand):
+    help = "Re-rank every listing (city price medians drift, so run it from cron, e.g. nightly, and after deploys)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        result = rank_properties(chunk_size=options.get("chunk_size", 50_000))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ranked {result.ranked:,} listing(s), updated {result.updated:,} in {result.seconds:.2f}s"
+            )
+        )
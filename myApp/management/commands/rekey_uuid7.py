@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from myApp.cache import property_cache
+from myApp.ids import uuid7_from_datetime
+from myApp.models import Lead, Property
+
+
+class Command(BaseCommand):
+    help = "Re-key existing uuid4 Property/Lead rows to time-ordered UUIDv7 derived from created_at"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        chunk_size = options.get("chunk_size", 1000)
+        dry_run = options.get("dry_run", False)
+
+        property_map = self.rekey(Property, chunk_size, dry_run)
+        self.rekey(Lead, chunk_size, dry_run)
+        if property_map and not dry_run:
+            self.rewrite_interest_ids(property_map, chunk_size)
+
+    def rekey(self, model, chunk_size: int, dry_run: bool) -> dict[str, str]:
+        """Assign UUIDv7 keys to every non-v7 row of ``model``; returns {old: new} as hex strings."""
+        pending = [
+            (pk, created_at)
+            for pk, created_at in model.objects.order_by().values_list("pk", "created_at").iterator(chunk_size=chunk_size)
+            if pk.version != 7
+        ]
+        self.stdout.write(f"{model.__name__}: {len(pending)} row(s) to re-key")
+        if dry_run or not pending:
+            return {}
+
+        # Foreign keys (including auto-created m2m through tables) that point at this model.
+        referencing = [
+            (rel.related_model, rel.field.name)
+            for rel in model._meta.get_fields(include_hidden=True)
+            if (rel.one_to_many or rel.one_to_one) and rel.auto_created and not rel.concrete
+        ]
+
+        mapping: dict[str, str] = {}
+        for start in range(0, len(pending), chunk_size):
+            with transaction.atomic():
+                for old, created_at in pending[start:start + chunk_size]:
+                    new = uuid7_from_datetime(created_at)
+                    for related_model, field_name in referencing:
+                        related_model._base_manager.filter(**{field_name: old}).update(**{field_name: new})
+                    model._base_manager.filter(pk=old).update(id=new)
+                    mapping[str(old)] = str(new)
+                    if model is Property:
+                        property_cache.invalidate(old)
+        self.stdout.write(self.style.SUCCESS(f"{model.__name__}: re-keyed {len(mapping)} row(s)"))
+        return mapping
+
+    def rewrite_interest_ids(self, property_map: dict[str, str], chunk_size: int) -> None:
+        """Lead.interest_ids stores property ids as CSV; point them at the new keys."""
+        updated, now = [], timezone.now()
+        for lead in Lead.objects.exclude(interest_ids="").only("pk", "interest_ids").iterator(chunk_size=chunk_size):
+            ids = [part.strip() for part in lead.interest_ids.split(",") if part.strip()]
+            rewritten = [property_map.get(pid, pid) for pid in ids]
+            if rewritten != ids:
+                lead.interest_ids = ",".join(rewritten)
+                lead.updated_at = now
+                updated.append(lead)
+        Lead.objects.bulk_update(updated, ["interest_ids", "updated_at"], batch_size=chunk_size)
+        self.stdout.write(f"Rewrote interest_ids on {len(updated)} lead(s)")
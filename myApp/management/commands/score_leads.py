@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from myApp.scoring import score_open_leads
+
+
+class Command(BaseCommand):
+    help = "Re-score every open lead (recency decays, so run it from cron, e.g. hourly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=250_000)
+
+    def handle(self, *args, **options):
+        result = score_open_leads(chunk_size=options.get("chunk_size", 250_000))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scored {result.scored:,} open lead(s), updated {result.updated:,} in {result.seconds:.2f}s"
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from myApp.alerts import send_digests
+
+
+class Command(BaseCommand):
+    help = "Email one digest per recipient for pending saved-search alerts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-per-digest", type=int, default=20)
+
+    def handle(self, *args, **options):
+        emails, alerts = send_digests(max_per_digest=options.get("max_per_digest", 20))
+        self.stdout.write(self.style.SUCCESS(f"Sent {emails} digest(s) covering {alerts} alert(s)."))
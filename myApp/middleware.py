@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import time
+from gzip import GzipFile
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.cache import has_vary_header, patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import StreamingBuffer, _get_random_filename, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+from .accesslog import access_log, request_params
+from .instrumentation import QueryTimer
+from .ratelimit import Limit, shared_state
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/xml",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+)
+_encoding_re = _lazy_re_compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*")
+
+
+def negotiate_encoding(accept_encoding: str, allow_brotli: bool = True) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q-values."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        match = _encoding_re.fullmatch(part)
+        if not match:
+            continue
+        name, q = match.group(1).lower(), match.group(2)
+        try:
+            offered[name] = float(q) if q is not None else 1.0
+        except ValueError:
+            continue
+    wildcard = offered.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None and allow_brotli else ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = offered.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=5)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=5)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _gzip_sequence(sequence, max_random_bytes: int | None = None):
+    """Django's ``compress_sequence``, but flushed after every chunk.
+
+    ``compress_sequence`` only yields what zlib happens to emit, so a slow
+    stream would sit in the compressor until it ended.
+    """
+    buf = StreamingBuffer()
+    filename = _get_random_filename(max_random_bytes) if max_random_bytes else None
+    with GzipFile(filename=filename, mode="wb", compresslevel=6, fileobj=buf, mtime=0) as zfile:
+        yield buf.read()
+        for chunk in sequence:
+            zfile.write(chunk)
+            zfile.flush()
+            data = buf.read()
+            if data:
+                yield data
+    yield buf.read()
+
+
+async def _agzip_sequence(sequence, max_random_bytes: int | None = None):
+    """``_gzip_sequence`` for async iterators."""
+    buf = StreamingBuffer()
+    filename = _get_random_filename(max_random_bytes) if max_random_bytes else None
+    with GzipFile(filename=filename, mode="wb", compresslevel=6, fileobj=buf, mtime=0) as zfile:
+        yield buf.read()
+        async for chunk in sequence:
+            zfile.write(chunk)
+            zfile.flush()
+            data = buf.read()
+            if data:
+                yield data
+    yield buf.read()
+
+
+class CompressionMiddleware:
+    """Compress dynamic HTML/JSON responses with Brotli or gzip.
+
+    Like Django's GZipMiddleware, but negotiates Brotli when the optional
+    ``brotli`` package is installed and the client prefers it. Streaming
+    responses are compressed chunk by chunk with a flush after each chunk so
+    HTMX/NDJSON consumers still see data as it is produced. Static files never
+    reach this middleware: WhiteNoise serves its precompressed copies first.
+
+    Responses that vary on or set cookies (sessions, CSRF tokens) are only
+    ever gzipped: gzip carries random-length padding against BREACH, and
+    Brotli has no header field to pad.
+    """
+
+    min_length = 200
+    # gzip's random FNAME padding, as in django.middleware.gzip.GZipMiddleware.
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        if not response.streaming and len(response.content) < self.min_length:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            allow_brotli=not (response.cookies or has_vary_header(response, "Cookie")),
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            original = response.streaming_content
+            if response.is_async:
+                if encoding == "br":
+                    response.streaming_content = _abrotli_sequence(original)
+                else:
+                    response.streaming_content = _agzip_sequence(original, self.max_random_bytes)
+            elif encoding == "br":
+                response.streaming_content = _brotli_sequence(original)
+            else:
+                response.streaming_content = _gzip_sequence(original, self.max_random_bytes)
+            del response.headers["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=5)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(response.content))
+
+        # A compressed body is no longer byte-for-byte the entity the ETag names.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+def client_ip(request) -> str:
+    """Client address, read from ``RATELIMIT_IP_HEADER`` when behind a proxy.
+
+    The rightmost entry is used because that is the one our own proxy
+    appended; anything to its left is client-controlled.
+    """
+    header = getattr(settings, "RATELIMIT_IP_HEADER", None)
+    if header and request.META.get(header):
+        return request.META[header].split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _plain(status: int, message: bytes, retry_after: float) -> HttpResponse:
+    response = HttpResponse(message, status=status, content_type="text/plain; charset=utf-8")
+    response.headers["Retry-After"] = str(max(1, round(retry_after + 0.5)))
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+class RateLimitMiddleware:
+    """Token-bucket throttling and load shedding for ``RATELIMIT_POLICIES``.
+
+    Every request is counted in-flight for its worker. Requests for the
+    throttled URL names (or ``RATELIMIT_SHED["latency_views"]``) feed a shared,
+    time-decayed DB latency average, so a slow admin or dashboard query does
+    not count against lead capture. Throttled requests are shed with a 503
+    while too many other workers are busy or queries are slow, and get a 429 once
+    any of their buckets (per IP, per URL kwarg such as ``slug``) is empty.
+    Both answers are tiny plain-text responses built here, never rendered
+    through templates, so a burst costs as little as possible.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.policies = {
+            name: [Limit.from_config(config) for config in configs]
+            for name, configs in settings.RATELIMIT_POLICIES.items()
+        }
+
+    def __call__(self, request):
+        state = shared_state(settings.RATELIMIT_STATE_PATH)
+        timer = QueryTimer()
+        state.enter()
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            state.leave()
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        latency_views = settings.RATELIMIT_SHED.get("latency_views")
+        if timer.count and url_name in (self.policies if latency_views is None else latency_views):
+            state.observe_latency(1000 * timer.seconds / timer.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        limits = self.policies.get(url_name)
+        if not limits:
+            return None
+        state = shared_state(settings.RATELIMIT_STATE_PATH)
+
+        shed = settings.RATELIMIT_SHED
+        max_busy = shed.get("max_busy_workers")
+        max_latency = shed.get("max_db_latency_ms")
+        if (max_busy and state.busy_workers() >= max_busy) or (
+            max_latency and state.db_latency_ms() > max_latency
+        ):
+            state.incr("shed")
+            return _plain(503, b"Server busy, please retry shortly.\n", shed.get("retry_after", 1))
+
+        wait = 0.0
+        for limit in limits:
+            value = client_ip(request) if limit.scope == "ip" else view_kwargs.get(limit.scope)
+            if value:
+                wait = max(wait, state.take(f"{url_name}:{limit.scope}:{value}", limit))
+        if wait:
+            state.incr("rejected")
+            return _plain(429, b"Too many requests, please slow down.\n", wait)
+        state.incr("admitted")
+        return None
+
+
+class AccessLogMiddleware:
+    """One JSONL record per request in ``ACCESS_LOG_PATH``, written off-thread.
+
+    Sits just inside WhiteNoise, so static files are not logged, while the
+    latency and ``bytes`` it records include compression. Streaming
+    responses are logged when their headers are ready; their ``bytes`` is
+    ``null`` unless a ``Content-Length`` was set. See ``myApp.accesslog``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = settings.ACCESS_LOG_PATH
+        if not path:
+            return self.get_response(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        if response.has_header("Content-Length"):
+            size = int(response["Content-Length"])
+        else:
+            size = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        access_log(path, **settings.ACCESS_LOG_OPTIONS).record(
+            {
+                "ts": round(time.time(), 3),
+                "method": request.method,
+                "view": match.url_name if match else None,
+                "path": request.path,
+                "params": request_params(request.GET),
+                "status": response.status_code,
+                "ms": round(1000 * (time.perf_counter() - started), 2),
+                "db_ms": round(1000 * timer.seconds, 2),
+                "queries": timer.count,
+                "bytes": size,
+            }
+        )
+        return response
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-19 16:13
+
+import myApp.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lead',
+            name='id',
+            field=models.UUIDField(default=myApp.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='id',
+            field=models.UUIDField(default=myApp.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
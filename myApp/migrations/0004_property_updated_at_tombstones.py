@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-19 18:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    Property = apps.get_model("myApp", "Property")
+    Property.objects.using(schema_editor.connection.alias).update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0003_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='PropertyTombstone',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('slug', models.SlugField()),
+                ('deleted_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
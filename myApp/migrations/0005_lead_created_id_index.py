@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0004_property_updated_at_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['created_at', 'id'], name='lead_created_id_idx'),
+        ),
+    ]
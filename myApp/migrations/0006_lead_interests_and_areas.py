@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-19 16:51
+
+import myApp.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0005_lead_created_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Area',
+            fields=[
+                ('id', models.UUIDField(default=myApp.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('slug', models.SlugField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=64)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='interests',
+            field=models.ManyToManyField(blank=True, related_name='leads', to='myApp.property'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='lead_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='preferred_areas',
+            field=models.ManyToManyField(blank=True, related_name='leads', to='myApp.area'),
+        ),
+    ]
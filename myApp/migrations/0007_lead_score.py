@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-19 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0006_lead_interests_and_areas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='converted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['converted', '-score', '-created_at'], name='lead_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:11
+
+import django.db.models.deletion
+import myApp.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0007_lead_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Agent',
+            fields=[
+                ('id', models.UUIDField(default=myApp.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('phone', models.CharField(blank=True, max_length=255)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('active', models.BooleanField(default=True)),
+                ('properties', models.ManyToManyField(blank=True, related_name='agents', to='myApp.property')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.UUIDField(default=myApp.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('phone', models.CharField(max_length=255)),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('status', models.CharField(choices=[('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='confirmed', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='myApp.agent')),
+                ('lead', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='myApp.lead')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='myApp.property')),
+            ],
+            options={
+                'ordering': ['start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookingSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='myApp.agent')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='myApp.booking')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='myApp.property')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['agent', 'start'], name='booking_agent_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', 'start'], name='booking_property_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingslot',
+            constraint=models.UniqueConstraint(fields=('agent', 'start'), name='unique_slot_per_agent'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingslot',
+            constraint=models.UniqueConstraint(fields=('property', 'start'), name='unique_slot_per_property'),
+        ),
+    ]
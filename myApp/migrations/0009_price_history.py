@@ -0,0 +1,61 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:24
+
+import struct
+from datetime import timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_history(apps, schema_editor):
+    """Start every listing's history with its current price, as of its creation."""
+    Property = apps.get_model("myApp", "Property")
+    PriceHistory = apps.get_model("myApp", "PriceHistory")
+    alias = schema_editor.connection.alias
+    rows = []
+    for pk, price, created in Property.objects.using(alias).values_list("pk", "price_amount", "created_at").iterator():
+        created = created.astimezone(timezone.utc)
+        month = created.date().replace(day=1)
+        offset = int((created - created.replace(day=1, hour=0, minute=0, second=0, microsecond=0)).total_seconds())
+        rows.append(PriceHistory(
+            property_id=pk, month=month, count=1, times=struct.pack("<I", offset), prices=struct.pack("<i", price),
+            last_at=created, last_price=price,
+        ))
+    PriceHistory.objects.using(alias).bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0008_bookings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='previous_price',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='price_changed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('times', models.BinaryField()),
+                ('prices', models.BinaryField()),
+                ('last_at', models.DateTimeField()),
+                ('last_price', models.IntegerField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='myApp.property')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('property', 'month'), name='unique_price_history_month')],
+            },
+        ),
+        migrations.RunPython(seed_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0009_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rank_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['-rank_score', '-created_at'], name='property_rank_idx'),
+        ),
+    ]
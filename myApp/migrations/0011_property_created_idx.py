@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0010_property_rank_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['created_at'], name='property_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0012_live_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='ranked_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0013_property_ranked_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='savedsearch',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+    ]
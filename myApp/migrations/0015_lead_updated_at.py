@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-19 18:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    Lead = apps.get_model("myApp", "Lead")
+    Lead.objects.using(schema_editor.connection.alias).update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0014_savedsearch_email_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadTombstone',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['updated_at', 'id'], name='lead_updated_id_idx'),
+        ),
+    ]
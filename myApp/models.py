@@ -1,9 +1,10 @@
-import uuid
 from django.db import models
 
+from .ids import uuid7
+
 
 class Property(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     slug = models.SlugField(unique=True)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -19,20 +20,103 @@ class Property(models.Model):
     affiliate_source = models.CharField(max_length=64, blank=True)
     commissionable = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained from Lead.interests changes; see myApp.leads.
+    lead_count = models.PositiveIntegerField(default=0, editable=False)
+    # The price before the latest change; see myApp.prices.
+    previous_price = models.IntegerField(null=True, blank=True, editable=False)
+    price_changed_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+    # "Best first" order, 0-100; written by myApp.ranking.
+    rank_score = models.FloatField(default=0, editable=False)
+    # When a batch re-rank last moved rank_score; rank changes leave updated_at alone.
+    ranked_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # home's top picks and the default /list order.
+            models.Index(fields=["-rank_score", "-created_at"], name="property_rank_idx"),
+            # The default ordering: the dashboard's "newest" sort and its text searches (advise_indexes).
+            models.Index(fields=["created_at"], name="property_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} ({self.city})"
 
 
+class PriceHistory(models.Model):
+    """A listing's price changes in one calendar month (UTC), delta-encoded; see myApp.prices."""
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="price_history")
+    month = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    # Little-endian uint32 second gaps (the first counted from the month's start)
+    # and int32 price deltas (the first from zero).
+    times = models.BinaryField()
+    prices = models.BinaryField()
+    last_at = models.DateTimeField()
+    last_price = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["property", "month"], name="unique_price_history_month"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.property_id} {self.month:%Y-%m} ({self.count})"
+
+
+class PropertyTombstone(models.Model):
+    """Marks a deleted listing so incremental exports can drop it."""
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    slug = models.SlugField()
+    deleted_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.slug} (deleted {self.deleted_at:%Y-%m-%d})"
+
+
+class LeadTombstone(models.Model):
+    """Marks a deleted or archived lead so API syncs can drop it."""
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    deleted_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.id} (deleted {self.deleted_at:%Y-%m-%d})"
+
+
+class LiveEvent(models.Model):
+    """One listing or lead diff for the live dashboard, shared by every worker; see myApp.live."""
+
+    event = models.CharField(max_length=16)
+    data = models.TextField()
+
+    def __str__(self) -> str:
+        return f"{self.pk} {self.event}"
+
+
+class Area(models.Model):
+    """A neighbourhood named in lead preferences, deduplicated by slug."""
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    slug = models.SlugField(max_length=64, unique=True)
+    name = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+
 class Lead(models.Model):
     RENT = "rent"
     BUY = "buy"
     BOR_CHOICES = [(RENT, "Rent"), (BUY, "Buy")]
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=255)
     phone = models.CharField(max_length=255)
     email = models.EmailField(blank=True)
@@ -46,11 +130,130 @@ class Lead(models.Model):
     referrer = models.URLField(blank=True)
     consent_contact = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # The leads API's change order. Writers that skip save() (scoring, the admin's
+    # mark_converted) set it themselves.
+    updated_at = models.DateTimeField(auto_now=True)
+    converted = models.BooleanField(default=False)
+    # Agent priority, 0-100; written by myApp.scoring.
+    score = models.FloatField(default=0, editable=False)
+    # Parsed from interest_ids/areas by myApp.leads.link_lead.
+    interests = models.ManyToManyField(Property, blank=True, related_name="leads")
+    preferred_areas = models.ManyToManyField(Area, blank=True, related_name="leads")
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset order for archival.
+            models.Index(fields=["created_at", "id"], name="lead_created_id_idx"),
+            # Keyset order for the leads API.
+            models.Index(fields=["updated_at", "id"], name="lead_updated_id_idx"),
+            # Open leads by priority, for the admin and the dashboard panel.
+            models.Index(fields=["converted", "-score", "-created_at"], name="lead_priority_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.phone})"
 
 
+class SavedSearch(models.Model):
+    """A buyer's `results` filters, matched against new listings for alerts."""
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # send_digests looks pending alerts up one recipient at a time.
+    email = models.EmailField(db_index=True)
+    lead = models.ForeignKey(Lead, null=True, blank=True, on_delete=models.SET_NULL, related_name="saved_searches")
+    q = models.CharField(max_length=128, blank=True)
+    city = models.CharField(max_length=64, blank=True)
+    beds = models.IntegerField(null=True, blank=True)
+    price_max = models.IntegerField(null=True, blank=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.email}: {self.q or self.city or 'any'}"
+
+
+class SearchAlert(models.Model):
+    """Outbox row: a listing that matched a saved search, pending a digest."""
+
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="alerts")
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["saved_search", "property"], name="unique_alert_per_search_property"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.saved_search_id} -> {self.property_id}"
+
+
+class Agent(models.Model):
+    """An agent who shows listings; bookings are assigned to one."""
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    name = models.CharField(max_length=255)
+    phone = models.CharField(max_length=255, blank=True)
+    email = models.EmailField(blank=True)
+    active = models.BooleanField(default=True)
+    # Listings this agent can show; an agent with none can show any listing.
+    properties = models.ManyToManyField(Property, blank=True, related_name="agents")
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class Booking(models.Model):
+    """A viewing of one listing with one agent over whole ``BOOKING_SLOT_MINUTES`` slots."""
+
+    CONFIRMED = "confirmed"
+    CANCELLED = "cancelled"
+    STATUS_CHOICES = [(CONFIRMED, "Confirmed"), (CANCELLED, "Cancelled")]
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="bookings")
+    agent = models.ForeignKey(Agent, on_delete=models.PROTECT, related_name="bookings")
+    lead = models.ForeignKey(Lead, null=True, blank=True, on_delete=models.SET_NULL, related_name="bookings")
+    name = models.CharField(max_length=255)
+    phone = models.CharField(max_length=255)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=CONFIRMED)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["start"]
+        indexes = [
+            models.Index(fields=["agent", "start"], name="booking_agent_start_idx"),
+            models.Index(fields=["property", "start"], name="booking_property_start_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.start:%Y-%m-%d %H:%M} ({self.agent})"
+
+
+class BookingSlot(models.Model):
+    """One grid slot held by a confirmed booking; the unique constraints are the conflict check."""
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="slots")
+    agent = models.ForeignKey(Agent, on_delete=models.CASCADE, related_name="+")
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="+")
+    start = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["agent", "start"], name="unique_slot_per_agent"),
+            models.UniqueConstraint(fields=["property", "start"], name="unique_slot_per_property"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.start:%Y-%m-%d %H:%M} {self.agent_id}/{self.property_id}"
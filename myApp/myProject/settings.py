@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
 
+from myApp.db import sqlite_options
+
 
 PROJECT_DIR = Path(__file__).resolve().parent.parent
 # Repo root (one level above the Django project directory)
@@ -22,11 +24,16 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "rest_framework",
     "myApp",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "myApp.middleware.AccessLogMiddleware",
+    "myApp.middleware.CompressionMiddleware",
+    "myApp.middleware.RateLimitMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -59,13 +66,108 @@ TEMPLATES = [
 WSGI_APPLICATION = "myApp.myProject.wsgi.application"
 ASGI_APPLICATION = "myApp.myProject.asgi.application"
 
+# WAL, relaxed fsync, mmap and BEGIN IMMEDIATE on every connection so gunicorn
+# workers can share the file; see myApp.db. SQLITE_PROFILE=stock turns it off.
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": sqlite_options() if os.environ.get("SQLITE_PROFILE", "production") == "production" else {},
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Shared tier for the Property object cache. The file backend works across
+    # gunicorn workers for small inventories; beyond a couple of thousand listings
+    # point this at Redis/Memcached.
+    "objects": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("OBJECT_CACHE_DIR", str(BASE_DIR / "var" / "cache" / "objects")),
+        "TIMEOUT": 3600,
+        # Each listing takes up to three entries (version, object, slug). FileBasedCache lists
+        # the whole directory on every set() to decide whether to cull, so keep this small.
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("OBJECT_CACHE_MAX_ENTRIES", "5000"))},
+    },
+}
+PROPERTY_CACHE_ALIAS = "objects"
+PROPERTY_CACHE_MAX_ENTRIES = 512
+PROPERTY_CACHE_LOCAL_TTL = 30.0
+
+# JSONL access log, written by a background thread per worker (see myApp.accesslog).
+# An empty ACCESS_LOG_PATH turns it off.
+ACCESS_LOG_PATH = os.environ.get("ACCESS_LOG_PATH", str(BASE_DIR / "var" / "log" / "access.jsonl"))
+ACCESS_LOG_OPTIONS = {
+    "max_bytes": int(os.environ.get("ACCESS_LOG_MAX_BYTES", str(20 * 2**20))),
+    "backups": int(os.environ.get("ACCESS_LOG_BACKUPS", "5")),
+    "queue_size": 10_000,
+}
+
+# Token buckets per URL name, shared by all workers through RATELIMIT_STATE_PATH.
+# "rate" is tokens per s/m/h/d; "scope" is "ip" or a URL kwarg such as "slug".
+RATELIMIT_STATE_PATH = os.environ.get("RATELIMIT_STATE_PATH", str(BASE_DIR / "var" / "ratelimit.bin"))
+RATELIMIT_POLICIES = {
+    "property_chat": [
+        {"scope": "ip", "rate": "60/m", "burst": 30},
+        {"scope": "slug", "rate": "300/m", "burst": 100},
+    ],
+    "lead_submit": [
+        {"scope": "ip", "rate": "10/m", "burst": 5},
+    ],
+    # Each save rebuilds every worker's search matcher and adds a digest recipient.
+    "save_search": [
+        {"scope": "ip", "rate": "10/m", "burst": 5},
+    ],
+    "book_reserve": [
+        {"scope": "ip", "rate": "10/m", "burst": 5},
+    ],
+}
+# Throttled endpoints answer 503 while at least max_busy_workers other workers are
+# mid-request, or while the recent average query of the latency_views (default: the
+# throttled URL names) takes longer than max_db_latency_ms over at least a few samples.
+RATELIMIT_SHED = {
+    "max_busy_workers": int(os.environ.get("RATELIMIT_MAX_BUSY_WORKERS", "0")) or None,
+    "max_db_latency_ms": float(os.environ.get("RATELIMIT_MAX_DB_LATENCY_MS", "250")),
+    "latency_views": None,
+    "retry_after": 2,
+}
+RATELIMIT_IP_HEADER = os.environ.get("RATELIMIT_IP_HEADER") or None
+
+# How long /dashboard/events stays open polling for new events (see myApp.live). 0 suits
+# sync WSGI workers: the browser reconnects every few seconds instead. Under ASGI, keep it
+# well below the worker timeout.
+LIVE_STREAM_SECONDS = float(os.environ.get("LIVE_STREAM_SECONDS", "0"))
+
+# Sitemaps and partner feeds written by `manage.py build_feeds`, served from /feeds/.
+FEEDS_ROOT = Path(os.environ.get("FEEDS_ROOT", BASE_DIR / "var" / "feeds"))
+FEEDS_SHARD_SIZE = 10_000
+
+# Answer q-less /list and /dashboard filters from memory-mapped NumPy columns.
+LISTING_SNAPSHOT_ENABLED = os.environ.get("LISTING_SNAPSHOT_ENABLED", "0") == "1"
+LISTING_SNAPSHOT_ROOT = Path(os.environ.get("LISTING_SNAPSHOT_ROOT", BASE_DIR / "var" / "snapshot"))
+
+# Leads older than this move to monthly Parquet files (`manage.py archive_leads`).
+LEAD_ARCHIVE_ROOT = Path(os.environ.get("LEAD_ARCHIVE_ROOT", BASE_DIR / "var" / "archive" / "leads"))
+LEAD_ARCHIVE_AFTER_DAYS = int(os.environ.get("LEAD_ARCHIVE_AFTER_DAYS", "365"))
+
+# Viewings are booked in whole slots inside these local opening hours
+# (weekday -> (open hour, close hour); Monday is 0, missing days are closed).
+BOOKING_SLOT_MINUTES = 30
+BOOKING_HOURS = {0: (9, 18), 1: (9, 18), 2: (9, 18), 3: (9, 18), 4: (9, 18), 5: (10, 16)}
+BOOKING_DAYS_AHEAD = 14
+
+# /api/: session login for staff in the browser, basic auth for scripts. Errors
+# render as JSON; successful responses are streamed by the views themselves.
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -84,7 +186,24 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 STATIC_ROOT = BASE_DIR / "staticfiles"
+# collectstatic writes content-hashed copies plus .gz/.br siblings (Brotli when the
+# `Brotli` package is installed); WhiteNoise serves them with immutable caching.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG
+            else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Saved-search digests
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "PropertyHub <alerts@propertyhub.local>")
+SITE_URL = os.environ.get("SITE_URL", "http://localhost:8000")
+
 
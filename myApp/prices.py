@@ -0,0 +1,246 @@
+"""Listing price history as delta-encoded arrays, one row per listing per month.
+
+Each ``PriceHistory`` row holds one calendar month (UTC) of a listing's
+price changes as two packed little-endian arrays:
+
+* ``times``: ``uint32`` second gaps, the first counted from the month's start;
+* ``prices``: ``int32`` deltas, the first counted from zero.
+
+An observation therefore costs 8 bytes rather than an ORM row with its own
+index entry. Decoding is two ``cumsum`` calls. Appending a change
+concatenates 4 bytes to each array, using ``last_at`` and ``last_price``, so
+existing data is never decoded. Only an out-of-order observation forces a
+month to be re-encoded. A listing's full history is one range read on the
+``(property, month)`` unique index.
+
+``record_prices`` is the single write path. Property saves call it from
+signals, and bulk imports (``manage.py import_prices``) call it once per
+batch.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Iterable
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_listing_generation, property_cache
+from .live import property_diff, publish
+from .models import PriceHistory, Property
+from .ranking import rerank
+from .snapshot import listings_changed
+
+TIME_DTYPE = np.dtype("<u4")
+PRICE_DTYPE = np.dtype("<i4")
+
+
+def month_of(at: datetime) -> date:
+    at = at.astimezone(dt_timezone.utc)
+    return date(at.year, at.month, 1)
+
+
+def _month_start(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _offset(month: date, at: datetime) -> int:
+    return int((at - _month_start(month)).total_seconds())
+
+
+def encode(month: date, points: list[tuple[datetime, int]]) -> tuple[bytes, bytes]:
+    """Pack time-ordered ``(at, price)`` points that all fall in ``month``."""
+    offsets = np.array([_offset(month, at) for at, _ in points], dtype=np.int64)
+    prices = np.array([price for _, price in points], dtype=np.int64)
+    return (
+        np.diff(offsets, prepend=0).astype(TIME_DTYPE).tobytes(),
+        np.diff(prices, prepend=0).astype(PRICE_DTYPE).tobytes(),
+    )
+
+
+def decode(month: date, times: bytes, prices: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """Epoch seconds and prices (both ``int64``) for one month's row."""
+    start = int(_month_start(month).timestamp())
+    offsets = np.cumsum(np.frombuffer(bytes(times), dtype=TIME_DTYPE), dtype=np.int64)
+    return start + offsets, np.cumsum(np.frombuffer(bytes(prices), dtype=PRICE_DTYPE), dtype=np.int64)
+
+
+def record_prices(observations: Iterable[tuple], using: str = "default") -> int:
+    """Append ``(property_pk, at, price)`` observations; returns how many were stored.
+
+    An observation repeating the price already in effect in its month is
+    skipped. Touched months are locked, read once and written back in bulk.
+    """
+    grouped = defaultdict(list)
+    for pk, at, price in observations:
+        grouped[(pk, month_of(at))].append((at, int(price)))
+    if not grouped:
+        return 0
+
+    stored = 0
+    with transaction.atomic(using=using):
+        rows = {
+            (row.property_id, row.month): row
+            for row in PriceHistory.objects.using(using).select_for_update().filter(
+                property_id__in={pk for pk, _ in grouped}, month__in={month for _, month in grouped}
+            )
+        }
+        created, updated = [], []
+        for (pk, month), points in grouped.items():
+            points.sort(key=lambda point: point[0])
+            row = rows.get((pk, month))
+            if row is None:
+                row = PriceHistory(property_id=pk, month=month, times=b"", prices=b"", count=0)
+                created.append(row)
+
+            if row.count and points[0][0] < row.last_at:
+                # Back-filled history: merge and re-encode this month.
+                seconds, prices = decode(month, row.times, row.prices)
+                merged = [(datetime.fromtimestamp(int(s), dt_timezone.utc), int(p)) for s, p in zip(seconds, prices)]
+                merged = _changes(sorted(merged + points, key=lambda point: point[0]))
+                stored += max(len(merged) - row.count, 0)
+                row.times, row.prices = encode(month, merged)
+                row.count = len(merged)
+                row.last_at, row.last_price = merged[-1]
+                updated.append(row)
+                continue
+
+            fresh = _changes(points, row.last_price if row.count else None)
+            if not fresh:
+                continue
+            start = _offset(month, row.last_at) if row.count else 0
+            offsets = np.array([_offset(month, at) for at, _ in fresh], dtype=np.int64)
+            values = np.array([price for _, price in fresh], dtype=np.int64)
+            row.times = bytes(row.times) + np.diff(offsets, prepend=start).astype(TIME_DTYPE).tobytes()
+            row.prices = bytes(row.prices) + np.diff(values, prepend=row.last_price if row.count else 0).astype(PRICE_DTYPE).tobytes()
+            row.count += len(fresh)
+            row.last_at, row.last_price = fresh[-1]
+            stored += len(fresh)
+            if row.pk:
+                updated.append(row)
+
+        PriceHistory.objects.using(using).bulk_create(created)
+        if updated:
+            PriceHistory.objects.using(using).bulk_update(updated, ["count", "times", "prices", "last_at", "last_price"])
+    return stored
+
+
+def _changes(points: list[tuple[datetime, int]], current: int | None = None) -> list[tuple[datetime, int]]:
+    """Drop points that repeat the price before them."""
+    kept = []
+    for at, price in points:
+        if price != current:
+            kept.append((at, price))
+            current = price
+    return kept
+
+
+def history(property_pk, using: str = "default") -> tuple[np.ndarray, np.ndarray]:
+    """A listing's whole history as epoch seconds and prices, from one indexed read."""
+    rows = (
+        PriceHistory.objects.using(using)
+        .filter(property_id=property_pk)
+        .order_by("month")
+        .values_list("month", "times", "prices")
+    )
+    decoded = [decode(*row) for row in rows]
+    if not decoded:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate([t for t, _ in decoded]), np.concatenate([p for _, p in decoded])
+
+
+def downsample(seconds: np.ndarray, prices: np.ndarray, start: datetime, end: datetime, points: int = 60) -> list[tuple[datetime, int]]:
+    """The price in effect at ``points`` evenly spaced instants from ``start`` to ``end``."""
+    if not len(seconds) or points < 2:
+        return []
+    edges = np.linspace(start.timestamp(), end.timestamp(), points).astype(np.int64)
+    index = np.searchsorted(seconds, edges, side="right") - 1
+    return [
+        (datetime.fromtimestamp(int(edge), dt_timezone.utc), int(prices[i]))
+        for edge, i in zip(edges, index)
+        if i >= 0
+    ]
+
+
+def price_chart(property_obj: Property, days: int = 365, points: int = 60) -> list[tuple[datetime, int]]:
+    """Downsampled price line for ``property_detail``; empty until the price has changed."""
+    if property_obj.price_changed_at is None:
+        return []
+    seconds, prices = history(property_obj.pk)
+    if not len(seconds):
+        return []
+    end = timezone.now()
+    start = max(end - timedelta(days=days), datetime.fromtimestamp(int(seconds[0]), dt_timezone.utc))
+    return downsample(seconds, prices, start, end, points)
+
+
+def recent_price_drops(days: int = 30, limit: int = 6):
+    """Listings whose latest change, within ``days``, lowered the price."""
+    since = timezone.now() - timedelta(days=days)
+    return (
+        Property.objects.filter(price_changed_at__gte=since, previous_price__gt=F("price_amount"))
+        .order_by("-price_changed_at")[:limit]
+    )
+
+
+@dataclass
+class ImportResult:
+    repriced: int = 0
+    recorded: int = 0
+    unknown: int = 0
+
+
+def import_prices(rows: Iterable[tuple], using: str = "default", batch_size: int = 5000) -> ImportResult:
+    """Apply ``(slug, price, observed_at)`` rows from a feed, ``batch_size`` at a time.
+
+    Every row lands in the history; ``observed_at`` may be None for "now" and
+    may lie in the past to back-fill. A listing is repriced only by a row
+    newer than its current price. ``bulk_update`` skips the save signals, so
+    caches, the snapshot and live dashboards are told here instead.
+    """
+    result = ImportResult()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _import_batch(batch, using, result)
+            batch = []
+    if batch:
+        _import_batch(batch, using, result)
+    return result
+
+
+def _import_batch(batch: list[tuple], using: str, result: ImportResult) -> None:
+    now = timezone.now()
+    listings = Property.objects.using(using).in_bulk({slug for slug, _, _ in batch}, field_name="slug")
+    observations, repriced = [], {}
+    for slug, price, at in sorted(batch, key=lambda row: row[2] or now):
+        listing = listings.get(slug)
+        if listing is None:
+            result.unknown += 1
+            continue
+        at = at or now
+        observations.append((listing.pk, at, int(price)))
+        if int(price) != listing.price_amount and at >= (listing.price_changed_at or listing.created_at):
+            listing.previous_price, listing.price_amount, listing.price_changed_at = listing.price_amount, int(price), at
+            # bulk_update skips auto_now; the listing snapshot finds changes by updated_at.
+            listing.updated_at = now
+            repriced[listing.pk] = listing
+    with transaction.atomic(using=using):
+        Property.objects.using(using).bulk_update(
+            repriced.values(), ["price_amount", "previous_price", "price_changed_at", "updated_at"], batch_size=1000
+        )
+        rerank(repriced, using)
+        result.recorded += record_prices(observations, using)
+        for listing in repriced.values():
+            property_cache.invalidate_on_commit(listing.pk, listing.slug, using)
+            diff = property_diff(listing, "updated")
+            transaction.on_commit(lambda diff=diff: publish("property", diff, using), using=using)
+        if repriced:
+            transaction.on_commit(listings_changed, using=using)
+            transaction.on_commit(bump_listing_generation, using=using)
+    result.repriced += len(repriced)
@@ -0,0 +1,96 @@
+"""Listing querysets shared by the `results` and `dashboard` views."""
+from __future__ import annotations
+
+from typing import Mapping
+
+from django.db.models import Q, QuerySet
+
+from .models import Property
+from .snapshot import SnapshotSelection, listing_snapshot
+
+DASHBOARD_SORTS = {
+    "new": "-created_at",
+    "price_asc": "price_amount",
+    "price_desc": "-price_amount",
+    "beds_desc": "-beds",
+    "rank": "-rank_score",
+}
+# Best first, straight off property_rank_idx; see myApp.ranking.
+RANKED = ("-rank_score", "-created_at")
+
+
+def results_filters(params: Mapping[str, str]) -> dict[str, str]:
+    return {
+        "q": params.get("q", "").strip(),
+        "city": params.get("city", "").strip(),
+        "beds": params.get("beds", "").strip(),
+        "price_max": params.get("price_max", "").strip(),
+    }
+
+
+def results_queryset(filters: Mapping[str, str]) -> QuerySet[Property]:
+    qs = Property.objects.all()
+    q, city, beds, price_max = filters["q"], filters["city"], filters["beds"], filters["price_max"]
+    if q:
+        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q) | Q(badges__icontains=q) | Q(city__icontains=q))
+    if city:
+        qs = qs.filter(Q(city__iexact=city) | Q(area__icontains=city))
+    if beds and beds.isdigit():
+        qs = qs.filter(beds__gte=int(beds))
+    if price_max and price_max.isdigit():
+        qs = qs.filter(price_amount__lte=int(price_max))
+    return qs.order_by(*RANKED)
+
+
+def results_listings(filters: Mapping[str, str]) -> QuerySet[Property] | SnapshotSelection:
+    """`results_queryset`, answered from the listing snapshot when it is enabled and there is no `q`."""
+    snapshot = None if filters["q"] else listing_snapshot.get()
+    if snapshot is None:
+        return results_queryset(filters)
+    beds, price_max = filters["beds"], filters["price_max"]
+    return snapshot.select(
+        city_or_area=filters["city"],
+        beds_min=int(beds) if beds.isdigit() else None,
+        price_max=int(price_max) if price_max.isdigit() else None,
+        sort="rank",
+    )
+
+
+def dashboard_filters(params: Mapping[str, str]) -> dict:
+    per = params.get("per", "12")
+    return {
+        "q": params.get("q", "").strip(),
+        "city": params.get("city", "").strip(),
+        "sort": params.get("sort", "new"),
+        "per": min(int(per) if per.isdigit() else 12, 48) or 12,
+    }
+
+
+def dashboard_queryset(filters: Mapping) -> QuerySet[Property]:
+    properties = Property.objects.all()
+    q, city = filters["q"], filters["city"]
+    if q:
+        properties = properties.filter(
+            Q(title__icontains=q) |
+            Q(area__icontains=q) |
+            Q(city__icontains=q) |
+            Q(description__icontains=q)
+        )
+    if city:
+        properties = properties.filter(city__iexact=city)
+    return properties.order_by(DASHBOARD_SORTS.get(filters["sort"], "-created_at"))
+
+
+def dashboard_listings(filters: Mapping) -> QuerySet[Property] | SnapshotSelection:
+    """`dashboard_queryset`, answered from the listing snapshot when it is enabled and there is no `q`."""
+    snapshot = None if filters["q"] else listing_snapshot.get()
+    if snapshot is None:
+        return dashboard_queryset(filters)
+    return snapshot.select(city=filters["city"], sort=filters["sort"])
+
+
+def dashboard_cities() -> list[str]:
+    snapshot = listing_snapshot.get()
+    if snapshot is not None:
+        return snapshot.city_names()
+    return list(Property.objects.values_list("city", flat=True).distinct().order_by("city"))
@@ -0,0 +1,277 @@
+"""Listing rank scores for "best first" pages, computed in NumPy batches.
+
+A listing's ``rank_score`` (0-100) adds up five weighted parts:
+
+* **commission**: ``commissionable``.
+* **badges**: the summed ``BADGE_WEIGHTS`` of its badges, full credit at
+  ``BADGE_SATURATION``. Badges not in the table count ``OTHER_BADGE``.
+* **completeness**: half for a hero image, half for a floor area.
+* **price**: how close the price is to its city's median, on a log scale.
+  Half the median or double it scores zero, and cities with fewer than
+  ``MIN_CITY_LISTINGS`` listings get half credit.
+* **interest**: ``lead_count``, full credit at ``INTEREST_SATURATION`` leads.
+
+The score lives in an indexed column, so ``home`` and the default ``/list``
+order read the best listings straight off ``property_rank_idx`` instead of
+sorting. Saves re-rank the listing in ``pre_save``. ``rerank`` covers
+writes that bypass it: lead-count updates and bulk price imports. City
+medians drift slowly, so ``rank_properties`` (cron) re-ranks everything in
+keyset chunks, writes back only the scores that moved and publishes the
+medians it used for every worker's ``pre_save``.
+
+A rank change is not a content change: batch writes stamp ``ranked_at``
+rather than ``updated_at``, so feeds, sitemaps and the API ``since`` cursor
+do not re-publish the listing. The snapshot reads both columns.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cache import property_cache
+from .models import Property
+from .snapshot import listings_changed
+
+WEIGHTS = {"commission": 15.0, "badges": 20.0, "completeness": 20.0, "price": 25.0, "interest": 20.0}
+BADGE_WEIGHTS = {
+    "verified": 1.0,
+    "luxury": 0.8,
+    "penthouse": 0.8,
+    "city view": 0.6,
+    "near mrt": 0.7,
+    "furnished": 0.6,
+    "pool": 0.6,
+    "pet-friendly": 0.6,
+    "gym": 0.5,
+    "garden": 0.5,
+    "near schools": 0.5,
+    "family-friendly": 0.5,
+    "executive": 0.5,
+    "business district": 0.5,
+    "student-friendly": 0.4,
+}
+OTHER_BADGE = 0.25
+BADGE_SATURATION = 2.0
+INTEREST_SATURATION = 20
+MIN_CITY_LISTINGS = 3
+RANKER_TTL = 3600.0
+RANK_COLUMNS = (
+    "id", "city", "price_amount", "commissionable", "badges", "hero_image", "floor_area_sqm", "lead_count", "rank_score",
+)
+
+
+def badge_quality(badges: str) -> float:
+    names = [name.strip().lower() for name in (badges or "").split(",") if name.strip()]
+    return min(sum(BADGE_WEIGHTS.get(name, OTHER_BADGE) for name in names) / BADGE_SATURATION, 1.0)
+
+
+class ListingRanker:
+    """City price medians, the only inventory-wide input to a listing's rank."""
+
+    def __init__(self, medians: dict[str, float]):
+        self.medians = medians
+
+    @classmethod
+    def from_db(cls, using: str = "default") -> ListingRanker:
+        listings = pd.DataFrame.from_records(
+            Property.objects.using(using).order_by().values_list("city", "price_amount").iterator(chunk_size=10_000),
+            columns=["city", "price"],
+        )
+        if listings.empty:
+            return cls({})
+        listings["city"] = listings["city"].str.lower()
+        grouped = listings.groupby("city")["price"]
+        sizes, medians = grouped.size(), grouped.median()
+        return cls({city: float(median) for city, median in medians[sizes >= MIN_CITY_LISTINGS].items()})
+
+    def score(self, listings: pd.DataFrame) -> np.ndarray:
+        """Scores for ``listings``, a frame with (at least) the ``RANK_COLUMNS`` inputs."""
+        commission = listings["commissionable"].to_numpy(dtype=np.float64)
+
+        # Parse each distinct badge string once, not once per listing.
+        codes, uniques = pd.factorize(listings["badges"].fillna(""))
+        badges = np.array([badge_quality(value) for value in uniques] + [0.0])[codes]
+
+        has_image = listings["hero_image"].fillna("").astype(bool).to_numpy(dtype=np.float64)
+        has_area = (listings["floor_area_sqm"].fillna(0).to_numpy() > 0).astype(np.float64)
+        completeness = (has_image + has_area) / 2
+
+        median = listings["city"].str.lower().map(self.medians).to_numpy(dtype=np.float64, na_value=np.nan)
+        price = listings["price_amount"].to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fit = np.clip(1.0 - np.abs(np.log2(price / median)), 0.0, 1.0)
+        fit = np.where(np.isnan(median) | (price <= 0), 0.5, fit)
+
+        leads = listings["lead_count"].to_numpy(dtype=np.float64)
+        interest = np.minimum(np.log1p(leads) / math.log1p(INTEREST_SATURATION), 1.0)
+
+        total = (
+            WEIGHTS["commission"] * commission
+            + WEIGHTS["badges"] * badges
+            + WEIGHTS["completeness"] * completeness
+            + WEIGHTS["price"] * fit
+            + WEIGHTS["interest"] * interest
+        )
+        return np.round(total, 1)
+
+    def score_one(self, listing: Property) -> float:
+        frame = pd.DataFrame.from_records(
+            [tuple(getattr(listing, name) for name in RANK_COLUMNS)], columns=RANK_COLUMNS
+        )
+        return float(self.score(frame)[0])
+
+
+class _RankerHolder:
+    """Per-process rankers, one per database alias.
+
+    ``rank_properties`` publishes its medians in the shared cache and workers
+    re-read them every ``RANKER_TTL`` seconds, keeping the last ones when the
+    key is gone. Only a worker that has never seen any computes them itself,
+    once, and publishes them for the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rankers: dict[str, tuple[ListingRanker, float]] = {}
+
+    @staticmethod
+    def _key(using: str) -> str:
+        return f"ranking:medians:{using}"
+
+    def get(self, using: str = "default") -> ListingRanker:
+        with self._lock:
+            entry = self._rankers.get(using)
+            if entry is not None and time.monotonic() - entry[1] <= RANKER_TTL:
+                return entry[0]
+            medians = property_cache.shared.get(self._key(using))
+            if medians is not None:
+                ranker = ListingRanker(medians)
+            elif entry is not None:
+                ranker = entry[0]
+            else:
+                ranker = ListingRanker.from_db(using)
+                property_cache.shared.add(self._key(using), ranker.medians, None)
+            self._rankers[using] = (ranker, time.monotonic())
+            return ranker
+
+    def publish(self, ranker: ListingRanker, using: str = "default") -> None:
+        property_cache.shared.set(self._key(using), ranker.medians, None)
+        with self._lock:
+            self._rankers[using] = (ranker, time.monotonic())
+
+    def reset(self) -> None:
+        with self._lock:
+            for using in self._rankers:
+                property_cache.shared.delete(self._key(using))
+            self._rankers.clear()
+
+
+listing_ranker = _RankerHolder()
+
+
+def _moved(pks, using: str) -> None:
+    """Signal rank changes: a snapshot refresh and fresh cached objects."""
+    for pk in pks:
+        property_cache.invalidate_on_commit(pk, using=using)
+    transaction.on_commit(listings_changed, using=using)
+
+
+def _write(listings: pd.DataFrame, scores: np.ndarray, using: str) -> int:
+    """Store the scores that moved, stamping ``ranked_at``."""
+    changed = np.abs(scores - listings["rank_score"].to_numpy(dtype=np.float64)) >= 0.05
+    if not changed.any():
+        return 0
+    now = timezone.now()
+    moved = listings["id"][changed].tolist()
+    Property.objects.using(using).bulk_update(
+        [Property(pk=pk, rank_score=float(score), ranked_at=now) for pk, score in zip(moved, scores[changed])],
+        ["rank_score", "ranked_at"],
+        batch_size=1000,
+    )
+    _moved(moved, using)
+    return len(moved)
+
+
+def rerank(pks: Iterable, using: str = "default") -> int:
+    """Re-rank a few listings after writes that skip ``save()``; returns how many moved."""
+    pks = list(pks)
+    if not pks:
+        return 0
+    listings = pd.DataFrame.from_records(
+        Property.objects.using(using).filter(pk__in=pks).order_by().values_list(*RANK_COLUMNS), columns=RANK_COLUMNS
+    )
+    if listings.empty:
+        return 0
+    return _write(listings, listing_ranker.get(using).score(listings), using)
+
+
+@dataclass
+class RankingResult:
+    ranked: int
+    updated: int
+    seconds: float
+
+
+def rank_properties(using: str = "default", chunk_size: int = 50_000, ranker: ListingRanker | None = None) -> RankingResult:
+    """Re-rank every listing in keyset chunks, writing back only scores that moved.
+
+    Moved scores go through a temporary table and one ``UPDATE ... FROM``
+    per chunk, like ``score_open_leads``. ``bulk_update``'s ``CASE`` gets
+    slow with tens of thousands of rows.
+    """
+    started = time.perf_counter()
+    ranker = ranker or ListingRanker.from_db(using)
+    listing_ranker.publish(ranker, using)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(Property._meta.db_table)
+    pk_field = Property._meta.pk
+    pk_column = quote(pk_field.column)
+
+    ranked = updated = 0
+    last = None
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE listing_ranks (id {pk_field.db_type(connection)} PRIMARY KEY, score REAL)")
+        try:
+            while True:
+                batch = Property.objects.using(using).order_by("pk")
+                if last is not None:
+                    batch = batch.filter(pk__gt=last)
+                listings = pd.DataFrame.from_records(batch.values_list(*RANK_COLUMNS)[:chunk_size], columns=RANK_COLUMNS)
+                if listings.empty:
+                    break
+                last = listings["id"].iloc[-1]
+                scores = ranker.score(listings)
+                changed = np.abs(scores - listings["rank_score"].to_numpy(dtype=np.float64)) >= 0.05
+                if changed.any():
+                    moved = listings["id"][changed].tolist()
+                    with transaction.atomic(using=using):
+                        cursor.executemany(
+                            "INSERT INTO listing_ranks (id, score) VALUES (%s, %s)",
+                            [
+                                (pk_field.get_db_prep_value(pk, connection), score)
+                                for pk, score in zip(moved, scores[changed].tolist())
+                            ],
+                        )
+                        cursor.execute(
+                            f"UPDATE {table} SET rank_score = r.score, {quote('ranked_at')} = %s "
+                            f"FROM listing_ranks r WHERE {table}.{pk_column} = r.id",
+                            [Property._meta.get_field("ranked_at").get_db_prep_value(timezone.now(), connection)],
+                        )
+                        cursor.execute("DELETE FROM listing_ranks")
+                        _moved(moved, using)
+                ranked += len(listings)
+                updated += int(changed.sum())
+                if len(listings) < chunk_size:
+                    break
+        finally:
+            cursor.execute("DROP TABLE listing_ranks")
+    return RankingResult(ranked, updated, time.perf_counter() - started)
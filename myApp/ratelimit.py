@@ -0,0 +1,239 @@
+"""Token-bucket rate limiting and load shedding shared by all gunicorn workers.
+
+State lives in a small memory-mapped file so every worker on the host sees the
+same buckets and counters without a network round trip:
+
+* a header with admitted/rejected/shed counters and a time-decayed average
+  of DB query latency (a decayed sum and sample weight, so one slow request
+  after a quiet spell is one sample, not the whole average),
+* one in-flight slot per worker process (the number of other busy workers
+  is our proxy for queue depth), and
+* a fixed-size open-addressed table of token buckets keyed by a hash of
+  ``policy:scope:value``.
+
+Writers take a POSIX byte-range lock on just the record they touch (plus a
+thread lock, since record locks are per process), so unrelated buckets never
+contend. On platforms without ``fcntl`` the table falls back to
+process-local locking.
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+HEADER = struct.Struct("<4sIQQQddd")  # magic, slots, admitted, rejected, shed, decayed latency sum (ms), weight, timestamp
+WORKER = struct.Struct("<Iq")  # pid, in-flight requests
+BUCKET = struct.Struct("<Qdd")  # key hash, tokens, last refill (unix time)
+MAGIC = b"RLv2"
+LATENCY_HALF_LIFE = 5.0  # seconds for a latency sample's weight to halve
+MIN_LATENCY_SAMPLES = 5.0  # decayed sample weight needed before latency can shed
+MAX_WORKERS = 128
+PROBES = 4
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass(frozen=True)
+class Limit:
+    scope: str  # "ip" or "slug" (any URL kwarg name works)
+    rate: float  # tokens per second
+    burst: float
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Limit":
+        count, _, unit = str(config["rate"]).partition("/")
+        rate = float(count) / _UNITS[unit or "s"]
+        return cls(scope=config.get("scope", "ip"), rate=rate, burst=float(config.get("burst", count)))
+
+
+class SharedState:
+    def __init__(self, path: str | Path, slots: int = 65536):
+        self.path = Path(path)
+        self.slots = slots
+        self.pid = os.getpid()
+        self._thread_lock = threading.Lock()
+        self._worker_index: int | None = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        size = HEADER.size + MAX_WORKERS * WORKER.size + slots * BUCKET.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked(0, HEADER.size):
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            magic, stored_slots, *_ = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or stored_slots != slots:
+                self._map[:size] = bytes(size)
+                HEADER.pack_into(self._map, 0, MAGIC, slots, 0, 0, 0, 0.0, 0.0, 0.0)
+
+    # -- locking ---------------------------------------------------------------
+
+    class _Lock:
+        def __init__(self, state: "SharedState", start: int, length: int):
+            self.state, self.start, self.length = state, start, length
+
+        def __enter__(self):
+            self.state._thread_lock.acquire()
+            if fcntl is not None:
+                fcntl.lockf(self.state._fd, fcntl.LOCK_EX, self.length, self.start)
+
+        def __exit__(self, *exc):
+            if fcntl is not None:
+                fcntl.lockf(self.state._fd, fcntl.LOCK_UN, self.length, self.start)
+            self.state._thread_lock.release()
+
+    def _locked(self, start: int, length: int) -> "_Lock":
+        return self._Lock(self, start, length)
+
+    # -- counters --------------------------------------------------------------
+
+    def incr(self, field: str) -> None:
+        index = {"admitted": 2, "rejected": 3, "shed": 4}[field]
+        with self._locked(0, HEADER.size):
+            values = list(HEADER.unpack_from(self._map, 0))
+            values[index] += 1
+            HEADER.pack_into(self._map, 0, *values)
+
+    def observe_latency(self, latency_ms: float) -> None:
+        with self._locked(0, HEADER.size):
+            values = list(HEADER.unpack_from(self._map, 0))
+            now = time.time()
+            decay = _decay(now - values[7])
+            values[5] = values[5] * decay + latency_ms
+            values[6] = values[6] * decay + 1.0
+            values[7] = now
+            HEADER.pack_into(self._map, 0, *values)
+
+    def db_latency(self) -> tuple[float, float]:
+        """Recent DB query latency (ms) and the decayed number of samples behind it."""
+        *_, total, weight, updated = HEADER.unpack_from(self._map, 0)
+        if weight <= 0:
+            return 0.0, 0.0
+        return total / weight, weight * _decay(time.time() - updated)
+
+    def db_latency_ms(self) -> float:
+        """Recent DB query latency, once enough samples back it; 0 before that."""
+        latency, samples = self.db_latency()
+        return latency if samples >= MIN_LATENCY_SAMPLES else 0.0
+
+    def stats(self) -> dict:
+        _, _, admitted, rejected, shed, *_ = HEADER.unpack_from(self._map, 0)
+        latency, samples = self.db_latency()
+        return {
+            "admitted": admitted,
+            "rejected": rejected,
+            "shed": shed,
+            "busy_workers": self.busy_workers(),
+            "db_latency_ms": round(latency, 2),
+            "db_latency_samples": round(samples, 1),
+        }
+
+    # -- in-flight tracking ------------------------------------------------------
+
+    def _worker_offset(self) -> int:
+        if self._worker_index is None:
+            with self._locked(HEADER.size, MAX_WORKERS * WORKER.size):
+                free = None
+                for index in range(MAX_WORKERS):
+                    pid, _ = WORKER.unpack_from(self._map, HEADER.size + index * WORKER.size)
+                    if pid == self.pid:
+                        free = index
+                        break
+                    if free is None and (pid == 0 or not _alive(pid)):
+                        free = index
+                index = free if free is not None else self.pid % MAX_WORKERS
+                WORKER.pack_into(self._map, HEADER.size + index * WORKER.size, self.pid, 0)
+                self._worker_index = index
+        return HEADER.size + self._worker_index * WORKER.size
+
+    def enter(self) -> None:
+        offset = self._worker_offset()
+        with self._thread_lock:
+            pid, inflight = WORKER.unpack_from(self._map, offset)
+            WORKER.pack_into(self._map, offset, self.pid, inflight + 1)
+
+    def leave(self) -> None:
+        offset = self._worker_offset()
+        with self._thread_lock:
+            pid, inflight = WORKER.unpack_from(self._map, offset)
+            WORKER.pack_into(self._map, offset, self.pid, max(inflight - 1, 0))
+
+    def busy_workers(self) -> int:
+        """Other workers mid-request; the asking worker is always busy, so it is left out."""
+        busy = 0
+        for index in range(MAX_WORKERS):
+            pid, inflight = WORKER.unpack_from(self._map, HEADER.size + index * WORKER.size)
+            # A worker killed mid-request never decrements its slot.
+            if pid and pid != self.pid and inflight > 0 and _alive(pid):
+                busy += 1
+        return busy
+
+    # -- token buckets -----------------------------------------------------------
+
+    def take(self, key: str, limit: Limit, now: float | None = None) -> float:
+        """Consume one token for ``key``; returns 0 if allowed, else seconds until a token is due."""
+        now = time.time() if now is None else now
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        base = HEADER.size + MAX_WORKERS * WORKER.size
+        first = digest % self.slots
+        start = base + first * BUCKET.size
+        length = min(PROBES, self.slots - first) * BUCKET.size
+        with self._locked(start, length):
+            chosen, oldest = None, None
+            for probe in range(length // BUCKET.size):
+                offset = start + probe * BUCKET.size
+                stored, tokens, updated = BUCKET.unpack_from(self._map, offset)
+                if stored == digest:
+                    chosen = (offset, tokens, updated)
+                    break
+                if stored == 0 or now - updated > 3600:
+                    chosen = (offset, limit.burst, now)
+                    break
+                if oldest is None or updated < oldest[2]:
+                    oldest = (offset, limit.burst, now)
+            offset, tokens, updated = chosen or oldest
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            if tokens >= 1:
+                BUCKET.pack_into(self._map, offset, digest, tokens - 1, now)
+                return 0.0
+            BUCKET.pack_into(self._map, offset, digest, tokens, now)
+            return (1 - tokens) / limit.rate if limit.rate > 0 else 60.0
+
+
+def _decay(seconds: float) -> float:
+    return 2.0 ** (-max(seconds, 0.0) / LATENCY_HALF_LIFE)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_states: dict[tuple[str, int], SharedState] = {}
+_states_lock = threading.Lock()
+
+
+def shared_state(path: str | Path) -> SharedState:
+    """Per-process handle on the shared file (re-opened after fork)."""
+    key = (str(path), os.getpid())
+    state = _states.get(key)
+    if state is None:
+        with _states_lock:
+            state = _states.get(key)
+            if state is None:
+                state = _states[key] = SharedState(path)
+    return state
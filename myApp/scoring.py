@@ -0,0 +1,280 @@
+"""Lead priority scores, computed in NumPy batches.
+
+A lead's score (0-100) adds up four weighted parts:
+
+* **fit**: how many listings in the lead's preferred areas are within
+  ``budget_max``. A lead without areas counts every listing, and a lead
+  without a budget gets half credit. Listings are matched to an ``Area``
+  when the slug of their city or area equals the area's slug.
+* **consent**: ``consent_contact``.
+* **source**: the conversion rate of the lead's ``utm_source``, smoothed
+  towards the overall rate and compared with it.
+* **recency**: halves every ``RECENCY_HALF_LIFE_DAYS``.
+
+``LeadScorer`` holds the inventory as one sorted ``int64`` array of
+``area_code << 32 | price`` keys. Counting a lead-area pair's affordable
+listings is then two ``searchsorted`` calls over the whole batch.
+``score_open_leads`` streams open (unconverted) leads in keyset chunks
+through a raw cursor and writes back only the scores that changed, through
+a temporary table. ``score_leads`` re-scores a few leads after
+``lead_submit``.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from django.db import connection as db_connection, connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .live import publish
+from .models import Area, Lead, Property
+
+WEIGHTS = {"fit": 40.0, "consent": 15.0, "source": 20.0, "recency": 25.0}
+FIT_SATURATION = 20  # this many affordable listings earn the full fit score
+NO_BUDGET_FIT = 0.5
+RECENCY_HALF_LIFE_DAYS = 7.0
+SOURCE_PRIOR = 20  # leads' worth of weight pulling a source towards the overall rate
+SCORER_TTL = 600.0
+_PRICE_BITS = 32
+_NO_LIMIT = (1 << _PRICE_BITS) - 1
+LEAD_COLUMNS = ("id", "budget_max", "consent_contact", "utm_source", "created_at", "score")
+
+
+class LeadScorer:
+    """Inventory and conversion statistics needed to score any batch of leads."""
+
+    def __init__(self, area_ids: list, area_keys: np.ndarray, prices: np.ndarray, source_rates: dict[str, float], base_rate: float):
+        self.area_codes = {area_id: code for code, area_id in enumerate(area_ids)}
+        self.area_keys = area_keys
+        self.prices = prices
+        self.source_rates = source_rates
+        self.base_rate = base_rate
+
+    @classmethod
+    def from_db(cls, using: str = "default") -> LeadScorer:
+        areas = list(Area.objects.using(using).values_list("id", "slug"))
+        codes = {slug: code for code, (_, slug) in enumerate(areas)}
+
+        listings = pd.DataFrame.from_records(
+            Property.objects.using(using).order_by().values_list("city", "area", "price_amount").iterator(chunk_size=10_000),
+            columns=["city", "area", "price"],
+        )
+        price = listings["price"].to_numpy(dtype=np.int64)
+        per_column = []
+        for column in ("city", "area"):
+            # slugify once per distinct name, not once per listing
+            names, uniques = pd.factorize(listings[column])
+            # (the trailing -1 is what factorize's -1 for blanks/NaN indexes)
+            lookup = np.array([codes.get(slugify(name), -1) for name in uniques] + [-1], dtype=np.int64)
+            per_column.append(lookup[names])
+        city_codes, area_codes = per_column
+        # A listing whose city and area name the same Area counts once.
+        area_codes = np.where(area_codes == city_codes, -1, area_codes)
+        listing_codes = np.concatenate([city_codes, area_codes])
+        listing_prices = np.clip(np.concatenate([price, price]), 0, _NO_LIMIT)
+        matched = listing_codes >= 0
+        area_keys = np.sort((listing_codes[matched] << _PRICE_BITS) | listing_prices[matched])
+
+        sources = Lead.objects.using(using).order_by().values("utm_source").annotate(
+            total=Count("pk"), won=Count("pk", filter=Q(converted=True))
+        )
+        total = won = 0
+        counts = {}
+        for row in sources:
+            counts[row["utm_source"]] = (row["won"], row["total"])
+            total += row["total"]
+            won += row["won"]
+        base_rate = won / total if total else 0.0
+        rates = {source: (w + SOURCE_PRIOR * base_rate) / (t + SOURCE_PRIOR) for source, (w, t) in counts.items()}
+        return cls([area_id for area_id, _ in areas], area_keys, np.sort(price), rates, base_rate)
+
+    def codes(self, area_ids, connection=None) -> np.ndarray:
+        """Inventory codes for ``area_ids`` (-1 if unknown); raw column values when ``connection`` is given."""
+        lookup = self.area_codes
+        if connection is not None:
+            field = Area._meta.pk
+            lookup = {field.get_db_prep_value(area_id, connection): code for area_id, code in lookup.items()}
+        return pd.Series(area_ids, dtype=object).map(lookup).fillna(-1).to_numpy(dtype=np.int64)
+
+    def score(self, leads: pd.DataFrame, rows: np.ndarray, codes: np.ndarray, now=None) -> np.ndarray:
+        """Scores for ``leads`` (a ``LEAD_COLUMNS`` frame); lead ``rows[i]`` prefers area ``codes[i]``."""
+        now = now or timezone.now()
+        n = len(leads)
+        budget = leads["budget_max"].to_numpy(dtype=np.float64, na_value=np.nan)
+        has_budget = ~np.isnan(budget)
+        limit = np.where(has_budget, np.clip(np.nan_to_num(budget), 0, _NO_LIMIT), _NO_LIMIT).astype(np.int64)
+
+        has_areas = np.bincount(rows, minlength=n) > 0
+        known = codes >= 0
+        rows, codes = rows[known], codes[known]
+        low = np.searchsorted(self.area_keys, codes << _PRICE_BITS, side="left")
+        high = np.searchsorted(self.area_keys, (codes << _PRICE_BITS) | limit[rows], side="right")
+        in_areas = np.bincount(rows, weights=high - low, minlength=n)
+        anywhere = np.searchsorted(self.prices, limit, side="right")
+        matches = np.where(has_areas, in_areas, anywhere)
+        fit = np.minimum(np.log1p(matches) / math.log1p(FIT_SATURATION), 1.0)
+        fit = np.where(has_budget, fit, fit * NO_BUDGET_FIT)
+
+        consent = leads["consent_contact"].to_numpy(dtype=np.float64)
+
+        if self.base_rate > 0:
+            rates = leads["utm_source"].map(self.source_rates).fillna(self.base_rate).to_numpy(dtype=np.float64)
+            source = np.minimum(rates / self.base_rate, 2.0) / 2.0
+        else:
+            source = np.full(n, 0.5)
+
+        created = pd.to_datetime(leads["created_at"], utc=True)
+        age_days = (pd.Timestamp(now) - created).dt.total_seconds().to_numpy() / 86400.0
+        recency = np.exp2(-np.maximum(age_days, 0.0) / RECENCY_HALF_LIFE_DAYS)
+
+        total = (
+            WEIGHTS["fit"] * fit
+            + WEIGHTS["consent"] * consent
+            + WEIGHTS["source"] * source
+            + WEIGHTS["recency"] * recency
+        )
+        return np.round(total, 1)
+
+
+class _ScorerHolder:
+    """Per-process scorer, refreshed every ``SCORER_TTL`` seconds.
+
+    Only a process's first use builds it inline. Later refreshes run on a
+    background thread while the old scorer keeps answering, so ``lead_submit``
+    never waits on the inventory scan. Areas created since the last refresh
+    score as unknown (no affordable listings) until the next one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scorer: LeadScorer | None = None
+        self._built = 0.0
+        self._refreshing = False
+
+    def get(self) -> LeadScorer:
+        with self._lock:
+            if self._scorer is None:
+                self._scorer, self._built = LeadScorer.from_db(), time.monotonic()
+            elif time.monotonic() - self._built > SCORER_TTL and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, name="lead-scorer", daemon=True).start()
+            return self._scorer
+
+    def _refresh(self) -> None:
+        try:
+            scorer = LeadScorer.from_db()
+            with self._lock:
+                self._scorer, self._built = scorer, time.monotonic()
+        finally:
+            with self._lock:
+                self._refreshing = False
+            db_connection.close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._scorer = None
+
+
+lead_scorer = _ScorerHolder()
+
+
+def score_leads(pks) -> None:
+    """Score a handful of leads now, e.g. right after they were submitted."""
+    pks = list(pks)
+    leads = pd.DataFrame.from_records(
+        Lead.objects.filter(pk__in=pks).values_list(*LEAD_COLUMNS), columns=LEAD_COLUMNS
+    )
+    if leads.empty:
+        return
+    positions = {pk: row for row, pk in enumerate(leads["id"])}
+    links = list(Lead.preferred_areas.through.objects.filter(lead_id__in=pks).values_list("lead_id", "area_id"))
+    area_ids = [area_id for _, area_id in links]
+    scorer = lead_scorer.get()
+    rows = np.array([positions[lead_id] for lead_id, _ in links], dtype=np.int64)
+    scores = [float(score) for score in scorer.score(leads, rows, scorer.codes(area_ids))]
+    now = timezone.now()
+    Lead.objects.bulk_update(
+        [Lead(pk=pk, score=score, updated_at=now) for pk, score in zip(leads["id"], scores)], ["score", "updated_at"]
+    )
+    for pk, score in zip(leads["id"], scores):
+        publish("lead", {"op": "scored", "id": pk, "score": score})
+
+
+@dataclass
+class ScoringResult:
+    scored: int
+    updated: int
+    seconds: float
+
+
+def score_open_leads(using: str = "default", chunk_size: int = 250_000, scorer: LeadScorer | None = None) -> ScoringResult:
+    """Re-score every unconverted lead, writing back only scores that moved."""
+    started = time.perf_counter()
+    scorer = scorer or LeadScorer.from_db(using)
+    connection = connections[using]
+    now = timezone.now()
+    quote = connection.ops.quote_name
+    lead_table = quote(Lead._meta.db_table)
+    through = Lead.preferred_areas.through._meta
+    lead_column = quote(through.get_field("lead").column)
+    area_column = quote(through.get_field("area").column)
+    pk_column = quote(Lead._meta.pk.column)
+    updated_column = quote(Lead._meta.get_field("updated_at").column)
+    id_type = Lead._meta.pk.db_type(connection)
+
+    scored = updated = 0
+    last = None
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE lead_scores (id {id_type} PRIMARY KEY, score REAL)")
+        try:
+            while True:
+                batch = Lead.objects.using(using).filter(converted=False).order_by("pk")
+                if last is not None:
+                    batch = batch.filter(pk__gt=last)
+                sql, params = batch.values_list(*LEAD_COLUMNS)[:chunk_size].query.sql_with_params()
+                cursor.execute(sql, params)
+                leads = pd.DataFrame.from_records(cursor.fetchall(), columns=LEAD_COLUMNS)
+                if leads.empty:
+                    break
+                # Raw rows skip Django's converters: SQLite datetimes come back naive (UTC).
+                leads["created_at"] = pd.to_datetime(leads["created_at"], utc=True)
+                first, last = leads["id"].iloc[0], leads["id"].iloc[-1]
+
+                cursor.execute(
+                    f"SELECT {lead_column}, {area_column} FROM {quote(through.db_table)} "
+                    f"WHERE {lead_column} BETWEEN %s AND %s",
+                    [first, last],
+                )
+                links = pd.DataFrame.from_records(cursor.fetchall(), columns=["lead", "area"])
+                positions = pd.Index(leads["id"]).get_indexer(links["lead"]) if len(links) else np.empty(0, dtype=np.int64)
+                keep = positions >= 0
+                codes = scorer.codes(links["area"].to_numpy()[keep], connection)
+                scores = scorer.score(leads, positions[keep].astype(np.int64), codes, now=now)
+
+                changed = np.abs(scores - leads["score"].to_numpy(dtype=np.float64)) >= 0.05
+                if changed.any():
+                    with transaction.atomic(using=using):
+                        cursor.executemany(
+                            "INSERT INTO lead_scores (id, score) VALUES (%s, %s)",
+                            list(zip(leads["id"][changed], scores[changed].tolist())),
+                        )
+                        cursor.execute(
+                            f"UPDATE {lead_table} SET score = s.score, {updated_column} = %s FROM lead_scores s "
+                            f"WHERE {lead_table}.{pk_column} = s.id",
+                            [connection.ops.adapt_datetimefield_value(now)],
+                        )
+                        cursor.execute("DELETE FROM lead_scores")
+                scored += len(leads)
+                updated += int(changed.sum())
+                if len(leads) < chunk_size:
+                    break
+        finally:
+            cursor.execute("DROP TABLE lead_scores")
+    return ScoringResult(scored, updated, time.perf_counter() - started)
@@ -0,0 +1,151 @@
+"""Session shortlists and the side-by-side comparison built from them.
+
+The shortlist is a list of listing ids in the session, so it follows the
+visitor's session rather than one browser's ``localStorage``. ``/compare``
+loads the listings to compare through ``property_cache.get_many`` (and
+``get_many_by_slug``). That costs a fixed number of cache reads plus at most
+one ``in_bulk`` query, however many listings there are. Every column's best
+and worst values are worked out once in ``comparison``, so the template only
+renders flags.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from django.core.validators import validate_slug
+from django.core.exceptions import ValidationError
+
+from .cache import property_cache
+from .models import Property
+
+SESSION_KEY = "shortlist"
+MAX_ITEMS = 12
+
+
+def get(session) -> list[str]:
+    return list(session.get(SESSION_KEY, []))
+
+
+def add(session, pks: Iterable[str]) -> list[str]:
+    """Append new ids, oldest dropping off past ``MAX_ITEMS``; unknown listings are ignored."""
+    current = get(session)
+    fresh = [pk for pk in dict.fromkeys(_ids(pks)) if pk not in current]
+    if fresh:
+        fresh = [pk for pk in fresh if pk in property_cache.get_many(fresh)]
+        current = (current + fresh)[-MAX_ITEMS:]
+        session[SESSION_KEY] = current
+    return current
+
+
+def remove(session, pks: Iterable[str]) -> list[str]:
+    drop = set(_ids(pks))
+    current = [pk for pk in get(session) if pk not in drop]
+    session[SESSION_KEY] = current
+    return current
+
+
+def clear(session) -> None:
+    session.pop(SESSION_KEY, None)
+
+
+def _ids(values: Iterable[str]) -> list[str]:
+    ids = []
+    for value in values:
+        try:
+            ids.append(str(uuid.UUID(str(value).strip())))
+        except ValueError:
+            continue
+    return ids
+
+
+def parse(values: Iterable[str]) -> tuple[list[str], list[str]]:
+    """Split comma-separated ``?p=`` tokens into listing ids and slugs."""
+    ids, slugs = [], []
+    for value in values:
+        for token in value.split(","):
+            token = token.strip()
+            if not token:
+                continue
+            found = _ids([token])
+            if found:
+                ids.extend(found)
+                continue
+            try:
+                validate_slug(token)
+            except ValidationError:
+                continue
+            slugs.append(token)
+    return ids, slugs
+
+
+def load(ids: list[str], slugs: list[str]) -> list[Property]:
+    """The listings for ``ids`` then ``slugs``, deduplicated and capped at ``MAX_ITEMS``."""
+    by_id = property_cache.get_many(ids[:MAX_ITEMS]) if ids else {}
+    by_slug = property_cache.get_many_by_slug(slugs[:MAX_ITEMS]) if slugs else {}
+    listings = {}
+    for obj in [*by_id.values(), *by_slug.values()]:
+        listings.setdefault(obj.pk, obj)
+    return list(listings.values())[:MAX_ITEMS]
+
+
+@dataclass(frozen=True)
+class Column:
+    label: str
+    value: Callable[[Property], float | None]
+    display: Callable[[Property], str]
+    # Whether a lower value is the better one (price) or a higher one (beds).
+    lower_is_better: bool
+
+
+def _per_sqm(prop: Property) -> float | None:
+    return prop.price_amount / prop.floor_area_sqm if prop.floor_area_sqm else None
+
+
+COLUMNS = (
+    Column("Price", lambda p: p.price_amount, lambda p: f"₱{p.price_amount:,}", True),
+    Column("Price per sqm", _per_sqm, lambda p: f"₱{_per_sqm(p):,.0f}" if p.floor_area_sqm else "—", True),
+    Column("Floor area", lambda p: p.floor_area_sqm or None, lambda p: f"{p.floor_area_sqm} sqm" if p.floor_area_sqm else "—", False),
+    Column("Bedrooms", lambda p: p.beds, lambda p: str(p.beds), False),
+    Column("Bathrooms", lambda p: p.baths, lambda p: str(p.baths), False),
+    Column("Parking", lambda p: int(p.parking), lambda p: "Yes" if p.parking else "No", False),
+    Column("Enquiries", lambda p: p.lead_count, lambda p: str(p.lead_count), False),
+)
+
+
+@dataclass(frozen=True)
+class Cell:
+    display: str
+    best: bool = False
+    worst: bool = False
+
+
+@dataclass(frozen=True)
+class Row:
+    label: str
+    cells: list[Cell]
+
+
+def comparison(listings: list[Property], columns: tuple[Column, ...] = COLUMNS) -> list[Row]:
+    """One row per column with each listing's cell, best and worst values flagged.
+
+    Nothing is flagged when fewer than two listings have a value or all of
+    them are equal.
+    """
+    rows = []
+    for column in columns:
+        values = [column.value(prop) for prop in listings]
+        known = [value for value in values if value is not None]
+        low, high = (min(known), max(known)) if len(known) > 1 else (None, None)
+        best, worst = (low, high) if column.lower_is_better else (high, low)
+        flagged = low is not None and low != high
+        rows.append(Row(column.label, [
+            Cell(
+                column.display(prop),
+                best=flagged and value is not None and value == best,
+                worst=flagged and value is not None and value == worst,
+            )
+            for prop, value in zip(listings, values)
+        ]))
+    return rows
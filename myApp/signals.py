@@ -0,0 +1,144 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .alerts import enqueue_matches, search_matcher
+from .autocomplete import suggestion_index
+from .cache import bump_listing_generation, property_cache
+from .leads import adjust_lead_counts, lead_counts_frozen
+from .live import lead_diff, property_diff, publish
+from .models import Lead, LeadTombstone, Property, PropertyTombstone, SavedSearch
+from .prices import record_prices
+from .ranking import listing_ranker
+from .snapshot import listings_changed
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_cache(sender, instance: Property, using: str, **kwargs) -> None:
+    property_cache.invalidate_on_commit(instance.pk, instance.slug, using)
+
+
+@receiver(pre_save, sender=Property)
+def note_price_change(sender, instance: Property, using: str, raw: bool = False, update_fields=None, **kwargs) -> None:
+    if raw or (update_fields is not None and "price_amount" not in update_fields):
+        return
+    if instance._state.adding:
+        instance._price_observed = True
+        return
+    old = Property.objects.using(using).filter(pk=instance.pk).values_list("price_amount", flat=True).first()
+    if old is not None and old != instance.price_amount:
+        instance.previous_price = old
+        instance.price_changed_at = timezone.now()
+        instance._price_observed = True
+        instance._price_dropped = instance.price_amount < old
+
+
+@receiver(pre_save, sender=Property)
+def rank_property(sender, instance: Property, using: str, raw: bool = False, update_fields=None, **kwargs) -> None:
+    # Partial saves cannot add rank_score to their columns; rank_properties catches them up.
+    # The medians come from the last rank_properties run, so this does not scan listings.
+    if raw or update_fields is not None:
+        return
+    instance.rank_score = listing_ranker.get(using).score_one(instance)
+
+
+@receiver(post_save, sender=Property)
+def record_price_history(sender, instance: Property, using: str, **kwargs) -> None:
+    if instance.__dict__.pop("_price_observed", False):
+        record_prices([(instance.pk, instance.price_changed_at or instance.created_at, instance.price_amount)], using)
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance: Property, using: str, **kwargs) -> None:
+    transaction.on_commit(lambda: suggestion_index.update_property(instance), using=using)
+    transaction.on_commit(lambda: suggestion_index.note_local_change(bump_listing_generation()), using=using)
+
+
+@receiver(post_delete, sender=Property)
+def unindex_property(sender, instance: Property, using: str, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: suggestion_index.remove_property(pk), using=using)
+    transaction.on_commit(lambda: suggestion_index.note_local_change(bump_listing_generation()), using=using)
+
+
+@receiver(post_delete, sender=Property)
+def record_tombstone(sender, instance: Property, using: str, **kwargs) -> None:
+    PropertyTombstone.objects.using(using).update_or_create(id=instance.pk, defaults={"slug": instance.slug})
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def refresh_listing_snapshot(sender, using: str, **kwargs) -> None:
+    transaction.on_commit(listings_changed, using=using)
+
+
+@receiver(post_save, sender=Property)
+def queue_search_alerts(sender, instance: Property, created: bool, using: str, raw: bool = False, **kwargs) -> None:
+    # A drop can bring a listing under a search's price_max; searches
+    # already alerted about it are skipped by the outbox's unique constraint.
+    dropped = instance.__dict__.pop("_price_dropped", False)
+    if (created or dropped) and not raw:
+        transaction.on_commit(lambda: enqueue_matches([instance]), using=using)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def publish_property_change(sender, instance: Property, using: str, raw: bool = False, **kwargs) -> None:
+    if raw:
+        return
+    op = "deleted" if "created" not in kwargs else "created" if kwargs["created"] else "updated"
+    diff = property_diff(instance, op)
+    transaction.on_commit(lambda: publish("property", diff, using), using=using)
+
+
+@receiver(post_save, sender=Lead)
+@receiver(post_delete, sender=Lead)
+def publish_lead_change(sender, instance: Lead, using: str, raw: bool = False, **kwargs) -> None:
+    # Archival publishes one summary event per run instead.
+    if raw or lead_counts_frozen():
+        return
+    op = "deleted" if "created" not in kwargs else "created" if kwargs["created"] else "updated"
+    diff = lead_diff(instance, op)
+    transaction.on_commit(lambda: publish("lead", diff, using), using=using)
+
+
+@receiver(post_delete, sender=Lead)
+def record_lead_tombstone(sender, instance: Lead, using: str, **kwargs) -> None:
+    # Archival writes its tombstones in bulk.
+    if lead_counts_frozen():
+        return
+    LeadTombstone.objects.using(using).update_or_create(id=instance.pk)
+
+
+@receiver(post_save, sender=SavedSearch)
+@receiver(post_delete, sender=SavedSearch)
+def refresh_search_matcher(sender, instance: SavedSearch, using: str, **kwargs) -> None:
+    deleted = "created" not in kwargs
+    transaction.on_commit(lambda: search_matcher.apply(instance, deleted), using=using)
+
+
+@receiver(m2m_changed, sender=Lead.interests.through)
+def count_property_leads(sender, instance, action: str, reverse: bool, pk_set, using: str, **kwargs) -> None:
+    if action == "pre_clear":
+        # clear() does not report what it removes.
+        if reverse:
+            Property.objects.using(using).filter(pk=instance.pk).update(lead_count=0)
+            property_cache.invalidate_on_commit(instance.pk, instance.slug, using)
+        else:
+            adjust_lead_counts(instance.interests.values_list("pk", flat=True), -1, using)
+    elif action in ("post_add", "post_remove") and pk_set:
+        delta = 1 if action == "post_add" else -1
+        if reverse:
+            adjust_lead_counts([instance.pk], delta * len(pk_set), using)
+        else:
+            adjust_lead_counts(pk_set, delta, using)
+
+
+@receiver(pre_delete, sender=Lead)
+def uncount_deleted_lead(sender, instance: Lead, using: str, **kwargs) -> None:
+    # The join rows go by cascade, which sends no m2m_changed.
+    if lead_counts_frozen():
+        return
+    adjust_lead_counts(instance.interests.values_list("pk", flat=True), -1, using)
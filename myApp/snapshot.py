@@ -0,0 +1,402 @@
+"""Columnar, memory-mapped snapshot of the listing columns the list views filter on.
+
+When ``LISTING_SNAPSHOT_ENABLED`` is set, ``results`` and ``dashboard``
+requests without a free-text ``q`` are answered here instead of by the ORM:
+city/area/beds/price predicates become NumPy masks, sorts become an
+``argpartition`` over a precomputed key, and only the page's ids are
+hydrated (through ``property_cache``).
+
+Each snapshot is a directory of ``.npy`` columns plus ``meta.json`` under
+``LISTING_SNAPSHOT_ROOT``; ``CURRENT`` names the live one. Workers open the
+columns with ``mmap_mode="r"`` so the OS page cache holds a single copy for
+the whole host. Rows are kept in primary-key order:
+
+* ``id_hi``/``id_lo``  the UUID as two uint64 halves,
+* ``price``, ``beds``, ``baths``,
+* ``city``/``area``   codes into the dictionaries in ``meta.json``,
+* ``created``/``updated`` epoch microseconds,
+* ``rank``             ``rank_score`` in tenths (see myApp.ranking), and
+* ``created_rank``     0 for the newest listing, used as the sort tie-break.
+
+Property commits bump the shared ``listing_snapshot`` generation. The next
+request that notices keeps serving the snapshot it has and starts a
+background thread, which reads only rows changed (``updated_at``) or
+re-ranked (``ranked_at``) since the snapshot's cut-off
+(plus ``PropertyTombstone`` rows), splices them into a copy of the columns
+and publishes it as a new directory; other workers just re-open ``CURRENT``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connection as db_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_generation, generation, property_cache
+from .models import Property, PropertyTombstone
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+COLUMNS = {
+    "id_hi": np.uint64,
+    "id_lo": np.uint64,
+    "price": np.int64,
+    "beds": np.int16,
+    "baths": np.int16,
+    "city": np.int32,
+    "area": np.int32,
+    "created": np.int64,
+    "updated": np.int64,
+    "rank": np.int32,
+    "created_rank": np.int64,
+}
+SNAPSHOT_FIELDS = ("id", "price_amount", "beds", "baths", "city", "area", "created_at", "updated_at", "rank_score")
+GENERATION = "listing_snapshot"
+# Transactions that commit after a refresh started can carry an older updated_at.
+CHANGE_SKEW = timedelta(minutes=1)
+_MASK64 = (1 << 64) - 1
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def snapshot_enabled() -> bool:
+    return getattr(settings, "LISTING_SNAPSHOT_ENABLED", False)
+
+
+def snapshot_root() -> Path:
+    return Path(getattr(settings, "LISTING_SNAPSHOT_ROOT", Path(settings.BASE_DIR) / "var" / "snapshot"))
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+class ListingSnapshot:
+    """One immutable snapshot: memory-mapped columns plus their dictionaries."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+        self.cities: list[str] = self.meta["cities"]
+        self.areas: list[str] = self.meta["areas"]
+        self.generation: int = self.meta["generation"]
+
+    def __len__(self) -> int:
+        return len(self.columns["id_hi"])
+
+    def city_names(self) -> list[str]:
+        """Distinct cities with at least one listing, for filter dropdowns."""
+        used = np.bincount(self.columns["city"], minlength=len(self.cities))
+        return sorted(name for name, count in zip(self.cities, used) if count)
+
+    def select(
+        self,
+        city: str = "",
+        city_or_area: str = "",
+        beds_min: int | None = None,
+        price_max: int | None = None,
+        sort: str = "new",
+    ) -> "SnapshotSelection":
+        """Rows matching the ``results``/``dashboard`` predicates, lazily sorted."""
+        cols = self.columns
+        mask = np.ones(len(self), dtype=bool)
+        if city:
+            wanted = city.lower()
+            table = np.array([name.lower() == wanted for name in self.cities], dtype=bool)
+            mask &= table[cols["city"]]
+        if city_or_area:
+            wanted = city_or_area.lower()
+            city_table = np.array([name.lower() == wanted for name in self.cities], dtype=bool)
+            area_table = np.array([wanted in name.lower() for name in self.areas], dtype=bool)
+            mask &= city_table[cols["city"]] | area_table[cols["area"]]
+        if beds_min is not None:
+            mask &= cols["beds"] >= beds_min
+        if price_max is not None:
+            mask &= cols["price"] <= price_max
+        rows = np.flatnonzero(mask)
+
+        # Keys are unique: every sort breaks ties newest-first via created_rank.
+        rank = cols["created_rank"][rows]
+        n = max(len(self), 1)
+        if sort == "price_asc":
+            keys = cols["price"][rows] * n + rank
+        elif sort == "price_desc":
+            keys = -cols["price"][rows] * n + rank
+        elif sort == "beds_desc":
+            keys = -cols["beds"][rows].astype(np.int64) * n + rank
+        elif sort == "rank":
+            keys = -cols["rank"][rows].astype(np.int64) * n + rank
+        else:
+            keys = rank
+        return SnapshotSelection(self, rows, keys)
+
+    def pk(self, row: int) -> uuid.UUID:
+        return uuid.UUID(int=(int(self.columns["id_hi"][row]) << 64) | int(self.columns["id_lo"][row]))
+
+
+class SnapshotSelection:
+    """Sliceable, countable result that ``Paginator`` accepts in place of a QuerySet."""
+
+    def __init__(self, snapshot: ListingSnapshot, rows: np.ndarray, keys: np.ndarray):
+        self.snapshot = snapshot
+        self.rows = rows
+        self.keys = keys
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    __len__ = count
+
+    def ordered_rows(self, stop: int | None = None) -> np.ndarray:
+        """Row positions in sort order, only fully sorting the first ``stop``."""
+        stop = len(self.rows) if stop is None else min(stop, len(self.rows))
+        if stop <= 0:
+            return self.rows[:0]
+        if stop < len(self.rows):
+            candidates = np.argpartition(self.keys, stop - 1)[:stop]
+        else:
+            candidates = np.arange(len(self.rows))
+        return self.rows[candidates[np.argsort(self.keys[candidates])]]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step not in (None, 1):
+            raise TypeError("SnapshotSelection only supports contiguous slices")
+        start, stop, _ = item.indices(len(self.rows))
+        pks = [self.snapshot.pk(row) for row in self.ordered_rows(stop)[start:]]
+        found = property_cache.get_many(pks)
+        # A row deleted since the last refresh simply drops out of the page.
+        return [found[str(pk)] for pk in pks if str(pk) in found]
+
+
+# -- building ------------------------------------------------------------------------
+
+
+def _encode(rows: list[tuple], cities: dict[str, int], areas: dict[str, int]) -> dict[str, np.ndarray]:
+    count = len(rows)
+    ints = [row[0].int for row in rows]
+    columns = {
+        "id_hi": np.fromiter((value >> 64 for value in ints), dtype=np.uint64, count=count),
+        "id_lo": np.fromiter((value & _MASK64 for value in ints), dtype=np.uint64, count=count),
+        "price": np.fromiter((row[1] for row in rows), dtype=np.int64, count=count),
+        "beds": np.fromiter((row[2] for row in rows), dtype=np.int16, count=count),
+        "baths": np.fromiter((row[3] for row in rows), dtype=np.int16, count=count),
+        "city": np.fromiter((cities.setdefault(row[4], len(cities)) for row in rows), dtype=np.int32, count=count),
+        "area": np.fromiter((areas.setdefault(row[5], len(areas)) for row in rows), dtype=np.int32, count=count),
+        "created": np.fromiter((_micros(row[6]) for row in rows), dtype=np.int64, count=count),
+        "updated": np.fromiter((_micros(row[7]) for row in rows), dtype=np.int64, count=count),
+        "rank": np.fromiter((round(row[8] * 10) for row in rows), dtype=np.int32, count=count),
+    }
+    return columns
+
+
+def _locate(hi: np.ndarray, lo: np.ndarray, want_hi: np.ndarray, want_lo: np.ndarray) -> np.ndarray:
+    """Positions of the wanted keys in the (hi, lo)-sorted columns, or -1 where absent."""
+    positions = np.searchsorted(hi, want_hi, side="left")
+    found = np.full(len(want_hi), -1, dtype=np.int64)
+    for index, (position, key_hi, key_lo) in enumerate(zip(positions, want_hi, want_lo)):
+        # Several rows can share the high half (same millisecond); walk that run.
+        while position < len(hi) and hi[position] == key_hi:
+            if lo[position] == key_lo:
+                found[index] = position
+                break
+            position += 1
+    return found
+
+
+class SnapshotBuilder:
+    def __init__(self, root: Path | None = None, using: str = "default"):
+        self.root = Path(root) if root else snapshot_root()
+        self.using = using
+
+    def build(self, current: ListingSnapshot | None = None, full: bool = False) -> ListingSnapshot:
+        """Publish a new snapshot, incrementally from ``current`` when given."""
+        marker = generation(GENERATION)
+        started = timezone.now()
+        if current is None or full:
+            columns, cities, areas = self._read_all()
+        else:
+            columns, cities, areas = self._apply_changes(current)
+        order = np.lexsort((columns["id_lo"], columns["created"]))[::-1]
+        columns["created_rank"] = np.empty(len(order), dtype=np.int64)
+        columns["created_rank"][order] = np.arange(len(order), dtype=np.int64)
+        meta = {
+            "generation": marker,
+            "cutoff": (started - CHANGE_SKEW).isoformat(),
+            "cities": cities,
+            "areas": areas,
+            "count": int(len(order)),
+            "built_at": timezone.now().isoformat(),
+        }
+        return self._publish(columns, meta)
+
+    def _read_all(self) -> tuple[dict[str, np.ndarray], list[str], list[str]]:
+        rows = list(
+            Property.objects.using(self.using).order_by("id").values_list(*SNAPSHOT_FIELDS).iterator(chunk_size=5000)
+        )
+        cities: dict[str, int] = {}
+        areas: dict[str, int] = {}
+        columns = _encode(rows, cities, areas)
+        return columns, list(cities), list(areas)
+
+    def _apply_changes(self, current: ListingSnapshot) -> tuple[dict[str, np.ndarray], list[str], list[str]]:
+        cutoff = datetime.fromisoformat(current.meta["cutoff"])
+        changed = list(
+            Property.objects.using(self.using)
+            .filter(Q(updated_at__gte=cutoff) | Q(ranked_at__gte=cutoff))
+            .order_by("id")
+            .values_list(*SNAPSHOT_FIELDS)
+        )
+        deleted = list(
+            PropertyTombstone.objects.using(self.using)
+            .filter(deleted_at__gte=cutoff)
+            .values_list("id", flat=True)
+        )
+        cities = {name: code for code, name in enumerate(current.cities)}
+        areas = {name: code for code, name in enumerate(current.areas)}
+        delta = _encode(changed, cities, areas)
+
+        old = {name: np.asarray(current.columns[name]) for name in COLUMNS if name != "created_rank"}
+        gone = [pk.int for pk in deleted]
+        want_hi = np.concatenate([delta["id_hi"], np.array([v >> 64 for v in gone], dtype=np.uint64)])
+        want_lo = np.concatenate([delta["id_lo"], np.array([v & _MASK64 for v in gone], dtype=np.uint64)])
+        positions = _locate(old["id_hi"], old["id_lo"], want_hi, want_lo)
+        updated_at = positions[: len(changed)]
+        in_place = updated_at >= 0
+
+        columns = {name: np.array(column) for name, column in old.items()}
+        for name, column in columns.items():
+            column[updated_at[in_place]] = delta[name][in_place]
+        keep = np.ones(len(columns["id_hi"]), dtype=bool)
+        removed = positions[len(changed):]
+        keep[removed[removed >= 0]] = False
+        if not keep.all():
+            columns = {name: column[keep] for name, column in columns.items()}
+
+        added = ~in_place
+        if added.any():
+            columns = {name: np.concatenate([column, delta[name][added]]) for name, column in columns.items()}
+            # UUIDv7 inserts normally sort after every existing key; re-sort if not.
+            hi, lo = columns["id_hi"], columns["id_lo"]
+            if len(hi) > 1 and not np.all((hi[1:] > hi[:-1]) | ((hi[1:] == hi[:-1]) & (lo[1:] > lo[:-1]))):
+                order = np.lexsort((lo, hi))
+                columns = {name: column[order] for name, column in columns.items()}
+        return columns, list(cities), list(areas)
+
+    def _publish(self, columns: dict[str, np.ndarray], meta: dict) -> ListingSnapshot:
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = f"snap-{uuid.uuid4().hex[:12]}"
+        staging = self.root / f".{name}"
+        staging.mkdir()
+        for column, values in columns.items():
+            np.save(staging / f"{column}.npy", np.ascontiguousarray(values, dtype=COLUMNS[column]))
+        (staging / "meta.json").write_text(json.dumps(meta))
+        os.replace(staging, self.root / name)
+        pointer = self.root / ".CURRENT.tmp"
+        pointer.write_text(name)
+        os.replace(pointer, self.root / "CURRENT")
+        self._prune(keep={name})
+        return ListingSnapshot(self.root / name)
+
+    def _prune(self, keep: set[str], retain: int = 2) -> None:
+        # Readers may still map an older snapshot; unlinking is safe on POSIX,
+        # but keep the previous one around for workers mid-request elsewhere.
+        snapshots = sorted(
+            (path for path in self.root.glob("snap-*") if path.name not in keep),
+            key=lambda path: path.stat().st_mtime,
+        )
+        for path in snapshots[: max(len(snapshots) - (retain - 1), 0)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# -- per-process access --------------------------------------------------------------
+
+
+class _SnapshotHolder:
+    """Per-process handle on the live snapshot; see the module docstring for how it stays current."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: ListingSnapshot | None = None
+        self._refreshing = False
+
+    def get(self) -> ListingSnapshot | None:
+        """The current snapshot, or None when the snapshot engine is disabled.
+
+        Only a process's first use waits for a build, and only when there is
+        no snapshot on disk yet.
+        """
+        if not snapshot_enabled():
+            return None
+        wanted = generation(GENERATION)
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.path.parent != snapshot_root():
+                snapshot = self._snapshot = self.open_current() or self._refresh(None)
+            if snapshot.generation == wanted or self._refreshing:
+                return snapshot
+            self._refreshing = True
+        threading.Thread(target=self._rebuild, args=(snapshot,), name="listing-snapshot", daemon=True).start()
+        return snapshot
+
+    def refresh(self) -> ListingSnapshot:
+        """Bring the snapshot up to date now, for commands that must see every commit."""
+        snapshot = self._refresh(None)
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def open_current(self) -> ListingSnapshot | None:
+        """The snapshot ``CURRENT`` points at, without checking its generation."""
+        root = snapshot_root()
+        try:
+            return ListingSnapshot(root / (root / "CURRENT").read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _refresh(self, snapshot: ListingSnapshot | None) -> ListingSnapshot | None:
+        root = snapshot_root()
+        root.mkdir(parents=True, exist_ok=True)
+        with open(root / ".lock", "w") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | (fcntl.LOCK_NB if snapshot is not None else 0))
+                except BlockingIOError:
+                    return snapshot  # another worker is refreshing; serve the slightly older copy
+            latest = self.open_current()
+            if latest is not None and latest.generation == generation(GENERATION):
+                return latest
+            return SnapshotBuilder(root).build(current=latest)
+
+    def _rebuild(self, snapshot: ListingSnapshot) -> None:
+        try:
+            fresh = self._refresh(snapshot)
+            with self._lock:
+                self._snapshot = fresh
+        finally:
+            with self._lock:
+                self._refreshing = False
+            db_connection.close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._snapshot, self._refreshing = None, False
+
+
+listing_snapshot = _SnapshotHolder()
+
+
+def listings_changed() -> None:
+    if snapshot_enabled():
+        bump_generation(GENERATION)
@@ -1,4 +1,5 @@
 from django import template
+from django.utils.html import format_html
 
 register = template.Library()
 
@@ -37,3 +38,24 @@ def peso_filter(value):
         return "₱0"
 
 
+
+
+@register.simple_tag
+def price_sparkline(points, width=240, height=48):
+    """Inline SVG step line for ``[(at, price), ...]`` from ``myApp.prices.price_chart``"""
+    if len(points) < 2:
+        return ""
+    low = min(price for _, price in points)
+    high = max(price for _, price in points)
+    span = (high - low) or 1
+    step = width / (len(points) - 1)
+    pad = 2
+    ys = [pad + (height - 2 * pad) * (high - price) / span for _, price in points]
+    path = [f"M0,{ys[0]:.1f}"]
+    for i, y in enumerate(ys[1:], start=1):
+        path.append(f"H{i * step:.1f}V{y:.1f}")
+    return format_html(
+        '<svg width="{}" height="{}" viewBox="0 0 {} {}" class="text-orange-600" role="img" aria-label="Price history">'
+        '<path d="{}" fill="none" stroke="currentColor" stroke-width="2"/></svg>',
+        width, height, width, height, "".join(path),
+    )
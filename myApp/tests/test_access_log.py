@@ -0,0 +1,91 @@
+import gzip
+import json
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.accesslog import AccessLog, access_log, read_records, rotated_path
+from myApp.models import Property
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class AccessLogTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "access.jsonl"
+        Property.objects.create(slug="loft", title="Loft", city="Makati", price_amount=40_000, beds=2)
+
+    def test_middleware_records_requests(self):
+        """Each request becomes one JSONL record with its view, filters, timings and size"""
+        with override_settings(ACCESS_LOG_PATH=str(self.path)):
+            response = self.client.get(reverse("results"), {"city": "Makati", "beds": "2", "q": " "})
+            self.client.get("/no-such-page/")
+            self.assertTrue(access_log(str(self.path)).flush())
+        first, missing = list(read_records(self.path))
+        self.assertEqual(first["view"], "results")
+        self.assertEqual(first["params"], {"city": "Makati", "beds": "2"})
+        self.assertEqual((first["status"], first["bytes"]), (200, len(response.content)))
+        self.assertGreater(first["queries"], 0)
+        self.assertGreaterEqual(first["ms"], first["db_ms"])
+        self.assertEqual((missing["view"], missing["status"]), (None, 404))
+
+    def test_rotation_gzips_old_generations(self):
+        """Past max_bytes the file becomes .1.gz, older ones shift up and the oldest go"""
+        log = AccessLog(self.path, max_bytes=200, backups=2)
+        for i in range(12):
+            log.record({"n": i, "pad": "x" * 40})
+            log.flush()
+        self.assertTrue(rotated_path(self.path, 2).exists())
+        self.assertFalse(rotated_path(self.path, 3).exists())
+        with gzip.open(rotated_path(self.path, 1), "rt") as rotated:
+            self.assertTrue(all(json.loads(line)["pad"] for line in rotated))
+        numbers = [record["n"] for record in read_records(self.path)]
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(numbers[-1], 11)
+        self.assertLess(len(numbers), 12)
+
+    def test_drops_instead_of_blocking(self):
+        """A full queue drops records at once and the drop count is logged later"""
+        if fcntl is None:
+            self.skipTest("needs fcntl")
+        log = AccessLog(self.path, queue_size=2)
+        with open(self.path.with_name(self.path.name + ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            log.record({"n": 0})
+            # Wait for the writer to take it and block on the lock.
+            while not log._queue.empty():
+                time.sleep(0.001)
+            time.sleep(0.05)
+            started = time.perf_counter()
+            accepted = [log.record({"n": i}) for i in range(1, 5)]
+            self.assertLess(time.perf_counter() - started, 0.1)
+            self.assertEqual(accepted, [True, True, False, False])
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        self.assertTrue(log.flush())
+        records = list(read_records(self.path))
+        self.assertEqual([r["n"] for r in records if "n" in r], [0, 1, 2])
+        self.assertEqual([r["count"] for r in records if r.get("event") == "dropped"], [2])
+
+    def test_analyzer(self):
+        """analyze_access_log groups by view and by filter combination, ignoring paging"""
+        with override_settings(ACCESS_LOG_PATH=str(self.path)):
+            for params in ({"city": "Makati"}, {"city": "Taguig", "page": "2"}, {"city": "Makati", "beds": "1"}):
+                self.client.get(reverse("results"), params)
+            self.client.get(reverse("dashboard"), {"sort": "price_asc"})
+            access_log(str(self.path)).flush()
+        out = StringIO()
+        call_command("analyze_access_log", path=str(self.path), stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("4 requests, 0 dropped"))
+        self.assertTrue(any(line.split()[:3] == ["results", "3", "75.0%"] for line in lines))
+        self.assertTrue(any(line.split()[:3] == ["results", "city", "2"] for line in lines))
+        self.assertTrue(any(line.split()[:3] == ["dashboard", "sort", "1"] for line in lines))
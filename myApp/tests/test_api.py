@@ -0,0 +1,112 @@
+import json
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from myApp.archive import LeadArchive
+from myApp.management.commands.seed_props import Command
+from myApp.models import Lead, Property
+
+
+class ChangeFeedApiTestCase(TestCase):
+    def setUp(self):
+        Command().handle()
+        # Outside the change-skew window, so `version` points past every row.
+        Property.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def fetch(self, name="api_properties", **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return response, json.loads(b"".join(response.streaming_content))
+
+    def test_sparse_fields(self):
+        """`fields` picks columns, always with `id` first"""
+        _, body = self.fetch(fields="slug,price_amount")
+        self.assertEqual(len(body["results"]), 8)
+        self.assertEqual(list(body["results"][0]), ["id", "slug", "price_amount"])
+        listing = Property.objects.get(slug=body["results"][0]["slug"])
+        self.assertEqual(body["results"][0]["price_amount"], listing.price_amount)
+        self.assertIsNone(body["next"])
+
+    def test_bad_parameters(self):
+        """Unknown fields, limits and cursors are 400s"""
+        for params in ({"fields": "slug,secret"}, {"limit": "0"}, {"limit": "x"}, {"cursor": "nope"}):
+            self.assertEqual(self.client.get(reverse("api_properties"), params).status_code, 400, params)
+
+    def test_cursor_pages(self):
+        """Following `next` visits every listing once, in change order"""
+        seen, cursor = [], None
+        while True:
+            _, body = self.fetch(fields="slug", limit=3, **({"cursor": cursor} if cursor else {}))
+            seen += [row["id"] for row in body["results"]]
+            cursor = body["next"]
+            if cursor is None:
+                break
+        expected = Property.objects.order_by("updated_at", "id").values_list("id", flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_since_returns_changes_and_deletions(self):
+        """`since` yields only edited rows plus tombstones for deleted ones"""
+        _, body = self.fetch(fields="price_amount")
+        edited, gone = Property.objects.order_by("id")[:2]
+        edited.price_amount = 1
+        edited.save()
+        gone_id = gone.pk
+        gone.delete()
+
+        _, changes = self.fetch(since=body["version"], fields="price_amount")
+        self.assertCountEqual(
+            changes["results"],
+            [{"id": str(edited.pk), "price_amount": 1}, {"id": str(gone_id), "deleted": True}],
+        )
+
+    def test_etag(self):
+        """Unchanged data answers 304; any edit changes the ETag"""
+        response, _ = self.fetch(fields="slug")
+        url = reverse("api_properties") + "?fields=slug"
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        Property.objects.first().save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_leads_require_staff(self):
+        """Leads are only served to admin users"""
+        Lead.objects.create(name="Ana", phone="0917", buy_or_rent=Lead.RENT)
+        self.assertIn(self.client.get(reverse("api_leads")).status_code, (401, 403))
+        User.objects.create_user("agent", password="pw")
+        self.client.login(username="agent", password="pw")
+        self.assertEqual(self.client.get(reverse("api_leads")).status_code, 403)
+
+        User.objects.create_superuser("admin", password="pw")
+        self.client.login(username="admin", password="pw")
+        _, body = self.fetch("api_leads", fields="name,phone")
+        self.assertEqual(body["results"][0]["name"], "Ana")
+
+    def test_lead_conversions_and_archival_reach_the_feed(self):
+        """Converting or archiving a lead changes the ETag and shows up in `since`"""
+        User.objects.create_superuser("admin", password="pw")
+        self.client.login(username="admin", password="pw")
+        for name in ("Ana", "Ben"):
+            Lead.objects.create(name=name, phone="0917", buy_or_rent=Lead.RENT)
+        Lead.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        Lead.objects.filter(name="Ben").update(created_at=timezone.make_aware(datetime(2025, 1, 5)))
+        response, body = self.fetch("api_leads", fields="converted")
+        url = reverse("api_leads") + "?fields=converted"
+
+        converted = Lead.objects.get(name="Ana")
+        admin.site._registry[Lead].mark_converted(None, Lead.objects.filter(pk=converted.pk))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+        archived = Lead.objects.get(name="Ben")
+        with tempfile.TemporaryDirectory() as root:
+            LeadArchive(root=Path(root)).archive(before=timezone.make_aware(datetime(2026, 1, 1)))
+
+        _, changes = self.fetch("api_leads", since=body["version"], fields="converted")
+        self.assertCountEqual(
+            changes["results"],
+            [{"id": str(converted.pk), "converted": True}, {"id": str(archived.pk), "deleted": True}],
+        )
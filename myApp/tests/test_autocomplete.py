@@ -0,0 +1,59 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.autocomplete import SuggestionIndex, suggestion_index
+from myApp.cache import bump_listing_generation
+from myApp.management.commands.seed_props import Command
+from myApp.models import Property
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects")
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        Command().handle()
+        self.index = SuggestionIndex()
+        self.index.build()
+
+    def texts(self, query):
+        return [s.text for s in self.index.suggest(query)]
+
+    def test_prefix_suggestions(self):
+        """Cities, areas and titles are suggested by prefix"""
+        self.assertIn('Makati', self.texts('mak'))
+        self.assertIn('Quezon City', self.texts('quez'))
+        self.assertIn('Modern 2BR Condo in BGC', self.texts('condo'))
+
+    def test_typo_tolerance(self):
+        """Misspelled areas still find the listing area"""
+        self.assertIn('Ortigas Center', self.texts('Ortigass'))
+        self.assertIn('Makati', self.texts('Makatti'))
+
+    def test_popularity_ranking(self):
+        """Terms shared by more listings rank first"""
+        self.assertEqual(self.texts('bg')[0], 'BGC')
+
+    def test_signals_keep_index_current(self):
+        """Saving and deleting listings patches the index in place"""
+        prop = Property.objects.create(slug='alabang-loft', title='Alabang Loft', price_amount=1, city='Muntinlupa')
+        self.index.update_property(prop)
+        self.assertIn('Muntinlupa', self.texts('munt'))
+        self.index.remove_property(prop.pk)
+        self.assertNotIn('Muntinlupa', self.texts('munt'))
+
+    def test_remote_changes_rebuild_at_most_once_per_interval(self):
+        """Another worker's commit is picked up by a rebuild, but not more often than rebuild_interval"""
+        index = SuggestionIndex(recheck_interval=0, rebuild_interval=3600)
+        index.build()
+        Property.objects.create(slug='alabang-loft', title='Alabang Loft', price_amount=1, city='Muntinlupa')
+        bump_listing_generation()
+        self.assertNotIn('Muntinlupa', [s.text for s in index.suggest('munt')])
+        index.rebuild_interval = 0
+        self.assertIn('Muntinlupa', [s.text for s in index.suggest('munt')])
+
+    def test_suggest_endpoint_no_queries(self):
+        """Keystrokes are answered without touching the database"""
+        suggestion_index.build()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('suggest'), {'q': 'pas'}, HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Pasig')
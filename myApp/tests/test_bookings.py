@@ -0,0 +1,87 @@
+from datetime import datetime, time, timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from myApp.bookings import SlotUnavailable, availability, cancel, reserve
+from myApp.models import Agent, Booking, BookingSlot, Lead, Property
+
+
+def next_monday(hour, minute=0):
+    today = timezone.localdate()
+    day = today + timedelta(days=7 - today.weekday() + 7)
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+@override_settings(RATELIMIT_POLICIES={})
+class BookingTestCase(TestCase):
+    def setUp(self):
+        self.condo = Property.objects.create(slug="condo", title="Condo", price_amount=1, city="Makati")
+        self.loft = Property.objects.create(slug="loft", title="Loft", price_amount=1, city="Taguig")
+        self.ana = Agent.objects.create(name="Ana")
+        self.ben = Agent.objects.create(name="Ben")
+        # Only shows the loft, so never offered for the condo.
+        Agent.objects.create(name="Cy").properties.add(self.loft)
+        self.nine = next_monday(9)
+
+    def test_availability_in_three_queries(self):
+        """Open slots come from one pass over held slots; a slot closes when the listing or every agent is taken"""
+        reserve(self.condo, self.nine, "A", "1")
+        reserve(self.loft, self.nine + timedelta(minutes=30), "B", "2", agent=self.ana)
+        reserve(self.loft, self.nine + timedelta(minutes=60), "C", "3", agent=self.ana)
+        BookingSlot.objects.create(
+            booking=Booking.objects.get(name="C"), agent=self.ben, property=self.loft, start=self.nine + timedelta(minutes=90)
+        )
+        with self.assertNumQueries(3):
+            slots = availability(self.condo, self.nine, self.nine + timedelta(hours=3))
+        starts = {slot.start: slot.agent_ids for slot in slots}
+        self.assertNotIn(self.nine, starts)  # the condo itself is booked
+        self.assertEqual(starts[self.nine + timedelta(minutes=30)], (self.ben.pk,))
+        self.assertEqual(len(starts), 5)
+        self.assertEqual(availability(self.condo, self.nine.replace(hour=19), self.nine.replace(hour=23)), [])
+
+    def test_reserve_assigns_free_agents_and_rejects_conflicts(self):
+        """Each listing and agent holds a slot once; multi-slot bookings block every slot they cover"""
+        first = reserve(self.condo, self.nine, "A", "1", slots=2)
+        self.assertEqual((first.start, first.end), (self.nine, self.nine + timedelta(hours=1)))
+        with self.assertRaises(SlotUnavailable):
+            reserve(self.condo, self.nine + timedelta(minutes=30), "B", "2")
+        second = reserve(self.loft, self.nine + timedelta(minutes=30), "B", "2")
+        self.assertNotEqual(second.agent_id, first.agent_id)
+        with self.assertRaises(SlotUnavailable):
+            reserve(self.loft, self.nine, "C", "3", agent=first.agent)
+        self.assertEqual(Booking.objects.count(), 2)
+
+        cancel(first)
+        self.assertEqual(first.status, Booking.CANCELLED)
+        self.assertEqual(reserve(self.condo, self.nine, "D", "4").name, "D")
+
+    def test_reserve_validates_the_grid(self):
+        """Bookings must be future, aligned and inside opening hours"""
+        cases = [
+            (self.nine + timedelta(minutes=10), 1),  # off the grid
+            (self.nine.replace(hour=17, minute=30), 2),  # runs past closing
+            (self.nine - timedelta(days=1), 1),  # Sunday
+            (self.nine - timedelta(days=21), 1),  # in the past
+        ]
+        for start, slots in cases:
+            with self.assertRaises(ValueError):
+                reserve(self.condo, start, "A", "1", slots=slots)
+
+    def test_book_and_reserve_views(self):
+        """The book page offers the lead's listing; a taken slot answers 409 with fresh slots"""
+        lead = Lead.objects.create(name="Lia", phone="0917", buy_or_rent="rent")
+        lead.interests.add(self.condo)
+        response = self.client.get(reverse("book"), {"lead": lead.id})
+        self.assertEqual(response.context["listing"], self.condo)
+        self.assertTrue(response.context["days"])
+        self.assertEqual(self.client.get(reverse("book"), {"interest": "nope"}).status_code, 200)
+
+        data = {"property": self.condo.id, "lead": lead.id, "start": self.nine.isoformat(), "name": "Lia", "phone": "0917"}
+        response = self.client.post(reverse("book_reserve"), data, HTTP_HX_REQUEST="true")
+        self.assertContains(response, "Viewing Booked")
+        self.assertEqual(lead.bookings.get().start, self.nine)
+
+        response = self.client.post(reverse("book_reserve"), data, HTTP_HX_REQUEST="true")
+        self.assertEqual(response.status_code, 409)
+        self.assertNotIn(self.nine, [slot.start for _, slots in response.context["days"] for slot in slots])
@@ -0,0 +1,111 @@
+import gzip
+import zlib
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from myApp.management.commands.seed_props import Command
+from myApp.middleware import CompressionMiddleware, brotli, negotiate_encoding
+
+
+class CompressionTestCase(TestCase):
+    def setUp(self):
+        Command().handle()
+
+    def test_negotiation(self):
+        """Brotli is preferred when offered; q=0 disables an encoding"""
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('identity'), None)
+        self.assertEqual(negotiate_encoding('br;q=0, gzip'), 'gzip')
+        if brotli is not None:
+            self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'br')
+
+    def test_html_is_gzipped(self):
+        """Pages are gzip-compressed for clients that accept it"""
+        response = self.client.get(reverse('results'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'Search Results', gzip.decompress(response.content))
+
+    def test_brotli(self):
+        """Brotli is used when available and offered"""
+        if brotli is None:
+            self.skipTest('Brotli not installed')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        body = b'<p>Listings Dashboard</p>' * 20
+        response = CompressionMiddleware(lambda r: HttpResponse(body))(request)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), body)
+
+    def test_cookie_pages_are_not_brotli(self):
+        """Pages that vary on cookies stay on padded gzip even when Brotli is offered"""
+        response = self.client.get(reverse('dashboard'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response.content[3] & 0x08)  # FNAME flag: the random padding is present
+        self.assertIn(b'Listings Dashboard', gzip.decompress(response.content))
+
+    def test_uncompressed_without_accept_encoding(self):
+        """Clients that do not advertise support get identity responses"""
+        response = self.client.get(reverse('results'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response(self):
+        """Streaming bodies are compressed chunk by chunk"""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = [b'{"row": %d}\n' % i for i in range(200)]
+        middleware = CompressionMiddleware(
+            lambda r: StreamingHttpResponse(iter(chunks), content_type='application/x-ndjson')
+        )
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b''.join(chunks))
+
+    def test_streaming_gzip_flushes_each_chunk(self):
+        """Each chunk can be decompressed before the stream ends"""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        produced = []
+
+        def rows():
+            for i in range(3):
+                produced.append(i)
+                yield b'{"row": %d}\n' % i
+
+        middleware = CompressionMiddleware(
+            lambda r: StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+        )
+        stream = iter(middleware(request).streaming_content)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        received = b''
+        while not received:
+            received += decompressor.decompress(next(stream))
+        self.assertEqual(received, b'{"row": 0}\n')
+        self.assertEqual(produced, [0])
+
+    def test_async_streaming_is_padded(self):
+        """Async streams get the same random gzip filename padding as the sync paths"""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = [b'{"row": %d}\n' % i for i in range(200)]
+
+        async def rows():
+            for chunk in chunks:
+                yield chunk
+
+        async def body(response):
+            return b''.join([part async for part in response.streaming_content])
+
+        middleware = CompressionMiddleware(
+            lambda r: StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+        )
+        compressed = async_to_sync(body)(middleware(request))
+        self.assertEqual(gzip.decompress(compressed), b''.join(chunks))
+        self.assertTrue(compressed[3] & 0x08)  # FNAME flag: the random padding is present
+
+    def test_small_and_binary_responses_untouched(self):
+        """Tiny bodies and non-text types pass through"""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        small = CompressionMiddleware(lambda r: HttpResponse('ok'))(request)
+        image = CompressionMiddleware(lambda r: HttpResponse(b'x' * 1000, content_type='image/png'))(request)
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertFalse(image.has_header('Content-Encoding'))
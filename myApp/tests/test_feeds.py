@@ -0,0 +1,132 @@
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from myApp.feeds import FeedBuilder
+from myApp.management.commands.seed_props import Command
+from myApp.middleware import brotli
+from myApp.models import Property
+
+
+class FeedBuilderTestCase(TestCase):
+    def setUp(self):
+        Command().handle()
+        # Pretend the seed happened long before the first build.
+        Property.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        settings_override = override_settings(FEEDS_ROOT=self.root, SITE_URL="https://example.com")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def build(self, **kwargs):
+        return FeedBuilder(shard_size=3).build(**kwargs)
+
+    def manifest(self):
+        return json.loads((self.root / "manifest.json").read_text())
+
+    def all_ndjson(self):
+        rows = []
+        for shard in self.manifest()["shards"]:
+            path = self.root / f"listings-{shard['number']:04d}.ndjson"
+            rows += [json.loads(line) for line in path.read_text().splitlines()]
+        return rows
+
+    def test_full_build_writes_shards_and_indexes(self):
+        """8 listings at 3 per shard give 3 shards, each with .gz/.br siblings"""
+        result = self.build()
+        self.assertTrue(result.full)
+        self.assertEqual((result.shards, result.listings), (3, 8))
+        index = (self.root / "sitemap.xml").read_text()
+        self.assertEqual(index.count("<sitemap>"), 3)
+        self.assertIn("https://example.com/feeds/sitemap-0001.xml", index)
+        shard = (self.root / "sitemap-0001.xml").read_bytes()
+        self.assertEqual(gzip.decompress((self.root / "sitemap-0001.xml.gz").read_bytes()), shard)
+        if brotli is not None:
+            self.assertEqual(brotli.decompress((self.root / "sitemap-0001.xml.br").read_bytes()), shard)
+        self.assertEqual(len(self.all_ndjson()), 8)
+        partner = json.loads((self.root / "listings.json").read_text())
+        self.assertEqual(partner["count"], 8)
+
+    def test_incremental_build_rewrites_only_dirty_shard(self):
+        """Editing one listing rewrites only the shard holding its key"""
+        self.build()
+        first = Property.objects.order_by("id").first()
+        untouched = self.root / "listings-0003.ndjson"
+        before = untouched.stat().st_mtime_ns
+        first.price_amount = 123
+        first.save()
+
+        result = self.build()
+        self.assertFalse(result.full)
+        self.assertEqual(result.rewritten, 1)
+        self.assertEqual(untouched.stat().st_mtime_ns, before)
+        prices = {row["id"]: row["price"] for row in self.all_ndjson()}
+        self.assertEqual(prices[str(first.pk)], 123)
+
+    def test_patch_falls_back_to_database(self):
+        """A shard whose previous output is missing is rewritten from its key range"""
+        self.build()
+        first = Property.objects.order_by("id").first()
+        first.description = "Line one\nLine two"
+        first.save()
+        (self.root / "shard-0001.keys").unlink()
+        self.assertEqual(self.build().rewritten, 1)
+        xml = (self.root / "listings-0001.xml").read_text()
+        self.assertIn("Line one&#10;Line two", xml)
+        self.assertEqual(len(xml.splitlines()), 3 + 3)
+        self.assertTrue((self.root / "shard-0001.keys").exists())
+
+    def test_nothing_changed(self):
+        """A second run with no edits rewrites nothing"""
+        self.build()
+        self.assertEqual(self.build().rewritten, 0)
+
+    def test_deletions_use_tombstones(self):
+        """Deleted listings disappear from their shard on the next run"""
+        self.build()
+        gone = Property.objects.order_by("id")[4]
+        gone.delete()
+        result = self.build()
+        self.assertEqual((result.rewritten, result.listings), (1, 7))
+        self.assertNotIn(gone.slug, "".join(
+            (self.root / f"sitemap-{shard['number']:04d}.xml").read_text() for shard in self.manifest()["shards"]
+        ))
+
+    def test_new_listings_grow_and_split_tail(self):
+        """New UUIDv7 keys land in the last shard, which splits once it is too big"""
+        self.build()
+        for i in range(4):
+            Property.objects.create(slug=f"new-{i}", title=f"New {i}", price_amount=1000, city="Taguig")
+        result = self.build()
+        self.assertEqual(result.listings, 12)
+        numbers = [shard["number"] for shard in self.manifest()["shards"]]
+        self.assertEqual(numbers[:2], [1, 2])
+        self.assertEqual(len(numbers), 4)
+        self.assertEqual(len(self.all_ndjson()), 12)
+
+    def test_served_precompressed(self):
+        """The sitemap index is served from its .br/.gz copy and honours ETags"""
+        self.build()
+        response = self.client.get(reverse("sitemap"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "application/xml")
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertIn(b"<sitemapindex", body)
+        cached = self.client.get(reverse("sitemap"), HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        plain = self.client.get(reverse("feed_file", args=["listings-0001.ndjson"]))
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(len(b"".join(plain.streaming_content).splitlines()), 3)
+
+    def test_unknown_feed_is_404(self):
+        """Only generated feed names are served"""
+        self.build()
+        self.assertEqual(self.client.get(reverse("feed_file", args=["manifest.json"])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("feed_file", args=["sitemap-9999.xml"])).status_code, 404)
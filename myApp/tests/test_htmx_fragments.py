@@ -0,0 +1,44 @@
+from django.test import TestCase
+from django.urls import reverse
+from myApp.management.commands.seed_props import Command
+
+
+class HtmxFragmentTestCase(TestCase):
+    def setUp(self):
+        Command().handle()
+
+    def test_results_fragment(self):
+        """HTMX filter changes on /list return only the listings fragment"""
+        response = self.client.get(reverse('results'), {'city': 'Makati'}, HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'id="filter-form"')
+        self.assertContains(response, '2 matches found')
+        self.assertIn('HX-Request', response['Vary'])
+
+    def test_results_full_page(self):
+        """Plain requests still render the whole page"""
+        response = self.client.get(reverse('results'), {'city': 'Makati'})
+        self.assertContains(response, '<html')
+        self.assertContains(response, 'id="results-listings"')
+
+    def test_dashboard_fragment_skips_cities_query(self):
+        """Dashboard fragments render without the cities dropdown query"""
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(reverse('dashboard'), {'sort': 'price_asc'}, HTTP_HX_REQUEST='true')
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, '8 properties found')
+        self.assertNotContains(response, 'All Cities')
+
+    def test_dashboard_history_restore_gets_full_page(self):
+        """Back-button restores after a cache miss need the full page"""
+        response = self.client.get(
+            reverse('dashboard'), HTTP_HX_REQUEST='true', HTTP_HX_HISTORY_RESTORE_REQUEST='true'
+        )
+        self.assertContains(response, '<html')
+        self.assertContains(response, 'All Cities')
+
+    def test_pagination_links_keep_filters(self):
+        """Pagination links carry the active filters"""
+        response = self.client.get(reverse('dashboard'), {'per': 5, 'sort': 'price_desc'}, HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'per=5&amp;sort=price_desc&amp;page=2')
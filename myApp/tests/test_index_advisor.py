@@ -0,0 +1,70 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp import advisor
+from myApp.accesslog import access_log
+from myApp.models import Property
+
+
+class IndexAdvisorTestCase(TestCase):
+    def setUp(self):
+        Property.objects.bulk_create(
+            [
+                Property(slug=f"unit-{i}", title=f"Unit {i}", city=("Makati", "Pasig")[i % 2], price_amount=20_000 + 500 * i)
+                for i in range(200)
+            ]
+        )
+
+    def shape(self, view, params, kind):
+        return next(shape for shape in advisor.collect_shapes([(view, params)]) if shape.kind == kind)
+
+    def test_candidates_follow_the_queryset(self):
+        """Equality then sort for pages, ranges for counts; LIKE and OR predicates are only reported"""
+        page = self.shape("dashboard", {"city": "Makati", "sort": "price_desc"}, "page")
+        self.assertEqual(page.terms.unindexable, ["city__iexact"])
+        self.assertEqual(page.terms.candidate("page"), ("price_amount",))
+        count = self.shape("results", {"beds": "2", "price_max": "50000"}, "count")
+        self.assertEqual(count.terms.candidate("count"), ("beds", "price_amount"))
+        ranked = self.shape("results", {}, "page")
+        self.assertEqual(ranked.terms.candidate("page"), ("rank_score", "created_at"))
+        self.assertTrue(advisor.covered(ranked.terms.candidate("page"), advisor.existing_indexes()))
+        self.assertFalse(advisor.covered(("price_amount",), advisor.existing_indexes()))
+
+    def test_candidates_are_tried_and_rolled_back(self):
+        """A missing index shows as a scan plus temp sort, and trying a candidate leaves the schema alone"""
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX property_created_idx")
+        shape = self.shape("dashboard", {}, "page")
+        plan, _ = advisor.measure([shape], repeat=1)[0]
+        self.assertEqual(plan.issues, f"full scan of {Property._meta.db_table}, temp sort")
+
+        before = advisor.existing_indexes()
+        candidate = advisor.Candidate(shape.terms.candidate("page"), "property_created_idx")
+        [(plan, _)] = advisor._with_indexes([candidate], [shape], "default", 1)
+        self.assertEqual(plan.issues, "-")
+        self.assertEqual(advisor.existing_indexes(), before)
+
+    def test_replays_access_log(self):
+        """advise_indexes --log replays the logged results and dashboard requests"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "access.jsonl")
+            with override_settings(ACCESS_LOG_PATH=path):
+                self.client.get(reverse("dashboard"), {"sort": "price_asc", "city": "Pasig"})
+                self.client.get(reverse("results"), {"beds": "2"})
+                self.client.get(reverse("home"))
+                access_log(path).flush()
+            self.assertEqual(
+                advisor.logged_params(path),
+                [("dashboard", {"sort": "price_asc", "city": "Pasig"}), ("results", {"beds": "2"})],
+            )
+            out = StringIO()
+            call_command("advise_indexes", log=path, database="default", repeat=1, stdout=out)
+        report = out.getvalue()
+        self.assertIn("4 query shapes on sqlite (2 requests from", report)
+        self.assertIn("dashboard page [city+sort] by price_amount", report)
+        self.assertIn("results count [beds]", report)
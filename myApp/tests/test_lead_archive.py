@@ -0,0 +1,83 @@
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.utils import timezone
+from myApp.archive import LeadArchive
+from myApp.leads import link_lead
+from myApp.models import Lead, LeadTombstone, LiveEvent, Property
+
+
+def at(year, month, day):
+    return timezone.make_aware(datetime(year, month, day, 12))
+
+
+class LeadArchiveTestCase(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive = LeadArchive(root=Path(tmp.name), chunk_size=2)
+        self.listing = Property.objects.create(slug="condo", title="Condo", price_amount=1, city="Makati")
+        self.leads = []
+        for i, created in enumerate([at(2025, 1, 5), at(2025, 1, 20), at(2025, 1, 31), at(2025, 3, 2), at(2026, 9, 1)]):
+            lead = Lead.objects.create(
+                name=f"Lead {i}", phone=str(i), buy_or_rent="buy" if i % 2 else "rent",
+                budget_max=None if i == 0 else 50_000 * i, interest_ids="condo", areas="BGC",
+            )
+            link_lead(lead)
+            Lead.objects.filter(pk=lead.pk).update(created_at=created)
+            self.leads.append(lead)
+
+    def test_archive_partitions_by_month(self):
+        """Old leads leave the table for one part per month; recent ones stay"""
+        result = self.archive.archive(before=at(2026, 1, 1))
+        self.assertEqual((result.months, result.archived, result.deleted), (2, 4, 4))
+        self.assertEqual(list(Lead.objects.values_list("name", flat=True)), ["Lead 4"])
+        manifest = self.archive.manifest()
+        self.assertEqual({month: entry["rows"] for month, entry in manifest["months"].items()}, {"2025-01": 3, "2025-03": 1})
+        self.assertTrue((self.archive.root / "month=2025-01" / "part-0001.parquet").exists())
+        # Archived leads keep counting towards the listing.
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.lead_count, 5)
+
+    def test_query_filters_and_projects(self):
+        """Queries prune parts by date and push filters down"""
+        self.archive.archive(before=at(2026, 1, 1))
+        self.assertEqual(self.archive.files(start=at(2025, 2, 1)), [self.archive.root / "month=2025-03" / "part-0001.parquet"])
+        frame = self.archive.read(start=at(2025, 1, 10), end=at(2025, 4, 1), columns=["name", "interests"])
+        self.assertEqual(sorted(frame["name"]), ["Lead 1", "Lead 2", "Lead 3"])
+        self.assertEqual(set(frame["interests"]), {str(self.listing.pk)})
+        self.assertEqual(self.archive.count(buy_or_rent="rent"), 2)
+        self.assertEqual(self.archive.count(name=["Lead 0", "Lead 3"]), 2)
+        first = self.archive.read(name="Lead 0")
+        self.assertTrue(first["budget_max"].isna().all())
+        self.assertEqual(first["preferred_areas"][0], "bgc")
+        with self.assertRaises(ValueError):
+            self.archive.count(secret="x")
+
+    def test_rerun_appends_and_skips_already_archived(self):
+        """A later run adds a new part; rows left over from an interrupted run are not duplicated"""
+        with mock.patch.object(QuerySet, "delete", return_value=(0, {})):
+            self.archive.archive(before=at(2025, 1, 25))
+        self.assertEqual(Lead.objects.count(), 5)
+
+        self.archive.archive(before=at(2026, 1, 1))
+        january = self.archive.manifest()["months"]["2025-01"]
+        self.assertEqual([part["rows"] for part in january["parts"]], [2, 1])
+        self.assertEqual(self.archive.count(), 4)
+        self.assertEqual(Lead.objects.count(), 1)
+
+    def test_archive_publishes_one_summary_event(self):
+        """Archived leads get tombstones but no per-lead live events, only one summary"""
+        LiveEvent.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.archive.archive(before=at(2026, 1, 1))
+        self.assertEqual(
+            [(row.event, json.loads(row.data)) for row in LiveEvent.objects.all()],
+            [("lead", {"op": "archived", "count": 4, "before": at(2026, 1, 1).isoformat()})],
+        )
+        self.assertEqual(LeadTombstone.objects.count(), 4)
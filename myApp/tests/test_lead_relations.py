@@ -0,0 +1,72 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.cache import property_cache
+from myApp.leads import parse_areas, parse_interests
+from myApp.management.commands.seed_props import Command
+from myApp.models import Area, Lead, Property
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects", RATELIMIT_POLICIES={})
+class LeadRelationsTestCase(TestCase):
+    def setUp(self):
+        property_cache.clear_local()
+        property_cache.shared.clear()
+        Command().handle()
+        self.first, self.second = Property.objects.order_by("slug")[:2]
+
+    def submit(self, **extra):
+        data = {"name": "Ana", "phone": "0917 000 0000", "buy_or_rent": "rent", **extra}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("lead_submit"), data)
+
+    def test_parsing(self):
+        """CSV tokens split into ids and slugs; areas dedupe by slug"""
+        ids, slugs = parse_interests(f"{self.first.pk}, {self.second.slug}/ ;")
+        self.assertEqual((ids, slugs), ({self.first.pk}, {self.second.slug}))
+        self.assertEqual(parse_areas("BGC, bgc ;  Salcedo   Village"), {"bgc": "BGC", "salcedo-village": "Salcedo Village"})
+
+    def test_submit_links_and_counts(self):
+        """lead_submit writes the join rows and bumps lead_count on each listing"""
+        self.submit(interest_ids=f"{self.first.slug},{self.second.pk},missing-slug", areas="BGC, Poblacion")
+        lead = Lead.objects.get()
+        self.assertCountEqual(lead.interests.all(), [self.first, self.second])
+        self.assertEqual(sorted(lead.preferred_areas.values_list("name", flat=True)), ["BGC", "Poblacion"])
+
+        self.submit(interest_ids=self.first.slug, areas="bgc")
+        self.assertEqual(Area.objects.count(), 2)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.lead_count, 2)
+        self.assertEqual(self.first.leads.count(), 2)
+
+    def test_counts_follow_edits_and_deletes(self):
+        """Removing an interest or deleting the lead decrements the counter"""
+        self.submit(interest_ids=f"{self.first.slug},{self.second.slug}")
+        lead = Lead.objects.get()
+        lead.interests.remove(self.second)
+        lead.delete()
+        counts = dict(Property.objects.filter(pk__in=[self.first.pk, self.second.pk]).values_list("slug", "lead_count"))
+        self.assertEqual(counts, {self.first.slug: 0, self.second.slug: 0})
+
+    def test_backfill(self):
+        """The backfill parses existing CSV columns, is re-runnable, and recounts"""
+        Lead.objects.create(name="A", phone="1", buy_or_rent="buy", interest_ids=f"{self.first.pk},{self.second.slug}")
+        Lead.objects.create(name="B", phone="2", buy_or_rent="buy", interest_ids=self.first.slug, areas="Makati")
+        Lead.objects.create(name="C", phone="3", buy_or_rent="buy")
+        for _ in range(2):
+            call_command("backfill_lead_relations", chunk_size=1, stdout=io.StringIO())
+        self.assertEqual(Lead.interests.through.objects.count(), 3)
+        self.assertEqual(Property.objects.get(pk=self.first.pk).lead_count, 2)
+        self.assertEqual(Area.objects.get().leads.get().name, "B")
+
+    def test_dashboard_shows_counts_without_extra_queries(self):
+        """The count is a column on the listing row, kept fresh in the property cache"""
+        self.submit(interest_ids=self.first.slug)
+        url = reverse("dashboard") + "?sort=price_asc&per=48"
+        self.client.get(url, HTTP_HX_REQUEST="true")
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_HX_REQUEST="true")
+        self.assertContains(response, '<span data-field="lead_count">1</span> lead<', count=1)
@@ -0,0 +1,91 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from myApp.leads import link_lead
+from myApp.management.commands.seed_props import Command
+from myApp.models import Lead, Property
+from myApp.scoring import LeadScorer, lead_scorer, score_leads, score_open_leads
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects", RATELIMIT_POLICIES={})
+class LeadScoringTestCase(TestCase):
+    def setUp(self):
+        Command().handle()
+        lead_scorer.reset()
+        self.addCleanup(lead_scorer.reset)
+
+    def lead(self, name, age_days=0, **fields):
+        lead = Lead.objects.create(name=name, phone="0917", buy_or_rent="rent", **fields)
+        link_lead(lead)
+        Lead.objects.filter(pk=lead.pk).update(created_at=timezone.now() - timedelta(days=age_days))
+        return lead
+
+    def scores(self):
+        return dict(Lead.objects.values_list("name", "score"))
+
+    def test_factors_order_leads(self):
+        """Affordable inventory, consent, converting sources and recency all raise the score"""
+        for i in range(10):
+            self.lead(f"won-{i}", age_days=30, utm_source="partner", converted=i < 8)
+        self.lead("fit", budget_max=1_000_000, areas="Makati")
+        self.lead("priced-out", budget_max=1, areas="Makati")
+        self.lead("consent", budget_max=1, areas="Makati", consent_contact=True)
+        self.lead("old", budget_max=1_000_000, areas="Makati", age_days=60)
+        self.lead("partner", budget_max=1, areas="Makati", utm_source="partner")
+        self.lead("nowhere", budget_max=1_000_000, areas="Atlantis")
+
+        result = score_open_leads(chunk_size=3)
+        self.assertEqual(result.scored, 8)
+        scores = self.scores()
+        self.assertGreater(scores["fit"], scores["priced-out"])
+        self.assertGreater(scores["fit"], scores["nowhere"])
+        self.assertGreater(scores["consent"], scores["priced-out"])
+        self.assertGreater(scores["partner"], scores["priced-out"])
+        self.assertGreater(scores["fit"], scores["old"])
+        self.assertEqual(scores["won-0"], 0)  # converted leads are left alone
+        self.assertTrue(all(0 <= score <= 100 for score in scores.values()))
+
+    def test_bulk_and_single_scoring_agree(self):
+        """The raw-cursor batch path and the ORM path give the same scores"""
+        lead = self.lead("a", budget_max=80_000, areas="BGC, Makati", consent_contact=True, age_days=2)
+        score_open_leads()
+        bulk = Lead.objects.get(pk=lead.pk).score
+        Lead.objects.update(score=0)
+        score_leads([lead.pk])
+        self.assertAlmostEqual(Lead.objects.get(pk=lead.pk).score, bulk, delta=0.1)
+        self.assertEqual(score_open_leads().updated, 0)
+
+    def test_scored_on_submit_and_listed_by_priority(self):
+        """lead_submit scores the new lead; the dashboard lists open leads by score"""
+        data = {"name": "Keen", "phone": "0917", "buy_or_rent": "rent", "budget_max": "900000",
+                "areas": "Makati", "consent_contact": "on"}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("lead_submit"), data)
+        self.lead("Cold", budget_max=1, age_days=90)
+        keen = Lead.objects.get(name="Keen")
+        self.assertGreater(keen.score, 50)
+
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual([lead.name for lead in response.context["priority_leads"]], ["Keen", "Cold"])
+
+    def test_inventory_counts_each_listing_once(self):
+        """A listing whose city and area name the same Area is counted once"""
+        lead = self.lead("x", areas="Makati")
+        scorer = LeadScorer.from_db()
+        code = scorer.codes([lead.preferred_areas.get().pk])[0]
+        makati = (scorer.area_keys >> 32) == code
+        self.assertEqual(int(makati.sum()), Property.objects.filter(city__iexact="Makati").count())
+
+    def test_submit_reuses_scorer(self):
+        """New areas and listing saves do not rebuild the scorer inside the request"""
+        score_leads([self.lead("first", areas="Makati").pk])
+        Property.objects.create(slug="new-listing", title="New", city="Makati", price_amount=10_000)
+        with mock.patch.object(LeadScorer, "from_db", side_effect=AssertionError("rebuilt")):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("lead_submit"), {"name": "Far", "phone": "0917", "buy_or_rent": "rent",
+                                                          "budget_max": "900000", "areas": "Atlantis"})
+        self.assertGreater(Lead.objects.get(name="Far").score, 0)
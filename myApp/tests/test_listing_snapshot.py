@@ -0,0 +1,105 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.paginator import Paginator
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.cache import property_cache
+from myApp.management.commands.seed_props import Command
+from myApp.models import Property
+from myApp.queries import (
+    dashboard_filters,
+    dashboard_listings,
+    dashboard_queryset,
+    results_filters,
+    results_listings,
+    results_queryset,
+)
+from myApp.snapshot import SnapshotSelection, listing_snapshot
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+class ListingSnapshotTestCase(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            CACHES=LOCMEM_CACHES,
+            PROPERTY_CACHE_ALIAS="objects",
+            LISTING_SNAPSHOT_ENABLED=True,
+            LISTING_SNAPSHOT_ROOT=Path(tmp.name),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        property_cache.clear_local()
+        property_cache.shared.clear()
+        listing_snapshot.reset()
+        self.addCleanup(listing_snapshot.reset)
+        Command().handle()
+
+    def test_results_match_orm(self):
+        """Snapshot answers the same rows, in the same order, as the ORM filters"""
+        for params in ({}, {"city": "Makati"}, {"beds": "2"}, {"price_max": "60000"}, {"city": "bgc", "beds": "1"}):
+            filters = results_filters(params)
+            selection = results_listings(filters)
+            self.assertIsInstance(selection, SnapshotSelection)
+            expected = list(results_queryset(filters))
+            self.assertEqual(selection.count(), len(expected), params)
+            self.assertEqual([p.pk for p in selection[0:len(expected)]], [p.pk for p in expected], params)
+
+    def test_dashboard_sorts_and_pages(self):
+        """Sorted pages line up with the ORM's order"""
+        sorts = (("price_asc", "price_amount"), ("price_desc", "price_amount"), ("beds_desc", "beds"), ("rank", "rank_score"))
+        for sort, field in sorts:
+            filters = dashboard_filters({"sort": sort, "per": "3"})
+            expected = [getattr(p, field) for p in dashboard_queryset(filters)]
+            pages = Paginator(dashboard_listings(filters), 3)
+            got = [getattr(p, field) for number in pages.page_range for p in pages.page(number)]
+            self.assertEqual(got, expected, sort)
+
+    def test_free_text_uses_orm(self):
+        """`q` is not in the snapshot, so those searches stay on the ORM"""
+        self.assertNotIsInstance(results_listings(results_filters({"q": "condo"})), SnapshotSelection)
+
+    def test_incremental_refresh(self):
+        """Committed creates, edits and deletes are spliced in off the request path"""
+        before = listing_snapshot.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            new = Property.objects.create(slug="fresh", title="Fresh", price_amount=1, city="Makati")
+            cheap = Property.objects.exclude(pk=new.pk).order_by("price_amount").last()
+            cheap.price_amount = 2
+            cheap.save()
+            gone = Property.objects.exclude(pk__in=[new.pk, cheap.pk]).first()
+            gone.delete()
+
+        with mock.patch("myApp.snapshot.threading.Thread") as thread:
+            self.assertEqual(listing_snapshot.get().path, before.path)
+            listing_snapshot.get()
+        thread.assert_called_once_with(
+            target=listing_snapshot._rebuild, args=(before,), name="listing-snapshot", daemon=True
+        )
+        after = listing_snapshot.refresh()
+        self.assertIs(listing_snapshot.get(), after)
+        self.assertNotEqual(after.path, before.path)
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(after.meta["cutoff"] > before.meta["cutoff"], True)
+        cheapest = after.select(price_max=2, sort="price_asc")
+        self.assertEqual([p.pk for p in cheapest[0:5]], [new.pk, cheap.pk])
+        self.assertNotIn(gone.pk, [p.pk for p in after.select()[0:100]])
+
+    def test_views_hydrate_only_the_page(self):
+        """A warm q-less request only loads the page's rows (and nothing when cached)"""
+        url = reverse("dashboard") + "?sort=price_asc&per=3"
+        self.client.get(url, HTTP_HX_REQUEST="true")
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_HX_REQUEST="true")
+        self.assertContains(response, "8 properties found")
+        with self.assertNumQueries(1):
+            self.client.get(reverse("results") + "?city=Makati&page=1&price_max=999999")
+
+    def test_disabled(self):
+        """With the setting off everything stays on the ORM"""
+        with self.settings(LISTING_SNAPSHOT_ENABLED=False):
+            self.assertIsNone(listing_snapshot.get())
+            self.assertNotIsInstance(dashboard_listings(dashboard_filters({})), SnapshotSelection)
@@ -0,0 +1,91 @@
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.live import last_id, publish, since, stream
+from myApp.management.commands.seed_props import Command
+from myApp.models import Lead, Property
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+def published(start):
+    _, chunk = since(start)
+    return chunk.decode()
+
+
+class EventBacklogTestCase(TestCase):
+    def test_backlog_and_resume(self):
+        """Readers get everything after their id, or None once it has left the backlog"""
+        with mock.patch("myApp.live.BACKLOG", 3), mock.patch("myApp.live.PRUNE_EVERY", 1):
+            ids = [publish("property", {"n": n}) for n in range(5)]
+        last, chunk = since(ids[2])
+        self.assertEqual(last, ids[4])
+        self.assertEqual(chunk.count(b"event: property"), 2)
+        self.assertIn(f'id: {ids[3]}\nevent: property\ndata: {{"n":3}}\n\n'.encode(), chunk)
+        self.assertEqual(since(ids[4]), (ids[4], b""))
+        self.assertIsNone(since(ids[1]))
+        self.assertIsNone(since(ids[4] + 1))
+
+    def test_stream_is_bounded(self):
+        """Streams poll until their deadline, ping when idle and tell readers with an unknown id to reload"""
+        start = publish("lead", {})
+        with mock.patch("myApp.live.POLL_SECONDS", 0.02), mock.patch("myApp.live.HEARTBEAT_SECONDS", 0.05):
+            started = time.monotonic()
+            chunks = list(stream(None, seconds=0.15))
+            self.assertLess(time.monotonic() - started, 0.3)
+        self.assertEqual(chunks[:2], [b"retry: 3000\n\n", f"id: {start}\n\n".encode()])
+        self.assertIn(b": ping\n\n", chunks)
+        self.assertEqual(list(stream(start + 1, seconds=0))[-1], b"event: reload\ndata: {}\n\n")
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects", RATELIMIT_POLICIES={})
+class LiveDashboardTestCase(TestCase):
+    def setUp(self):
+        Command().handle()
+
+    def test_model_changes_publish_diffs_on_commit(self):
+        """Saves, deletes and lead counts reach the backlog only once committed"""
+        start = last_id()
+        Property.objects.create(slug="loft", title="Loft", price_amount=5, city="Pasig")
+        self.assertEqual(last_id(), start)
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = Property.objects.create(slug="loft-2", title="Loft", price_amount=5, city="Pasig")
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.price_amount = 7
+            listing.save()
+        events = published(start)
+        self.assertIn(f'"op":"created","id":"{listing.pk}"', events)
+        self.assertIn('"op":"updated"', events)
+        self.assertIn('"price_amount":7', events)
+
+        start = last_id()
+        data = {"name": "Lia", "phone": "0917", "buy_or_rent": "rent", "interest_ids": str(listing.pk)}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("lead_submit"), data)
+        lead = Lead.objects.get(name="Lia")
+        events = published(start)
+        self.assertIn(f'event: lead\ndata: {{"op":"created","id":"{lead.pk}","name":"Lia"', events)
+        self.assertIn(f'{{"op":"leads","ids":["{listing.pk}"],"delta":1}}', events)
+        self.assertIn(f'{{"op":"scored","id":"{lead.pk}"', events)
+
+    @override_settings(LIVE_STREAM_SECONDS=0)
+    def test_event_stream_resumes_uncompressed(self):
+        """The stream replays from Last-Event-ID, returns at once under WSGI and is never compressed"""
+        start = last_id()
+        publish("property", {"op": "deleted", "id": "x"})
+        response = self.client.get(
+            reverse("dashboard_events"), headers={"Last-Event-ID": str(start), "Accept-Encoding": "gzip, br"}
+        )
+        body = b"".join(response.streaming_content)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn(f'id: {start + 1}\nevent: property\ndata: {{"op":"deleted","id":"x"}}'.encode(), body)
+
+    def test_dashboard_rows_are_addressable(self):
+        """Rows and the priority panel carry the ids the live script patches"""
+        response = self.client.get(reverse("dashboard"))
+        listing = response.context["properties"][0]
+        self.assertContains(response, f'data-property="{listing.id}"', count=2)
+        self.assertContains(response, 'id="priority-leads"')
+        self.assertContains(response, reverse("dashboard_events"))
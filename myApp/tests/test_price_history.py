@@ -0,0 +1,89 @@
+import io
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from myApp.alerts import search_matcher
+from myApp.cache import property_cache
+from myApp.models import PriceHistory, Property, SavedSearch, SearchAlert
+from myApp.prices import downsample, history, record_prices
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects")
+class PriceHistoryTestCase(TestCase):
+    def setUp(self):
+        property_cache.clear_local()
+        search_matcher.reset()
+        self.addCleanup(search_matcher.reset)
+        self.loft = Property.objects.create(slug="loft", title="Loft", price_amount=50_000, city="Makati")
+
+    def prices(self, listing=None):
+        return history((listing or self.loft).pk)[1].tolist()
+
+    def test_saves_record_changes(self):
+        """Creation and each price change append a point; other saves do not"""
+        self.loft.title = "Big Loft"
+        self.loft.save()
+        self.loft.price_amount = 45_000
+        self.loft.save()
+        self.loft.price_amount = 47_000
+        self.loft.save(update_fields=["price_amount", "previous_price", "price_changed_at"])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.prices(), [50_000, 45_000, 47_000])
+        self.loft.refresh_from_db()
+        self.assertEqual(self.loft.previous_price, 45_000)
+        self.assertIsNotNone(self.loft.price_changed_at)
+        row = PriceHistory.objects.get()
+        self.assertEqual((row.count, len(row.times), len(row.prices)), (3, 12, 12))
+
+    def test_months_and_backfill(self):
+        """Points split into monthly rows; late history is merged in order"""
+        pk = self.loft.pk
+        PriceHistory.objects.all().delete()
+        record_prices([(pk, utc(2026, 1, 5), 100), (pk, utc(2026, 2, 1, 0, 0, 1), 90), (pk, utc(2026, 1, 20), 95)])
+        record_prices([(pk, utc(2026, 1, 10), 97), (pk, utc(2026, 1, 25), 95)])  # 95 repeats the price then
+        self.assertEqual(list(PriceHistory.objects.order_by("month").values_list("count", flat=True)), [3, 1])
+        seconds, prices = history(pk)
+        self.assertEqual(prices.tolist(), [100, 97, 95, 90])
+        self.assertEqual(seconds[1], int(utc(2026, 1, 10).timestamp()))
+
+        points = downsample(seconds, prices, utc(2026, 1, 1), utc(2026, 2, 28), points=5)
+        # Edges fall on Jan 1 (nothing yet), Jan 15, Jan 30, Feb 13 and Feb 28.
+        self.assertEqual([price for _, price in points], [97, 95, 90, 90])
+
+    def test_import_reprices_and_backfills(self):
+        """A feed reprices listings with newer rows, back-fills older ones and skips unknown slugs"""
+        property_cache.get_by_slug("loft")
+        long_ago = (timezone.now() - timedelta(days=400)).isoformat()
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as feed:
+            feed.write(f"slug,price,observed_at\nloft,40000,\nloft,60000,{long_ago}\nghost,1,\n")
+            feed.flush()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("import_prices", feed.name, stdout=io.StringIO())
+        self.assertEqual(property_cache.get_by_slug("loft").price_amount, 40_000)
+        self.assertEqual(property_cache.get_by_slug("loft").previous_price, 50_000)
+        self.assertEqual(self.prices(), [60_000, 50_000, 40_000])
+
+    def test_drop_shows_and_alerts(self):
+        """A drop lists on home, charts on the detail page and alerts newly matching searches"""
+        with self.captureOnCommitCallbacks(execute=True):
+            search = SavedSearch.objects.create(email="a@test.com", city="Makati", price_max=45_000)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.loft.price_amount = 42_000
+            self.loft.save()
+        self.assertTrue(SearchAlert.objects.filter(saved_search=search, property=self.loft).exists())
+
+        response = self.client.get(reverse("home"))
+        self.assertEqual(list(response.context["price_drops"]), [self.loft])
+        self.assertContains(response, "Recent Price Drops")
+        response = self.client.get(reverse("property_detail", args=["loft"]))
+        self.assertContains(response, "line-through")
+        self.assertContains(response, "<svg")
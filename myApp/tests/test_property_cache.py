@@ -0,0 +1,72 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.cache import PropertyCache, property_cache
+from myApp.models import Property
+
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "default"},
+    "objects": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "objects"},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects")
+class PropertyCacheTestCase(TestCase):
+    def setUp(self):
+        property_cache.clear_local()
+        property_cache.shared.clear()
+        self.prop = Property.objects.create(
+            slug='cached-property',
+            title='Cached Property',
+            price_amount=50000,
+            city='Makati',
+        )
+
+    def test_repeated_lookups_hit_db_once(self):
+        """Chat messages after the first should not query the Property table"""
+        url = reverse('property_chat', args=[self.prop.slug])
+        self.client.post(url, {'message': 'price?'})
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                response = self.client.post(url, {'message': 'price?'})
+                self.assertEqual(response.status_code, 200)
+
+    def test_save_invalidates(self):
+        """Saving a property makes the next lookup see the new row"""
+        self.assertEqual(property_cache.get_by_slug(self.prop.slug).price_amount, 50000)
+        self.prop.price_amount = 42000
+        self.prop.save()
+        self.assertEqual(property_cache.get_by_slug(self.prop.slug).price_amount, 42000)
+
+    def test_delete_invalidates(self):
+        """Deleted properties are no longer served from the cache"""
+        property_cache.get_by_slug(self.prop.slug)
+        self.prop.delete()
+        self.assertIsNone(property_cache.get_by_slug('cached-property'))
+        response = self.client.get(reverse('property_detail', args=['cached-property']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_other_worker_sees_invalidation(self):
+        """A second process-local tier drops its copy when the version is bumped"""
+        other_worker = PropertyCache()
+        self.assertEqual(other_worker.get_by_id(self.prop.pk).title, 'Cached Property')
+        Property.objects.filter(pk=self.prop.pk).update(title='Renamed')
+        property_cache.invalidate(self.prop.pk, self.prop.slug)
+        self.assertEqual(other_worker.get_by_id(self.prop.pk).title, 'Renamed')
+
+    def test_lru_eviction_counter(self):
+        """The local tier evicts least recently used entries"""
+        small = PropertyCache(max_entries=1)
+        second = Property.objects.create(slug='second', title='Second', price_amount=1, city='Pasig')
+        small.get_by_id(self.prop.pk)
+        small.get_by_id(second.pk)
+        stats = small.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['local_size'], 1)
+
+    def test_lost_version_never_serves_old_object(self):
+        """A culled version key comes back as a new token, not the one the old object was stored under"""
+        property_cache.get_by_id(self.prop.pk)
+        Property.objects.filter(pk=self.prop.pk).update(title='Renamed')
+        property_cache.shared.delete(property_cache._version_key(str(self.prop.pk)))
+        self.assertEqual(PropertyCache().get_by_id(self.prop.pk).title, 'Renamed')
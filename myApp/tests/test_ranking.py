@@ -0,0 +1,75 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from myApp.cache import property_cache
+from myApp.models import Lead, Property
+from myApp.queries import results_filters, results_queryset
+from myApp.ranking import ListingRanker, listing_ranker
+
+
+class RankingTestCase(TestCase):
+    def setUp(self):
+        listing_ranker.reset()
+        self.addCleanup(listing_ranker.reset)
+        for i, price in enumerate((40_000, 50_000, 60_000)):
+            Property.objects.create(slug=f"makati-{i}", title=f"Makati {i}", city="Makati", price_amount=price)
+        listing_ranker.reset()  # medians now see the three listings above
+
+    def listing(self, slug, **fields):
+        defaults = dict(title=slug.title(), city="Makati", price_amount=50_000)
+        return Property.objects.create(slug=slug, **{**defaults, **fields})
+
+    def test_factors_order_listings(self):
+        """Commission, badges, completeness, a typical price and interest each raise the rank"""
+        best = self.listing(
+            "best", badges="Verified, Luxury, Pool", hero_image="https://example.com/a.jpg", floor_area_sqm=80,
+        )
+        bare = self.listing("bare", commissionable=False, price_amount=200_000)
+        self.assertEqual(best.rank_score, 15 + 20 + 20 + 25)
+        self.assertEqual(bare.rank_score, 0)
+        self.assertEqual(self.listing("far-away", city="Cebu").rank_score, 15 + 12.5)
+
+        Lead.objects.create(name="A", phone="1", buy_or_rent="rent", interest_ids="").interests.add(bare)
+        bare.refresh_from_db()
+        self.assertGreater(bare.rank_score, 0)
+
+    def test_best_first_pages(self):
+        """home and the default /list order follow the rank, ties newest first"""
+        top = self.listing("top", badges="Verified, Pool", hero_image="https://example.com/a.jpg")
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["top_picks"][0], top)
+        ranked = list(results_queryset(results_filters({})))
+        self.assertEqual(ranked[0], top)
+        self.assertEqual([p.rank_score for p in ranked], sorted((p.rank_score for p in ranked), reverse=True))
+
+    def test_batch_rerank(self):
+        """rank_properties writes back only the scores that moved"""
+        # The first listings were ranked before their city had a median.
+        call_command("rank_properties", stdout=io.StringIO())
+        before = Property.objects.get(slug="makati-0").rank_score
+        Property.objects.filter(slug="makati-0").update(rank_score=99)
+        out = io.StringIO()
+        call_command("rank_properties", stdout=out)
+        self.assertIn("Ranked 3 listing(s), updated 1", out.getvalue())
+        self.assertEqual(Property.objects.get(slug="makati-0").rank_score, before)
+
+    def test_rank_changes_leave_updated_at(self):
+        """Re-ranks stamp ranked_at, keep updated_at and drop the cached object"""
+        listing = self.listing("quiet")
+        cached = property_cache.get_by_id(listing.pk)
+        Lead.objects.create(name="A", phone="1", buy_or_rent="rent", interest_ids="").interests.add(listing)
+        fresh = Property.objects.get(pk=listing.pk)
+        self.assertEqual(fresh.updated_at, listing.updated_at)
+        self.assertIsNotNone(fresh.ranked_at)
+        self.assertGreater(fresh.rank_score, cached.rank_score)
+        self.assertEqual(property_cache.get_by_id(listing.pk).rank_score, fresh.rank_score)
+
+    def test_saves_reuse_published_medians(self):
+        """pre_save scores with the medians rank_properties published, without rescanning listings"""
+        call_command("rank_properties", stdout=io.StringIO())
+        listing_ranker._rankers.clear()
+        with mock.patch.object(ListingRanker, "from_db", side_effect=AssertionError("scanned listings")):
+            self.assertEqual(self.listing("typical").rank_score, 15 + 25)
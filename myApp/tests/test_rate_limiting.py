@@ -0,0 +1,117 @@
+import os
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.models import Lead, Property
+from myApp.ratelimit import HEADER, MAX_WORKERS, WORKER, Limit, SharedState, shared_state
+
+
+POLICIES = {
+    "property_chat": [
+        {"scope": "ip", "rate": "60/m", "burst": 3},
+        {"scope": "slug", "rate": "60/m", "burst": 5},
+    ],
+    "lead_submit": [{"scope": "ip", "rate": "1/h", "burst": 2}],
+}
+NO_SHEDDING = {"max_busy_workers": None, "max_db_latency_ms": None}
+
+
+class RateLimitTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = str(Path(self.tmp.name) / "ratelimit.bin")
+        settings_override = override_settings(
+            RATELIMIT_STATE_PATH=self.path, RATELIMIT_POLICIES=POLICIES, RATELIMIT_SHED=NO_SHEDDING
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.prop = Property.objects.create(slug='limited', title='Limited', price_amount=1000, city='Makati')
+        self.url = reverse('property_chat', args=[self.prop.slug])
+
+    def chat(self, ip='10.0.0.1'):
+        return self.client.post(self.url, {'message': 'price?'}, REMOTE_ADDR=ip)
+
+    def test_limit_parsing(self):
+        """Rates are tokens per unit; burst defaults to the count"""
+        limit = Limit.from_config({"rate": "30/m"})
+        self.assertEqual((limit.scope, limit.rate, limit.burst), ("ip", 0.5, 30.0))
+
+    def test_bucket_refills(self):
+        """An empty bucket reports the wait until its next token"""
+        state = SharedState(self.path, slots=64)
+        limit = Limit(scope="ip", rate=2.0, burst=2)
+        self.assertEqual(state.take("k", limit, now=100.0), 0)
+        self.assertEqual(state.take("k", limit, now=100.0), 0)
+        self.assertAlmostEqual(state.take("k", limit, now=100.0), 0.5)
+        self.assertEqual(state.take("k", limit, now=100.5), 0)
+
+    def test_per_ip_limit_returns_plain_429(self):
+        """The fourth burst message from one IP is rejected without rendering a template"""
+        for _ in range(3):
+            self.assertEqual(self.chat().status_code, 200)
+        with self.assertTemplateNotUsed('partials/chat_bubble.html'):
+            response = self.chat()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # Another client is unaffected.
+        self.assertEqual(self.chat(ip='10.0.0.2').status_code, 200)
+
+    def test_per_slug_limit(self):
+        """Many IPs hammering one listing share that listing's bucket"""
+        statuses = [self.chat(ip=f'10.0.1.{i}').status_code for i in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+
+    def test_lead_submit_limited(self):
+        """Rejected lead posts never reach the database"""
+        data = {'name': 'A', 'email': 'a@example.com'}
+        for _ in range(2):
+            self.client.post(reverse('lead_submit'), data)
+        response = self.client.post(reverse('lead_submit'), data)
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(Lead.objects.count(), 2)
+
+    def test_sheds_on_db_latency(self):
+        """Slow queries flip throttled endpoints to 503 while other pages still serve"""
+        for _ in range(8):
+            shared_state(self.path).observe_latency(5000)
+        with override_settings(RATELIMIT_SHED={"max_busy_workers": None, "max_db_latency_ms": 250}):
+            response = self.chat()
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response)
+            self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+
+    def test_one_slow_request_does_not_shed(self):
+        """A lone slow sample, or slow unthrottled pages, never shed lead capture"""
+        state = shared_state(self.path)
+        state.observe_latency(5000)
+        latency, samples = state.db_latency()
+        self.assertEqual(latency, 5000)
+        self.assertAlmostEqual(samples, 1.0, places=3)
+        with override_settings(RATELIMIT_SHED={"max_busy_workers": None, "max_db_latency_ms": 250}):
+            self.assertEqual(self.chat().status_code, 200)
+            for _ in range(10):
+                self.client.get(reverse('dashboard'))
+            _, samples = state.db_latency()
+            self.assertLess(samples, 3)
+            self.assertEqual(self.chat().status_code, 200)
+
+    def test_sheds_on_busy_workers(self):
+        """Requests are shed while more than max_busy_workers workers are mid-request"""
+        state = shared_state(self.path)
+        with override_settings(RATELIMIT_SHED={"max_busy_workers": 1, "max_db_latency_ms": None}):
+            self.assertEqual(self.chat().status_code, 200)
+            # Pretend the parent process is another worker stuck in a request.
+            WORKER.pack_into(state._map, HEADER.size + (MAX_WORKERS - 1) * WORKER.size, os.getppid(), 1)
+            self.assertEqual(self.chat().status_code, 503)
+            self.assertEqual(state.stats()['shed'], 1)
+
+    def test_counters_in_health_check(self):
+        """Admitted/rejected/shed counters are exposed on the health check"""
+        for _ in range(4):
+            self.chat()
+        stats = self.client.get(reverse('health_check')).json()['ratelimit']
+        self.assertEqual((stats['admitted'], stats['rejected'], stats['shed']), (3, 1, 0))
@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp.alerts import SearchMatcher, enqueue_matches, search_matcher, send_digests
+from myApp.models import Property, SavedSearch, SearchAlert
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects")
+class SavedSearchTestCase(TestCase):
+    def setUp(self):
+        search_matcher.reset()
+        self.addCleanup(search_matcher.reset)
+        self.makati = SavedSearch.objects.create(email='a@test.com', city='Makati', price_max=100000)
+        self.bgc_2br = SavedSearch.objects.create(email='b@test.com', city='BGC', beds=2)
+        self.gym = SavedSearch.objects.create(email='a@test.com', q='gym')
+        self.cheap = SavedSearch.objects.create(email='c@test.com', price_max=10000)
+
+    def listing(self, **kwargs):
+        data = dict(slug='listing', title='Listing', price_amount=80000, city='Makati', beds=1)
+        data.update(kwargs)
+        return Property(**data)
+
+    def matched(self, prop):
+        return set(SearchMatcher.from_db().match(prop))
+
+    def test_city_and_price_interval(self):
+        """City equality and price_max bound select the right searches"""
+        self.assertEqual(self.matched(self.listing()), {self.makati.pk})
+        self.assertEqual(self.matched(self.listing(price_amount=150000)), set())
+
+    def test_area_and_beds(self):
+        """A search city found in the listing area matches, subject to min beds"""
+        self.assertEqual(self.matched(self.listing(city='Taguig', area='BGC', beds=1)), set())
+        self.assertEqual(self.matched(self.listing(city='Taguig', area='BGC', beds=3)), {self.bgc_2br.pk})
+
+    def test_free_text_query(self):
+        """q matches the same fields as the results view"""
+        prop = self.listing(city='Pasig', badges='Pool, Gym')
+        self.assertEqual(self.matched(prop), {self.gym.pk})
+
+    def test_query_does_not_span_fields(self):
+        """q must fit inside one field, as with the results view's per-field icontains"""
+        loft = SavedSearch.objects.create(email='d@test.com', q='loft nice')
+        prop = self.listing(city='Pasig', title='Cozy loft', description='nice view')
+        self.assertNotIn(loft.pk, self.matched(prop))
+        self.assertIn(loft.pk, self.matched(self.listing(city='Pasig', title='Cozy loft nice view')))
+
+    def test_outbox_and_digest(self):
+        """Matches are queued once and sent as one digest per recipient"""
+        prop = Property.objects.create(slug='gym-condo', title='Gym Condo', price_amount=90000, city='Makati', beds=1)
+        self.assertEqual(enqueue_matches([prop]), 2)
+        enqueue_matches([prop])
+        self.assertEqual(SearchAlert.objects.count(), 2)
+
+        call_command('send_search_digests', stdout=open('/dev/null', 'w'))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@test.com'])
+        self.assertIn('Gym Condo', mail.outbox[0].body)
+        self.assertFalse(SearchAlert.objects.filter(sent_at__isnull=True).exists())
+
+    def test_save_search_endpoint(self):
+        """The results page saves its filters via HTMX"""
+        response = self.client.post(
+            reverse('save_search'),
+            {'email': 'd@test.com', 'city': 'Pasig', 'beds': '2', 'price_max': ''},
+            HTTP_HX_REQUEST='true',
+        )
+        self.assertEqual(response.status_code, 200)
+        saved = SavedSearch.objects.get(email='d@test.com')
+        self.assertEqual((saved.city, saved.beds, saved.price_max), ('Pasig', 2, None))
+
+    def test_filter_swap_refreshes_save_form(self):
+        """An HTMX filter change swaps the save-search forms out of band with the new filters"""
+        response = self.client.get(reverse('results'), {'city': 'Pasig', 'beds': '2'}, HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'hx-swap-oob', count=2)
+        self.assertContains(response, '<input type="hidden" name="city" value="Pasig">', count=2)
+        page = self.client.get(reverse('results'), {'city': 'Pasig'})
+        self.assertNotContains(page, 'hx-swap-oob')
+
+    def test_terms_found_by_trigram(self):
+        """Keywords and area cities are looked up by trigram, substrings of words included"""
+        rows = [(i, f"term{i}", "", None, None) for i in range(1000)]
+        rows += [("gym", "gym", "", None, None), ("bgc", "", "BGC", None, None), ("x", "", "", None, None)]
+        matcher = SearchMatcher(rows)
+        prop = self.listing(city='Taguig', area='BGC North', description='Gymnasium, term42 access')
+        self.assertEqual(set(matcher.match(prop)), {4, 42, "gym", "bgc", "x"})
+
+    def test_local_changes_apply_in_place(self):
+        """Saves and deactivations in this process update the matcher without reloading it"""
+        prop = self.listing(city='Pasig', price_amount=5000)
+        self.assertEqual(set(search_matcher.get().match(prop)), {self.cheap.pk})
+        with mock.patch.object(SearchMatcher, 'from_db', side_effect=AssertionError('reloaded')):
+            with self.captureOnCommitCallbacks(execute=True):
+                pasig = SavedSearch.objects.create(email='e@test.com', city='Pasig')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.cheap.active = False
+                self.cheap.save()
+            self.assertEqual(set(search_matcher.get().match(prop)), {pasig.pk})
+
+    def test_digest_reports_true_total(self):
+        """A digest lists max_per_digest listings, counts them all, and skips inactive searches"""
+        for i in range(3):
+            prop = Property.objects.create(slug=f'gym-{i}', title=f'Gym {i}', price_amount=500000, city='Cebu', badges='Gym')
+            SearchAlert.objects.create(saved_search=self.gym, property=prop)
+        SearchAlert.objects.create(saved_search=self.cheap, property=prop)
+        SavedSearch.objects.filter(pk=self.cheap.pk).update(active=False)
+        self.assertEqual(send_digests(max_per_digest=2), (1, 3))
+        body = mail.outbox[0].body
+        self.assertTrue(body.startswith('3 new listing(s)'))
+        self.assertIn('...and 1 more', body)
+        self.assertFalse(SearchAlert.objects.filter(saved_search=self.cheap).exists())
@@ -0,0 +1,67 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from myApp import shortlist
+from myApp.cache import property_cache
+from myApp.models import Property
+from myApp.tests.test_property_cache import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROPERTY_CACHE_ALIAS="objects")
+class ShortlistCompareTestCase(TestCase):
+    def setUp(self):
+        property_cache.clear_local()
+        property_cache.shared.clear()
+        self.listings = [
+            Property.objects.create(
+                slug=f"unit-{i}", title=f"Unit {i}", city="Makati", price_amount=30_000 + 10_000 * i,
+                beds=1 + i % 3, floor_area_sqm=40 + 10 * i,
+            )
+            for i in range(10)
+        ]
+
+    def test_load_is_one_query_whatever_the_count(self):
+        """Cold listings load with one query by id or slug, warm ones with none"""
+        ids = [str(p.pk) for p in self.listings]
+        with self.assertNumQueries(1):
+            loaded = shortlist.load(ids, [])
+        self.assertEqual([p.slug for p in loaded], [p.slug for p in self.listings])
+
+        property_cache.clear_local()
+        with self.assertNumQueries(0):
+            shortlist.load(ids[:3], ["unit-5", "unit-0"])
+        property_cache.shared.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(property_cache.get_many_by_slug(["unit-1", "unit-2", "ghost"])), 2)
+
+    def test_highlights(self):
+        """Each row flags its best and worst values; ties and blanks are not flagged"""
+        cheap, dear = self.listings[0], self.listings[2]
+        dear.floor_area_sqm = 0
+        rows = {row.label: row.cells for row in shortlist.comparison([cheap, self.listings[1], dear])}
+        self.assertEqual([c.best for c in rows["Price"]], [True, False, False])
+        self.assertEqual([c.worst for c in rows["Price"]], [False, False, True])
+        self.assertEqual([c.best for c in rows["Floor area"]], [False, True, False])
+        self.assertEqual(rows["Floor area"][2].display, "—")
+        self.assertFalse(any(c.best or c.worst for c in rows["Parking"]))
+
+    def test_compare_by_query(self):
+        """?p= takes ids and slugs, skips junk and renders one column per listing"""
+        response = self.client.get(reverse("compare"), {"p": [f"unit-1,{self.listings[3].pk}", "bad slug!"]})
+        self.assertEqual([p.slug for p in response.context["listings"]], ["unit-3", "unit-1"])
+        # Bathrooms, parking and enquiries tie, so only four rows have a best value.
+        self.assertContains(response, "data-best", count=4)
+        self.assertContains(response, "Unit 3")
+
+    def test_session_shortlist(self):
+        """Shortlist updates persist in the session and drive the default comparison"""
+        url = reverse("shortlist_update")
+        ids = [str(p.pk) for p in self.listings[:3]]
+        response = self.client.post(url, {"action": "add", "id": [",".join(ids), "not-an-id"]})
+        self.assertEqual(response.json(), {"ids": ids, "count": 3})
+        self.client.post(url, {"action": "remove", "id": ids[1]})
+        response = self.client.get(reverse("compare"))
+        self.assertEqual([p.slug for p in response.context["listings"]], ["unit-0", "unit-2"])
+
+        response = self.client.post(url, {"action": "clear"}, HTTP_HX_REQUEST="true")
+        self.assertContains(response, "Nothing to compare yet")
+        self.assertEqual(self.client.post(url, {"action": "nope"}).status_code, 400)
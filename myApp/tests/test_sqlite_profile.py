@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+from django.db import OperationalError, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TransactionTestCase
+from myApp.db import retry_on_busy, sqlite_options
+
+
+class SQLiteProfileTestCase(SimpleTestCase):
+    def test_pragmas_apply_on_connect(self):
+        """Every new connection gets WAL, NORMAL sync, the busy timeout and BEGIN IMMEDIATE"""
+        with tempfile.TemporaryDirectory() as tmp:
+            probe = {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": os.path.join(tmp, "probe.sqlite3"),
+                "OPTIONS": sqlite_options(busy_timeout_ms=1234),
+            }
+            wrapper = DatabaseWrapper(connections.configure_settings({"default": probe})["default"], alias="probe")
+            try:
+                with wrapper.cursor() as cursor:
+                    found = {}
+                    for pragma in ("journal_mode", "synchronous", "busy_timeout", "temp_store"):
+                        cursor.execute(f"PRAGMA {pragma}")
+                        found[pragma] = cursor.fetchone()[0]
+                self.assertEqual(found, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 1234, "temp_store": 2})
+                self.assertEqual(wrapper.transaction_mode, "IMMEDIATE")
+            finally:
+                wrapper.close()
+
+
+class RetryOnBusyTestCase(TransactionTestCase):
+    def test_retries_busy_until_success(self):
+        """Busy errors re-run the whole transaction; other errors do not"""
+        calls = []
+
+        @retry_on_busy(delay=0)
+        def flaky():
+            calls.append(True)
+            if len(calls) < 3:
+                raise OperationalError("database is locked")
+            return "ok"
+
+        self.assertEqual(flaky(), "ok")
+        self.assertEqual(len(calls), 3)
+
+        @retry_on_busy(delay=0)
+        def broken():
+            calls.append(True)
+            raise OperationalError("no such table: nope")
+
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(len(calls), 4)
+
+    def test_no_retry_after_commit_or_inside_atomic(self):
+        """A committed transaction is never repeated, and nested calls are left to the outer one"""
+        calls = []
+
+        def fail_after_commit():
+            raise OperationalError("database is locked")
+
+        @retry_on_busy(delay=0)
+        def committed():
+            calls.append(True)
+            transaction.on_commit(fail_after_commit)
+
+        with self.assertRaises(OperationalError):
+            committed()
+        self.assertEqual(len(calls), 1)
+
+        @retry_on_busy(delay=0)
+        def nested():
+            calls.append(True)
+            raise OperationalError("database is locked")
+
+        with self.assertRaises(OperationalError), transaction.atomic():
+            nested()
+        self.assertEqual(len(calls), 2)
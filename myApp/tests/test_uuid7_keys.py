@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from io import StringIO
+import uuid
+
+from django.core.management import call_command
+from django.test import TestCase
+from myApp.ids import uuid7, uuid7_from_datetime, uuid7_timestamp
+from myApp.models import Property, Lead
+
+
+class UUID7KeysTestCase(TestCase):
+    def test_uuid7_layout(self):
+        """Generated ids carry version 7 and the RFC variant"""
+        value = uuid7()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+
+    def test_uuid7_monotonic(self):
+        """Ids generated in a burst sort in creation order"""
+        ids = [uuid7() for _ in range(5000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_uuid7_from_datetime(self):
+        """Re-keyed ids encode the original timestamp"""
+        when = datetime(2025, 10, 7, 12, 47, tzinfo=timezone.utc)
+        self.assertAlmostEqual(uuid7_timestamp(uuid7_from_datetime(when)), when.timestamp(), places=3)
+
+    def test_new_rows_use_uuid7(self):
+        """Property and Lead default to time-ordered keys"""
+        prop = Property.objects.create(slug='v7', title='V7', price_amount=1, city='Makati')
+        lead = Lead.objects.create(name='Ana', phone='0917', buy_or_rent='rent')
+        self.assertEqual(prop.pk.version, 7)
+        self.assertEqual(lead.pk.version, 7)
+
+    def test_rekey_command(self):
+        """Legacy uuid4 rows are re-keyed and interest_ids follow"""
+        old = uuid.uuid4()
+        Property.objects.create(id=old, slug='legacy', title='Legacy', price_amount=1, city='Makati')
+        lead = Lead.objects.create(id=uuid.uuid4(), name='Ben', phone='0918', buy_or_rent='buy', interest_ids=str(old))
+
+        call_command('rekey_uuid7', stdout=StringIO())
+
+        prop = Property.objects.get(slug='legacy')
+        self.assertEqual(prop.pk.version, 7)
+        self.assertEqual(Lead.objects.get().pk.version, 7)
+        self.assertEqual(Lead.objects.get(name=lead.name).interest_ids, str(prop.pk))
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 urlpatterns = [
@@ -7,10 +7,20 @@ urlpatterns = [
     path("list", views.results, name="results"),
     path("property/<slug:slug>/", views.property_detail, name="property_detail"),
     path("property/<slug:slug>/chat", views.property_chat, name="property_chat"),
+    path("compare", views.compare, name="compare"),
+    path("shortlist", views.shortlist_update, name="shortlist_update"),
     path("lead/submit", views.lead_submit, name="lead_submit"),
+    path("searches/save", views.save_search, name="save_search"),
     path("book", views.book, name="book"),
+    path("book/reserve", views.book_reserve, name="book_reserve"),
     path("thanks", views.thanks, name="thanks"),
     path("dashboard", views.dashboard, name="dashboard"),
+    path("dashboard/events", views.dashboard_events, name="dashboard_events"),
+    path("suggest", views.suggest, name="suggest"),
+    path("sitemap.xml", views.feed, {"name": "sitemap.xml"}, name="sitemap"),
+    path("feeds/<str:name>", views.feed, name="feed_file"),
+    path("api/properties/", api.PropertyFeedView.as_view(), name="api_properties"),
+    path("api/leads/", api.LeadFeedView.as_view(), name="api_leads"),
     path("health/", views.health_check, name="health_check"),
 ]
 
@@ -1,45 +1,137 @@
 from __future__ import annotations
 
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.views.decorators.http import require_POST
-from django.db import connection
+from django.db import connection, transaction
+from django.utils import timezone
 
+from .autocomplete import suggestion_index
+from .bookings import SlotUnavailable, availability, reserve
+from .cache import get_property_or_404, property_cache
+from .db import retry_on_busy
+from .feeds import CONTENT_TYPES, feed_file
+from .leads import link_lead
+from .live import stream
 from .models import Property, Lead
-from .forms import LeadForm
+from .prices import price_chart, recent_price_drops
+from .forms import BookingForm, LeadForm, SavedSearchForm
+from .ratelimit import shared_state
+from . import shortlist
+from .scoring import score_leads
+from .queries import RANKED, dashboard_cities, dashboard_filters, dashboard_listings, results_filters, results_listings
+
+RESULTS_PER_PAGE = 12
+PRIORITY_LEADS = 5
 
 
 def home(request: HttpRequest) -> HttpResponse:
-    top_picks = Property.objects.all()[:6]
-    return render(request, "home.html", {"top_picks": top_picks})
+    top_picks = Property.objects.order_by(*RANKED)[:6]
+    return render(request, "home.html", {"top_picks": top_picks, "price_drops": recent_price_drops()})
+
+
+def _is_fragment_request(request: HttpRequest) -> bool:
+    """HTMX swaps only need the listings fragment; history restores need the full page."""
+    return (
+        request.headers.get("HX-Request") == "true"
+        and request.headers.get("HX-History-Restore-Request") != "true"
+    )
 
 
 def results(request: HttpRequest) -> HttpResponse:
-    qs = Property.objects.all()
-    q = request.GET.get("q", "").strip()
-    city = request.GET.get("city", "").strip()
-    beds = request.GET.get("beds", "").strip()
-    price_max = request.GET.get("price_max", "").strip()
+    filters = results_filters(request.GET)
+    qs = results_listings(filters)
 
-    if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q) | Q(badges__icontains=q) | Q(city__icontains=q))
-    if city:
-        qs = qs.filter(Q(city__iexact=city) | Q(area__icontains=city))
-    if beds and beds.isdigit():
-        qs = qs.filter(beds__gte=int(beds))
-    if price_max and price_max.isdigit():
-        qs = qs.filter(price_amount__lte=int(price_max))
+    paginator = Paginator(qs, RESULTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get("page", 1))
+    context = {
+        "properties": page_obj,
+        "count": paginator.count,
+        "current_filters": filters,
+    }
 
-    return render(request, "results.html", {"properties": qs, "count": qs.count()})
+    if _is_fragment_request(request):
+        response = render(request, "partials/results_listings.html", {**context, "save_search_oob": True})
+    else:
+        response = render(request, "results.html", context)
+    patch_vary_headers(response, ("HX-Request",))
+    return response
 
 
 def property_detail(request: HttpRequest, slug: str) -> HttpResponse:
-    prop = get_object_or_404(Property, slug=slug)
-    return render(request, "property_detail.html", {"property": prop})
+    prop = get_property_or_404(slug)
+    return render(request, "property_detail.html", {"property": prop, "price_points": price_chart(prop)})
+
+
+def compare(request: HttpRequest) -> HttpResponse:
+    """Side-by-side comparison of ``?p=`` ids or slugs, else of the session shortlist"""
+    requested = request.GET.getlist("p")
+    if requested:
+        ids, slugs = shortlist.parse(requested)
+    else:
+        ids, slugs = shortlist.get(request.session), []
+    listings = shortlist.load(ids, slugs)
+    context = {
+        "listings": listings,
+        "rows": shortlist.comparison(listings),
+        "from_shortlist": not requested,
+        "max_items": shortlist.MAX_ITEMS,
+    }
+    template = "partials/compare_table.html" if _is_fragment_request(request) else "compare.html"
+    response = render(request, template, context)
+    patch_vary_headers(response, ("HX-Request",))
+    return response
+
+
+@require_POST
+def shortlist_update(request: HttpRequest) -> HttpResponse:
+    """Add, remove or clear session shortlist ids; HTMX gets the refreshed comparison"""
+    action = request.POST.get("action", "add")
+    ids = [token for value in request.POST.getlist("id") for token in value.split(",")]
+    if action == "add":
+        current = shortlist.add(request.session, ids)
+    elif action == "remove":
+        current = shortlist.remove(request.session, ids)
+    elif action == "clear":
+        shortlist.clear(request.session)
+        current = []
+    else:
+        return HttpResponseBadRequest("Unknown shortlist action")
+
+    if request.headers.get("HX-Request") == "true":
+        listings = shortlist.load(current, [])
+        return render(request, "partials/compare_table.html", {
+            "listings": listings,
+            "rows": shortlist.comparison(listings),
+            "from_shortlist": True,
+            "max_items": shortlist.MAX_ITEMS,
+        })
+    return JsonResponse({"ids": current, "count": len(current)})
+
+
+@retry_on_busy
+def _save_lead(lead: Lead) -> None:
+    lead.save()
+    link_lead(lead)
+    transaction.on_commit(lambda: score_leads([lead.pk]))
 
 
 def lead_submit(request: HttpRequest) -> HttpResponse:
@@ -55,7 +147,7 @@ def lead_submit(request: HttpRequest) -> HttpResponse:
         lead.referrer = request.META.get("HTTP_REFERER", "")
         # interest ids if provided
         lead.interest_ids = request.POST.get("interest_ids", "")
-        lead.save()
+        _save_lead(lead)
 
         # HTMX handling
         if request.headers.get("HX-Request") == "true":
@@ -70,12 +162,75 @@ def lead_submit(request: HttpRequest) -> HttpResponse:
     return HttpResponseRedirect(reverse("home"))
 
 
+@require_POST
+def save_search(request: HttpRequest) -> HttpResponse:
+    """Save the current `results` filters so new matching listings trigger an alert"""
+    form = SavedSearchForm(request.POST)
+    if form.is_valid():
+        saved = retry_on_busy(form.save)()
+        if request.headers.get("HX-Request") == "true":
+            return render(request, "partials/save_search_form.html", {"saved": saved})
+        return redirect(f"{reverse('results')}?{request.POST.get('querystring', '')}")
+
+    if request.headers.get("HX-Request") == "true":
+        return render(request, "partials/save_search_form.html", {"form": form}, status=400)
+    return HttpResponseBadRequest("Invalid saved search")
+
+
+def _booking_listing(property_id: str | None, lead: Lead | None) -> Property | None:
+    """The listing to book: ``?interest=`` if valid, else the lead's first interest."""
+    if property_id:
+        try:
+            return Property.objects.filter(id=property_id).first()
+        except ValidationError:
+            return None
+    if lead is not None:
+        return lead.interests.order_by("pk").first()
+    return None
+
+
+def _slot_context(listing: Property, lead: Lead | None, **extra) -> dict:
+    now = timezone.now()
+    slots = availability(listing, now, now + timedelta(days=settings.BOOKING_DAYS_AHEAD))
+    days = [
+        (day, list(group))
+        for day, group in groupby(slots, key=lambda slot: timezone.localtime(slot.start).date())
+    ]
+    return {"listing": listing, "lead": lead, "days": days, "days_ahead": settings.BOOKING_DAYS_AHEAD, **extra}
+
+
 def book(request: HttpRequest) -> HttpResponse:
     lead_id = request.GET.get("lead")
     lead: Lead | None = None
     if lead_id:
         lead = Lead.objects.filter(id=lead_id).first()
-    return render(request, "book.html", {"lead": lead})
+    listing = _booking_listing(request.GET.get("interest"), lead)
+    context = _slot_context(listing, lead) if listing else {"lead": lead}
+    return render(request, "book.html", context)
+
+
+@require_POST
+def book_reserve(request: HttpRequest) -> HttpResponse:
+    """Reserve a viewing slot; 409 with fresh availability if it was taken meanwhile"""
+    form = BookingForm(request.POST)
+    if not form.is_valid():
+        return HttpResponseBadRequest("Invalid booking")
+    data = form.cleaned_data
+    listing = Property.objects.filter(id=data["property"]).first()
+    if listing is None:
+        raise Http404("Listing not found")
+    lead = Lead.objects.filter(id=data["lead"]).first() if data["lead"] else None
+    try:
+        booking = retry_on_busy(reserve)(listing, data["start"], data["name"], data["phone"], lead=lead)
+    except SlotUnavailable:
+        context = _slot_context(listing, lead, form=form, taken=True)
+        template = "partials/booking_slots.html" if request.headers.get("HX-Request") == "true" else "book.html"
+        return render(request, template, context, status=409)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    if request.headers.get("HX-Request") == "true":
+        return render(request, "partials/booking_confirmed.html", {"booking": booking})
+    return redirect(f"{reverse('thanks')}?lead={lead.id}" if lead else reverse("thanks"))
 
 
 def thanks(request: HttpRequest) -> HttpResponse:
@@ -88,64 +243,52 @@ def thanks(request: HttpRequest) -> HttpResponse:
 
 def dashboard(request: HttpRequest) -> HttpResponse:
     """Listings Dashboard for internal users"""
-    # Query params
-    q = request.GET.get("q", "").strip()
-    city = request.GET.get("city", "").strip()
-    sort = request.GET.get("sort", "new")
-    page = int(request.GET.get("page", 1))
-    per = min(int(request.GET.get("per", 12)), 48)
-    
-    # Base queryset
-    properties = Property.objects.all()
-    
-    # Search filter
-    if q:
-        properties = properties.filter(
-            Q(title__icontains=q) | 
-            Q(area__icontains=q) | 
-            Q(city__icontains=q) | 
-            Q(description__icontains=q)
-        )
-    
-    # City filter
-    if city:
-        properties = properties.filter(city__iexact=city)
-    
-    # Sorting
-    sort_options = {
-        "new": "-created_at",
-        "price_asc": "price_amount",
-        "price_desc": "-price_amount", 
-        "beds_desc": "-beds"
-    }
-    properties = properties.order_by(sort_options.get(sort, "-created_at"))
-    
+    filters = dashboard_filters(request.GET)
+    properties = dashboard_listings(filters)
+
     # Pagination
-    paginator = Paginator(properties, per)
-    page_obj = paginator.get_page(page)
-    
-    # Get distinct cities for filter dropdown
-    cities = Property.objects.values_list("city", flat=True).distinct().order_by("city")
-    
+    paginator = Paginator(properties, filters["per"])
+    page_obj = paginator.get_page(request.GET.get("page", 1))
+
     context = {
         "properties": page_obj,
-        "cities": cities,
         "total_count": paginator.count,
-        "current_filters": {
-            "q": q,
-            "city": city,
-            "sort": sort,
-            "per": per
-        }
+        "current_filters": filters,
     }
-    
-    return render(request, "dashboard.html", context)
+
+    if _is_fragment_request(request):
+        # Filter/sort/page swaps only replace the listings; the cities dropdown stays put.
+        response = render(request, "partials/dashboard_listings.html", context)
+    else:
+        context["cities"] = dashboard_cities()
+        context["priority_leads"] = (
+            Lead.objects.filter(converted=False)
+            .order_by("-score", "-created_at")
+            .only("id", "name", "phone", "buy_or_rent", "budget_max", "areas", "score", "created_at")[:PRIORITY_LEADS]
+        )
+        context["priority_limit"] = PRIORITY_LEADS
+        response = render(request, "dashboard.html", context)
+    patch_vary_headers(response, ("HX-Request",))
+    return response
+
+
+def dashboard_events(request: HttpRequest) -> StreamingHttpResponse:
+    """Server-Sent Events with listing and lead diffs for open dashboards"""
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_id = None
+    response = StreamingHttpResponse(stream(last_id), content_type="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 
 @require_POST
 def property_chat(request: HttpRequest, slug: str) -> HttpResponse:
     """HTMX endpoint for property chat"""
-    property_obj = get_object_or_404(Property, slug=slug)
+    property_obj = get_property_or_404(slug)
     message = request.POST.get("message", "").strip().lower()
     
     if not message:
@@ -164,6 +307,34 @@ def property_chat(request: HttpRequest, slug: str) -> HttpResponse:
     return render(request, "partials/chat_bubble.html", context)
 
 
+def suggest(request: HttpRequest) -> HttpResponse:
+    """HTMX typeahead for the search boxes; served from the in-memory index"""
+    q = request.GET.get("q", "").strip()
+    suggestions = suggestion_index.suggest(q) if len(q) >= 2 else []
+    return render(request, "partials/suggestions.html", {"suggestions": suggestions, "q": q})
+
+
+def feed(request: HttpRequest, name: str) -> HttpResponse:
+    """Serve generated sitemaps and partner feeds, preferring the precompressed copies"""
+    found = feed_file(name, request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if found is None:
+        raise Http404("Feed not generated")
+    path, encoding = found
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = FileResponse(
+            path.open("rb"), content_type=CONTENT_TYPES[path.suffix if encoding is None else path.with_suffix("").suffix]
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "public, max-age=300"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
 def health_check(request: HttpRequest) -> HttpResponse:
     """Health check endpoint for Railway"""
     try:
@@ -171,7 +342,12 @@ def health_check(request: HttpRequest) -> HttpResponse:
         with connection.cursor() as cursor:
             cursor.execute("SELECT 1")
         
-        return JsonResponse({"status": "healthy", "database": "connected"})
+        return JsonResponse({
+            "status": "healthy",
+            "database": "connected",
+            "property_cache": property_cache.stats(),
+            "ratelimit": shared_state(settings.RATELIMIT_STATE_PATH).stats(),
+        })
     except Exception as e:
         return JsonResponse({"status": "unhealthy", "error": str(e)}, status=500)
 
@@ -42,23 +42,54 @@ function getCookie(name) {
 }
 
 // Shortlist functionality
+// The session shortlist on the server is the source of truth (it feeds /compare);
+// localStorage mirrors it so the chip renders before the first round trip.
+function storeShortlist(ids) {
+    localStorage.setItem('property_shortlist', JSON.stringify(ids));
+    updateShortlistUI();
+}
+
+function syncShortlist(action, ids) {
+    const chip = document.querySelector('.saved-chip');
+    if (!chip || !chip.dataset.shortlistUrl) {
+        return Promise.resolve(null);
+    }
+    const body = new URLSearchParams({action: action});
+    ids.forEach(id => body.append('id', id));
+    return fetch(chip.dataset.shortlistUrl, {
+        method: 'POST',
+        headers: {'X-CSRFToken': chip.dataset.csrf},
+        body: body,
+    })
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            if (data) {
+                storeShortlist(data.ids);
+            }
+            return data;
+        })
+        .catch(() => null);
+}
+
 function addToShortlist(propertyId) {
     let shortlist = JSON.parse(localStorage.getItem('property_shortlist') || '[]');
     if (!shortlist.includes(propertyId)) {
         shortlist.push(propertyId);
-        localStorage.setItem('property_shortlist', JSON.stringify(shortlist));
-        updateShortlistUI();
+        storeShortlist(shortlist);
+        syncShortlist('add', [propertyId]);
         showNotification('Added to shortlist!');
     } else {
         showNotification('Already in shortlist!');
     }
 }
 
-function removeFromShortlist(propertyId) {
+function removeFromShortlist(propertyId, savedOnServer) {
     let shortlist = JSON.parse(localStorage.getItem('property_shortlist') || '[]');
     shortlist = shortlist.filter(id => id !== propertyId);
-    localStorage.setItem('property_shortlist', JSON.stringify(shortlist));
-    updateShortlistUI();
+    storeShortlist(shortlist);
+    if (!savedOnServer) {
+        syncShortlist('remove', [propertyId]);
+    }
     showNotification('Removed from shortlist!');
 }
 
@@ -104,8 +135,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Capture UTM params
     captureUTMParams();
     
-    // Update shortlist UI
+    // Update shortlist UI, then merge anything saved in this browser into the session
     updateShortlistUI();
+    const saved = JSON.parse(localStorage.getItem('property_shortlist') || '[]');
+    if (saved.length) {
+        syncShortlist('add', saved);
+    }
     
     // Add CSRF token to HTMX requests
     document.body.addEventListener('htmx:configRequest', function(evt) {